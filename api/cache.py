@@ -0,0 +1,208 @@
+"""
+Shared response/data cache.
+
+Uses Redis when REDIS_URL is set and the redis package is installed, so
+every gunicorn worker sees the same entries. Otherwise falls back to a
+per-process dictionary with TTLs, like the TMDB cache in tmdb_client,
+shared by the worker's threads under a lock. Version counters live in
+their own dictionary there so eviction can never reset them.
+Cache errors are logged and treated as misses; they never fail a request.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+from dotenv import load_dotenv
+from flask import current_app, request
+
+# Imported (via models) before app.py loads .env, and REDIS_URL is read below
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+KEY_PREFIX = "frameiq:"
+LOCAL_CACHE_MAX_ENTRIES = 5000
+
+try:
+    import redis
+except ImportError:  # Redis is optional
+    redis = None
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+
+def _dumps(value):
+    """Encode a cache value for Redis (orjson when available)"""
+    return orjson.dumps(value) if orjson is not None else json.dumps(value)
+
+
+def _loads(raw):
+    """Decode a cache value read from Redis"""
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+_redis_client = None
+if redis is not None and REDIS_URL:
+    try:
+        _redis_client = redis.Redis.from_url(REDIS_URL, socket_timeout=0.5)
+    except Exception as e:
+        logger.error(f"Could not configure Redis cache, using in-process cache: {e}")
+
+# key -> (value, expires_at)
+_local_cache = {}
+# version counter key -> value; never expired or evicted
+_local_versions = {}
+# Guards both dicts: request threads and background pools share them
+_local_lock = threading.Lock()
+
+
+def _evict_local():
+    """Keep the in-process cache bounded: drop expired entries, then the oldest.
+    Called with _local_lock held."""
+    now = time.time()
+    for key in [k for k, (_, expires_at) in _local_cache.items() if expires_at <= now]:
+        _local_cache.pop(key, None)
+    while len(_local_cache) >= LOCAL_CACHE_MAX_ENTRIES:
+        _local_cache.pop(next(iter(_local_cache)))
+
+
+def cache_get(key):
+    """Return the cached value for key, or None on a miss"""
+    if _redis_client is not None:
+        try:
+            raw = _redis_client.get(KEY_PREFIX + key)
+            return _loads(raw) if raw is not None else None
+        except Exception as e:
+            logger.warning(f"Redis get failed for {key}: {e}")
+            return None
+
+    with _local_lock:
+        entry = _local_cache.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time():
+            _local_cache.pop(key, None)
+            return None
+        return value
+
+
+def cache_set(key, value, ttl):
+    """Store a JSON-serializable value for ttl seconds"""
+    if _redis_client is not None:
+        try:
+            _redis_client.set(KEY_PREFIX + key, _dumps(value), ex=ttl)
+        except Exception as e:
+            logger.warning(f"Redis set failed for {key}: {e}")
+        return
+
+    with _local_lock:
+        if len(_local_cache) >= LOCAL_CACHE_MAX_ENTRIES:
+            _evict_local()
+        _local_cache[key] = (value, time.time() + ttl)
+
+
+def cache_get_many(keys):
+    """Return {key: value} for the keys that are cached"""
+    if not keys:
+        return {}
+    if _redis_client is not None:
+        try:
+            raws = _redis_client.mget([KEY_PREFIX + key for key in keys])
+            return {key: _loads(raw) for key, raw in zip(keys, raws) if raw is not None}
+        except Exception as e:
+            logger.warning(f"Redis mget failed: {e}")
+            return {}
+
+    found = {}
+    for key in keys:
+        value = cache_get(key)
+        if value is not None:
+            found[key] = value
+    return found
+
+
+def cache_set_many(mapping, ttl):
+    """Store several JSON-serializable values for ttl seconds"""
+    if not mapping:
+        return
+    if _redis_client is not None:
+        try:
+            pipe = _redis_client.pipeline(transaction=False)
+            for key, value in mapping.items():
+                pipe.set(KEY_PREFIX + key, _dumps(value), ex=ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Redis pipeline set failed: {e}")
+        return
+
+    for key, value in mapping.items():
+        cache_set(key, value, ttl)
+
+
+def cache_delete(*keys):
+    """Drop one or more keys"""
+    if _redis_client is not None:
+        try:
+            _redis_client.delete(*[KEY_PREFIX + key for key in keys])
+        except Exception as e:
+            logger.warning(f"Redis delete failed for {keys}: {e}")
+        return
+
+    with _local_lock:
+        for key in keys:
+            _local_cache.pop(key, None)
+
+
+def get_version(name):
+    """Current value of a version counter used to namespace cache keys"""
+    key = f"version:{name}"
+    if _redis_client is not None:
+        return cache_get(key) or 0
+
+    with _local_lock:
+        return _local_versions.get(key, 0)
+
+
+def bump_version(name):
+    """Invalidate every key built from this version counter"""
+    key = f"version:{name}"
+    if _redis_client is not None:
+        try:
+            _redis_client.incr(KEY_PREFIX + key)
+        except Exception as e:
+            logger.warning(f"Redis incr failed for {key}: {e}")
+        return
+
+    with _local_lock:
+        _local_versions[key] = _local_versions.get(key, 0) + 1
+
+
+def cached_count(key, query, ttl=60):
+    """COUNT(*) for a query, reused for ttl seconds"""
+    total = cache_get(key)
+    if total is None:
+        total = query.order_by(None).count()
+        cache_set(key, total, ttl)
+    return total
+
+
+def cached_json_response(key, ttl, build_payload):
+    """
+    Serve a JSON payload from cache, calling build_payload() on a miss.
+    The response carries an ETag so clients can revalidate with a 304.
+    """
+    body = cache_get(key)
+    if body is None:
+        body = current_app.json.dumps(build_payload())
+        cache_set(key, body, ttl)
+
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(hashlib.sha1(body.encode('utf-8')).hexdigest())
+    return response.make_conditional(request)
@@ -0,0 +1,142 @@
+"""
+Write-behind buffer for denormalized counter columns.
+
+Hot rows (a popular review's likes_count) otherwise take a row lock on every
+like until that request commits. With the buffer enabled, handlers record
+deltas in memory and a background thread folds them into the database every
+flush interval, one UPDATE per (table, column) using a CASE over the ids.
+
+Enabled by setting COUNTER_WRITE_BEHIND=1. Deltas live in the worker's
+memory until flushed, so a hard crash can lose up to one interval of counts;
+the exact rows (ReviewLike, ReviewComment, ...) are always written
+synchronously and remain the source of truth.
+
+Handlers record deltas with incr_on_commit(): they are held on the session
+and only reach the buffer once its transaction commits, so a rolled back
+request (a duplicate like, a failed insert) never moves a counter.
+"""
+import os
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from dotenv import load_dotenv
+from sqlalchemy import case, event, update
+
+# Imported (via models) before app.py loads .env
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# session.info key holding deltas that wait for the transaction to commit
+SESSION_DELTAS_KEY = 'counter_buffer_deltas'
+
+FLUSH_INTERVAL = float(os.getenv("COUNTER_FLUSH_INTERVAL", "0.5"))
+
+
+class CounterBuffer:
+    """Accumulates (model, row id, column) deltas and flushes them in batches"""
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self.enabled = False
+        self._app = None
+        self._db = None
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, app, db):
+        """Enable buffering and start the background flusher for this process"""
+        if self._thread is not None:
+            return
+        self._app = app
+        self._db = db
+        self.attach(db.session)
+        self.enabled = True
+        self._thread = threading.Thread(target=self._run, name='counter-buffer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the flusher and write out whatever is still pending"""
+        self._stop.set()
+        if self._app is not None:
+            with self._app.app_context():
+                self.flush()
+
+    def attach(self, session):
+        """Hand deltas recorded on session (or a session class/factory) to the buffer on commit"""
+        event.listen(session, 'after_commit', self._on_commit)
+        event.listen(session, 'after_transaction_end', self._on_transaction_end)
+
+    def incr_on_commit(self, session, model, row_id, column, delta):
+        """Record a delta that only counts if session's current transaction commits"""
+        if not delta:
+            return
+        session.info.setdefault(SESSION_DELTAS_KEY, []).append((model, row_id, column, delta))
+
+    def _on_commit(self, session):
+        for model, row_id, column, delta in session.info.pop(SESSION_DELTAS_KEY, ()):
+            self.incr(model, row_id, column, delta)
+
+    def _on_transaction_end(self, session, transaction):
+        # Anything still held when the outermost transaction ends was rolled back
+        if transaction.parent is None:
+            session.info.pop(SESSION_DELTAS_KEY, None)
+
+    def incr(self, model, row_id, column, delta):
+        """Record a delta for model.column on row_id"""
+        if not delta:
+            return
+        with self._lock:
+            self._pending[(model, row_id, column)] += delta
+
+    def pending(self, model, row_id, column):
+        """Delta recorded for this counter that has not been flushed yet"""
+        with self._lock:
+            return self._pending.get((model, row_id, column), 0)
+
+    def flush(self):
+        """Apply all pending deltas: one UPDATE per (model, column)"""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+        if not pending:
+            return
+
+        grouped = defaultdict(dict)
+        for (model, row_id, column), delta in pending.items():
+            if delta:
+                grouped[(model, column)][row_id] = delta
+
+        db = self._db
+        try:
+            for (model, column), deltas in grouped.items():
+                col = getattr(model, column)
+                shifted = col + case(deltas, value=model.id, else_=0)
+                values = {column: case((shifted > 0, shifted), else_=0)}
+                if hasattr(model, 'version'):
+                    values['version'] = model.version + 1
+                db.session.execute(
+                    update(model).where(model.id.in_(list(deltas))).values(values),
+                    execution_options={'synchronize_session': False}
+                )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Counter flush failed, re-queueing {len(pending)} deltas: {e}")
+            with self._lock:
+                for key, delta in pending.items():
+                    self._pending[key] += delta
+        finally:
+            db.session.remove()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            with self._app.app_context():
+                self.flush()
+
+
+counter_buffer = CounterBuffer()
@@ -0,0 +1,42 @@
+"""
+orjson-backed JSON provider for Flask.
+
+Installed on the app so every jsonify() call and cached_json_response() use
+orjson's C encoder instead of the stdlib json module. Output matches Flask's
+default provider: dates/datetimes, Decimals, UUIDs etc. are still routed
+through Flask's own default() hook. Falls back to the stock provider when
+orjson is not installed.
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with orjson doing the encoding/decoding"""
+
+    # Let Flask format dates (HTTP date strings) exactly as before
+    option = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response, skipping a str round-trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.option),
+            mimetype=self.mimetype
+        )
+
+
+def init_json_provider(app):
+    """Use orjson for the app's JSON handling when it is available"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
@@ -0,0 +1,119 @@
+"""
+Keyset (seek) pagination helpers.
+
+OFFSET pagination makes the database walk and discard every row before the
+requested page. Keyset pagination instead remembers the sort key of the last
+row served and asks for rows strictly after it, which stays an index seek no
+matter how deep the client scrolls.
+
+Cursors are passed as ?after=<ISO timestamp>&after_id=<row id>.
+"""
+import math
+from datetime import datetime
+
+from sqlalchemy import func, tuple_
+
+
+# Largest page a client may request; bounds the rows, dicts and JSON held
+# in memory for a single response
+MAX_PER_PAGE = 100
+
+
+def parse_per_page(args, default=20):
+    """Read ?per_page=, clamped to 1..MAX_PER_PAGE"""
+    per_page = args.get('per_page', default, type=int)
+    return min(max(per_page, 1), MAX_PER_PAGE)
+
+
+def parse_cursor(args):
+    """Read (after, after_id) from request args; None when absent or malformed"""
+    after = args.get('after')
+    after_id = args.get('after_id', type=int)
+    if not after or after_id is None:
+        return None
+    try:
+        return datetime.fromisoformat(after), after_id
+    except ValueError:
+        return None
+
+
+def make_cursor(sort_value, row_id):
+    """Build the cursor dict returned to clients for the next page"""
+    return {'after': sort_value.isoformat(), 'after_id': row_id}
+
+
+def keyset_paginate(query, sort_column, id_column, per_page, cursor=None, cursor_of=None):
+    """
+    Fetch one page of query ordered by (sort_column DESC, id_column DESC).
+
+    Returns (items, has_next, next_cursor). One extra row is fetched to learn
+    whether another page exists, so no COUNT(*) is needed. cursor_of(row)
+    returns the (sort value, id) of a row when the columns are not attributes
+    of the returned objects.
+    """
+    if cursor:
+        query = query.filter(tuple_(sort_column, id_column) < tuple_(*cursor))
+
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    items = rows[:per_page]
+
+    next_cursor = None
+    if has_next:
+        last = items[-1]
+        if cursor_of is not None:
+            next_cursor = make_cursor(*cursor_of(last))
+        else:
+            next_cursor = make_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+    return items, has_next, next_cursor
+
+
+def offset_page(query, page, per_page):
+    """
+    Fetch one page-number page without the COUNT(*) that paginate() issues.
+    Returns (items, has_next), probing one row past the page for has_next.
+    """
+    page = max(page, 1)
+    rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    return rows[:per_page], len(rows) > per_page
+
+
+def page_count(total, per_page):
+    """Number of pages for a (possibly cached/denormalized) total"""
+    if not total or per_page <= 0:
+        return 0
+    return math.ceil(total / per_page)
+
+
+class WindowPage:
+    """The subset of Flask-SQLAlchemy's Pagination that the API responses use"""
+
+    def __init__(self, items, total, page, per_page):
+        self.items = items
+        self.total = total
+        self.page = page
+        self.per_page = per_page
+        self.pages = page_count(total, per_page)
+        self.has_prev = page > 1
+        self.has_next = page < self.pages
+
+
+def window_paginate(query, page, per_page):
+    """
+    Drop-in for query.paginate() that returns the page and its total in one
+    round trip: COUNT(*) OVER () rides along on every row of the page query
+    instead of a separate SELECT COUNT(*).
+    """
+    page = max(page, 1)
+    rows = query.add_columns(func.count().over()).limit(per_page).offset((page - 1) * per_page).all()
+
+    if rows:
+        total = rows[0][-1]
+    elif page > 1:
+        # Past the last page there are no rows to carry the total
+        total = query.order_by(None).count()
+    else:
+        total = 0
+
+    return WindowPage([row[0] for row in rows], total, page, per_page)
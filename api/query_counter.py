@@ -0,0 +1,36 @@
+"""
+Per-request SQL statement counter for catching N+1 regressions.
+
+Enabled by setting SQL_QUERY_WARN_THRESHOLD to a statement count. Every
+request that runs more statements than that is logged with its endpoint
+and count, so a lazy load creeping back into a list endpoint shows up in
+development logs long before it shows up in production latency.
+"""
+import logging
+
+from flask import g, request, has_request_context
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+def init_query_counter(app, db, threshold):
+    """Count statements per request and warn when a request exceeds threshold"""
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'sql_statement_count' in g:
+            g.sql_statement_count += 1
+
+    @app.before_request
+    def start_counting():
+        g.sql_statement_count = 0
+
+    @app.after_request
+    def report_count(response):
+        count = g.get('sql_statement_count', 0)
+        if count > threshold:
+            logger.warning(f"{request.method} {request.path} ({request.endpoint}) ran {count} SQL statements")
+        return response
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
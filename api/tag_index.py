@@ -0,0 +1,64 @@
+"""
+In-process prefix index for tag autocomplete.
+
+/api/tags/search is called on every keystroke. The most used tags are kept
+in a sorted list per worker so a prefix lookup is a bisect plus a short
+scan, with answers memoized per (prefix, limit). The snapshot is rebuilt
+every TAG_INDEX_TTL seconds, so usage counts may lag by that much.
+
+Only the top TAG_INDEX_SIZE tags by usage are held. Any tag left out is
+used no more than every tag kept, so when the index finds at least `limit`
+prefix matches those are the true top matches; otherwise search() returns
+None and the caller asks the database.
+"""
+import time
+import heapq
+import bisect
+import threading
+from functools import lru_cache
+from operator import itemgetter
+
+TAG_INDEX_SIZE = 5000
+TAG_INDEX_TTL = 300
+TAG_SEARCH_MEMO_SIZE = 10000
+
+
+class TagPrefixIndex:
+    """Sorted snapshot of tag dicts (as from Tag.to_dict()) keyed by name"""
+
+    def __init__(self, tags):
+        tags = sorted(tags, key=itemgetter('name'))
+        self._names = [tag['name'] for tag in tags]
+        self._tags = tags
+        self.search = lru_cache(maxsize=TAG_SEARCH_MEMO_SIZE)(self._search)
+
+    def _search(self, prefix, limit):
+        """Top `limit` tags by usage starting with prefix, or None if unsure"""
+        start = bisect.bisect_left(self._names, prefix)
+        matches = []
+        for i in range(start, len(self._names)):
+            if not self._names[i].startswith(prefix):
+                break
+            matches.append(self._tags[i])
+        if len(matches) < limit:
+            return None
+        return heapq.nlargest(limit, matches, key=itemgetter('usage_count'))
+
+
+_index = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def get_tag_index(load_tags):
+    """
+    Current index for this process, rebuilt from load_tags(TAG_INDEX_SIZE)
+    when missing or older than TAG_INDEX_TTL. load_tags returns tag dicts.
+    """
+    global _index, _loaded_at
+    if _index is None or time.time() - _loaded_at > TAG_INDEX_TTL:
+        with _lock:
+            if _index is None or time.time() - _loaded_at > TAG_INDEX_TTL:
+                _index = TagPrefixIndex(load_tags(TAG_INDEX_SIZE))
+                _loaded_at = time.time()
+    return _index
@@ -14,6 +14,7 @@ from dotenv import load_dotenv
 
 # Local Imports - Models
 from models import db, User
+from api.json_provider import init_json_provider
 
 # Local Imports - Core Routes
 from routes.auth import auth
@@ -67,6 +68,7 @@ load_dotenv()
 # ============================================================================
 
 app = Flask(__name__)
+init_json_provider(app)
 app.config['SECRET_KEY'] = os.getenv("SECRET_KEY")
 app.config['TMDB_API_KEY'] = os.getenv("TMDB_API_KEY")
 
@@ -103,9 +105,26 @@ app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
     "pool_pre_ping": True,
-    "pool_recycle": 300,
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 300)),
+    # Sized per worker process; override to fit the database's connection limit
+    "pool_size": int(os.getenv("DB_POOL_SIZE", 20)),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 40)),
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 10)),
+    # Reuse the most recently returned connection so a warm subset stays hot
+    "pool_use_lifo": True,
+    # Compiled SQL is cached per statement shape; the default (500) is small
+    # for the number of distinct queries the blueprints issue
+    "query_cache_size": int(os.getenv("DB_QUERY_CACHE_SIZE", 1500)),
 }
 
+# Optional server-side cap on statement runtime, so a runaway query frees its
+# connection instead of holding it until the pool times out. Opt-in because
+# migrations and materialized view refreshes import this app too.
+if os.getenv("DB_STATEMENT_TIMEOUT_MS"):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS']["connect_args"] = {
+        "options": f"-c statement_timeout={int(os.getenv('DB_STATEMENT_TIMEOUT_MS'))}"
+    }
+
 print(f"Database URI: {app.config['SQLALCHEMY_DATABASE_URI']}")
 
 
@@ -115,6 +134,16 @@ print(f"Database URI: {app.config['SQLALCHEMY_DATABASE_URI']}")
 
 db.init_app(app)
 
+# Optional write-behind buffering of hot counter columns (likes, replies)
+if os.getenv("COUNTER_WRITE_BEHIND"):
+    from api.counter_buffer import counter_buffer
+    counter_buffer.start(app, db)
+
+# Development aid: log requests that run more SQL statements than expected
+if os.getenv("SQL_QUERY_WARN_THRESHOLD"):
+    from api.query_counter import init_query_counter
+    init_query_counter(app, db, int(os.getenv("SQL_QUERY_WARN_THRESHOLD")))
+
 
 # ============================================================================
 # Authentication Setup
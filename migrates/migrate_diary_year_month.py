@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Migration script to add generated watched_year / watched_month columns
+
+Stats and diary filters group and filter on the year/month of watched_date.
+Storing them as generated columns (kept in sync by Postgres) lets those
+queries use a plain btree index instead of computing extract() per row.
+Run this script: python migrate_diary_year_month.py
+"""
+
+from app import app
+from models import db
+from sqlalchemy import text
+
+COLUMNS = [
+    ('watched_year', "EXTRACT(year FROM watched_date)::smallint"),
+    ('watched_month', "EXTRACT(month FROM watched_date)::smallint"),
+]
+
+def migrate_diary_year_month():
+    """Add watched_year/watched_month generated columns and their index"""
+    with app.app_context():
+        try:
+            print("📅 Adding Diary Year/Month Columns...")
+            print("=" * 60)
+
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('diary_entry')]
+
+            for name, expression in COLUMNS:
+                if name in columns:
+                    print(f"✅ diary_entry.{name} already exists!")
+                    continue
+
+                print(f"⚙️  Adding diary_entry.{name}...")
+                with db.engine.connect() as conn:
+                    conn.execute(text(f"""
+                        ALTER TABLE diary_entry
+                        ADD COLUMN IF NOT EXISTS {name} SMALLINT
+                        GENERATED ALWAYS AS ({expression}) STORED
+                    """))
+                    conn.commit()
+                print(f"✅ diary_entry.{name} added successfully!")
+
+            # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+            print("⚙️  Creating ix_diary_user_year_month...")
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text(
+                    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_diary_user_year_month "
+                    "ON diary_entry (user_id, watched_year, watched_month)"
+                ))
+
+            print("\n🎉 Migration Complete!")
+            print("=" * 60)
+
+        except Exception as e:
+            print(f"❌ Error during migration: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    migrate_diary_year_month()
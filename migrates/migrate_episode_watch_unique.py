@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Migration script to make episode watches unique per user and episode
+
+mark_season_watched upserts with ON CONFLICT (user_id, show_id,
+season_number, episode_number), which needs a unique index on those
+columns. Duplicate rows left by older code are removed first, keeping the
+most recent one. The unique index replaces idx_user_show_season_episode,
+which covered the same columns. Safe to run repeatedly.
+Run this script: python migrate_episode_watch_unique.py
+"""
+
+from app import app
+from models import db
+from sqlalchemy import text
+
+def migrate_episode_watch_unique():
+    """Dedupe tv_episode_watch and add uq_tv_episode_watch"""
+    with app.app_context():
+        try:
+            print("📺 Making Episode Watches Unique...")
+            print("=" * 60)
+
+            print("⚙️  Removing duplicate episode watches...")
+            with db.engine.connect() as conn:
+                result = conn.execute(text("""
+                    DELETE FROM tv_episode_watch older
+                    USING tv_episode_watch newer
+                    WHERE older.user_id = newer.user_id
+                      AND older.show_id = newer.show_id
+                      AND older.season_number = newer.season_number
+                      AND older.episode_number = newer.episode_number
+                      AND older.id < newer.id
+                """))
+                conn.commit()
+            print(f"✅ {result.rowcount} duplicate rows removed")
+
+            # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                print("⚙️  Creating uq_tv_episode_watch...")
+                conn.execute(text(
+                    "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_tv_episode_watch "
+                    "ON tv_episode_watch (user_id, show_id, season_number, episode_number)"
+                ))
+                print("⚙️  Dropping idx_user_show_season_episode...")
+                conn.execute(text("DROP INDEX CONCURRENTLY IF EXISTS idx_user_show_season_episode"))
+
+            print("\n🎉 Migration Complete!")
+            print("=" * 60)
+
+        except Exception as e:
+            print(f"❌ Error during migration: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    migrate_episode_watch_unique()
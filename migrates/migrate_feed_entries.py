@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Migration script to create and backfill the feed_entry table
+
+feed_entry holds one row per (follower, review) so the activity feed is a
+single index range scan instead of a join through user_follow. New reviews
+are fanned out as they are posted; this script fills in existing ones.
+Run this script: python migrate_feed_entries.py
+"""
+
+from app import app
+from models import db, FeedEntry
+from sqlalchemy import text
+
+def migrate_feed_entries():
+    """Create feed_entry and copy in reviews from followed users"""
+    with app.app_context():
+        try:
+            print("📰 Building Feed Entries...")
+            print("=" * 60)
+
+            print("⚙️  Creating feed_entry table (if missing)...")
+            FeedEntry.__table__.create(db.engine, checkfirst=True)
+
+            print("⚙️  Backfilling feeds from active follows...")
+            with db.engine.connect() as conn:
+                result = conn.execute(text("""
+                    INSERT INTO feed_entry (user_id, review_id, author_id, created_at)
+                    SELECT uf.follower_id, r.id, r.user_id, r.created_at
+                    FROM review r
+                    JOIN user_follow uf ON uf.following_id = r.user_id AND uf.is_active
+                    WHERE NOT r.is_deleted
+                    ON CONFLICT DO NOTHING
+                """))
+                conn.commit()
+            print(f"✅ {result.rowcount} feed entries added!")
+
+            print("\n🎉 Migration Complete!")
+            print("=" * 60)
+
+        except Exception as e:
+            print(f"❌ Error during migration: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    migrate_feed_entries()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Migration script to create and backfill the media_genre table
+
+media_genre holds one row per (media item, genre), split out of the
+comma-separated media_item.genres column, so genre stats group on an
+indexed column instead of splitting strings per row. MediaItem mapper
+events keep it synced on every ORM insert or genres change; this script
+fills in existing rows.
+Run this script: python migrate_media_genres.py
+"""
+
+from app import app
+from models import db, MediaGenre
+from sqlalchemy import text
+
+def migrate_media_genres():
+    """Create media_genre and split existing media_item.genres into it"""
+    with app.app_context():
+        try:
+            print("🎭 Building Media Genres...")
+            print("=" * 60)
+
+            print("⚙️  Creating media_genre table (if missing)...")
+            MediaGenre.__table__.create(db.engine, checkfirst=True)
+
+            print("⚙️  Backfilling genres from media_item.genres...")
+            with db.engine.connect() as conn:
+                result = conn.execute(text("""
+                    INSERT INTO media_genre (media_id, genre)
+                    SELECT DISTINCT m.id, left(trim(g.genre), 50)
+                    FROM media_item m
+                    CROSS JOIN LATERAL unnest(string_to_array(m.genres, ',')) AS g(genre)
+                    WHERE trim(g.genre) <> ''
+                    ON CONFLICT DO NOTHING
+                """))
+                conn.commit()
+            print(f"✅ {result.rowcount} media genres added!")
+
+            print("\n🎉 Migration Complete!")
+            print("=" * 60)
+
+        except Exception as e:
+            print(f"❌ Error during migration: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    migrate_media_genres()
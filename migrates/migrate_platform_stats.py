@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the platform stats materialized views
+
+/api/stats/platform counts every user, review and diary entry. These views
+precompute those totals and the most watched titles so the endpoint reads
+a handful of rows instead of scanning whole tables.
+Refresh them with scripts/refresh_platform_stats.py.
+Run this script: python migrate_platform_stats.py
+"""
+
+from app import app
+from models import db
+from sqlalchemy import text
+
+# Titles kept in mv_most_watched; the endpoint shows the top 10
+MOST_WATCHED_LIMIT = 100
+
+def migrate_platform_stats():
+    """Create mv_platform_stats, mv_most_watched and their indexes"""
+    with app.app_context():
+        try:
+            print("📈 Creating Platform Stats Views...")
+            print("=" * 60)
+
+            with db.engine.connect() as conn:
+                print("⚙️  Creating mv_platform_stats...")
+                conn.execute(text("""
+                    CREATE MATERIALIZED VIEW IF NOT EXISTS mv_platform_stats AS
+                    SELECT
+                        1 AS id,
+                        (SELECT COUNT(*) FROM "user" WHERE is_active) AS total_users,
+                        (SELECT COUNT(*) FROM review WHERE NOT is_deleted) AS total_reviews,
+                        (SELECT COUNT(*) FROM diary_entry) AS total_watched,
+                        (SELECT AVG(rating) FROM review
+                         WHERE NOT is_deleted AND rating IS NOT NULL) AS average_rating
+                """))
+
+                print("⚙️  Creating mv_most_watched...")
+                conn.execute(text(f"""
+                    CREATE MATERIALIZED VIEW IF NOT EXISTS mv_most_watched AS
+                    SELECT d.media_id, d.media_type, m.title, COUNT(*) AS watch_count
+                    FROM diary_entry d
+                    JOIN media_item m ON m.id = d.media_id
+                    GROUP BY d.media_id, d.media_type, m.title
+                    ORDER BY watch_count DESC
+                    LIMIT {MOST_WATCHED_LIMIT}
+                """))
+
+                # Unique indexes are required for REFRESH ... CONCURRENTLY
+                print("⚙️  Creating indexes...")
+                conn.execute(text("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS ix_mv_platform_stats_id
+                    ON mv_platform_stats (id)
+                """))
+                conn.execute(text("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS ix_mv_most_watched_media
+                    ON mv_most_watched (media_id, media_type)
+                """))
+                conn.commit()
+
+            print("✅ Platform stats views created successfully!")
+            print("\n🎉 Migration Complete!")
+            print("=" * 60)
+
+        except Exception as e:
+            print(f"❌ Error during migration: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    migrate_platform_stats()
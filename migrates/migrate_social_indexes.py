@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Migration script to add composite indexes for social lookups
+
+db.create_all() does not add indexes to tables that already exist, so this
+creates them explicitly. Indexes are built CONCURRENTLY so the live tables
+stay writable while they build. Safe to run repeatedly.
+Run this script: python migrate_social_indexes.py
+"""
+
+from app import app
+from models import db
+from sqlalchemy import text
+
+INDEXES = [
+    # (name, SQL)
+    ('ix_user_follow_follower_active',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_user_follow_follower_active "
+     "ON user_follow (follower_id, following_id) WHERE is_active"),
+    ('ix_user_follow_following_active',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_user_follow_following_active "
+     "ON user_follow (following_id, follower_id) WHERE is_active"),
+    ('ix_review_comment_thread',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_review_comment_thread "
+     "ON review_comment (review_id, parent_id, is_deleted, created_at)"),
+    ('ix_review_live_created_id',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_review_live_created_id "
+     "ON review (created_at DESC, id DESC) WHERE NOT is_deleted"),
+    ('ix_user_follow_following_created',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_user_follow_following_created "
+     "ON user_follow (following_id, created_at DESC, id DESC) WHERE is_active"),
+    ('ix_user_follow_follower_created',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_user_follow_follower_created "
+     "ON user_follow (follower_id, created_at DESC, id DESC) WHERE is_active"),
+]
+
+def migrate_social_indexes():
+    """Create composite/partial indexes for hot social queries"""
+    with app.app_context():
+        try:
+            print("📇 Adding Social Indexes...")
+            print("=" * 60)
+
+            # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                for name, sql in INDEXES:
+                    print(f"⚙️  Creating {name}...")
+                    conn.execute(text(sql))
+
+            print("\n🎉 Migration Complete!")
+            print("=" * 60)
+
+        except Exception as e:
+            print(f"❌ Error during migration: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    migrate_social_indexes()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Migration script to add composite indexes for the stats endpoints
+
+db.create_all() does not add indexes to tables that already exist, so this
+creates them explicitly. Indexes are built CONCURRENTLY so the live tables
+stay writable while they build. Safe to run repeatedly.
+Run this script: python migrate_stats_indexes.py
+"""
+
+from app import app
+from models import db
+from sqlalchemy import text
+
+INDEXES = [
+    # (name, SQL)
+    ('ix_diary_user_watched',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_diary_user_watched "
+     "ON diary_entry (user_id, watched_date) INCLUDE (media_id, media_type)"),
+    ('ix_review_user_active_rating',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_review_user_active_rating "
+     "ON review (user_id, rating) WHERE NOT is_deleted AND rating IS NOT NULL"),
+]
+
+def migrate_stats_indexes():
+    """Create composite/partial indexes for per-user stats queries"""
+    with app.app_context():
+        try:
+            print("📊 Adding Stats Indexes...")
+            print("=" * 60)
+
+            # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                for name, sql in INDEXES:
+                    print(f"⚙️  Creating {name}...")
+                    conn.execute(text(sql))
+
+            print("\n🎉 Migration Complete!")
+            print("=" * 60)
+
+        except Exception as e:
+            print(f"❌ Error during migration: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    migrate_stats_indexes()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Migration script to add indexes for the tag endpoints
+
+db.create_all() does not add indexes to tables that already exist, so this
+creates them explicitly. Indexes are built CONCURRENTLY so the live tables
+stay writable while they build. Safe to run repeatedly.
+Run this script: python migrate_tag_indexes.py
+"""
+
+from app import app
+from models import db
+from sqlalchemy import text
+
+INDEXES = [
+    # (name, SQL)
+    ('ix_tag_popular',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tag_popular "
+     "ON tag (usage_count DESC, id DESC) INCLUDE (name) WHERE usage_count > 0"),
+    ('ix_tag_name_pattern',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tag_name_pattern "
+     "ON tag (name varchar_pattern_ops)"),
+    ('ix_user_media_tag_user_tag',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_user_media_tag_user_tag "
+     "ON user_media_tag (user_id, tag_id)"),
+]
+
+def migrate_tag_indexes():
+    """Create indexes for popular-tag, tag-search and per-user tag queries"""
+    with app.app_context():
+        try:
+            print("🏷️  Adding Tag Indexes...")
+            print("=" * 60)
+
+            # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                for name, sql in INDEXES:
+                    print(f"⚙️  Creating {name}...")
+                    conn.execute(text(sql))
+
+            print("\n🎉 Migration Complete!")
+            print("=" * 60)
+
+        except Exception as e:
+            print(f"❌ Error during migration: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    migrate_tag_indexes()
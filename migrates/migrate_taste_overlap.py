@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the user_taste_overlap materialized view
+
+Precomputes, for every pair of users, how many media items they share across
+watchlists, wishlists and viewing history, so suggested follows become an
+indexed lookup instead of a GROUP BY over all interactions per request.
+Refresh it with scripts/refresh_taste_overlap.py.
+Run this script: python migrate_taste_overlap.py
+"""
+
+from app import app
+from models import db
+from sqlalchemy import text
+
+# Pairs sharing fewer media than this are left out to keep the view small;
+# users without enough overlap are covered by the "active members" fallback
+MIN_SHARED_MEDIA = 2
+
+def migrate_taste_overlap():
+    """Create user_taste_overlap and its indexes"""
+    with app.app_context():
+        try:
+            print("🤝 Creating Taste Overlap View...")
+            print("=" * 60)
+
+            with db.engine.connect() as conn:
+                print("⚙️  Creating user_taste_overlap...")
+                conn.execute(text(f"""
+                    CREATE MATERIALIZED VIEW IF NOT EXISTS user_taste_overlap AS
+                    WITH interactions AS (
+                        SELECT user_id, media_id FROM user_watchlist
+                        UNION
+                        SELECT user_id, media_id FROM user_wishlist
+                        UNION
+                        SELECT user_id, media_id FROM user_viewed
+                    )
+                    SELECT a.user_id AS user_a, b.user_id AS user_b, COUNT(*) AS shared_count
+                    FROM interactions a
+                    JOIN interactions b ON a.media_id = b.media_id AND a.user_id != b.user_id
+                    GROUP BY a.user_id, b.user_id
+                    HAVING COUNT(*) >= {MIN_SHARED_MEDIA}
+                """))
+
+                # The unique index is required for REFRESH ... CONCURRENTLY
+                print("⚙️  Creating indexes...")
+                conn.execute(text("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS ix_user_taste_overlap_pair
+                    ON user_taste_overlap (user_a, user_b)
+                """))
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_user_taste_overlap_rank
+                    ON user_taste_overlap (user_a, shared_count DESC)
+                """))
+                conn.commit()
+
+            print("✅ user_taste_overlap created successfully!")
+            print("\n🎉 Migration Complete!")
+            print("=" * 60)
+
+        except Exception as e:
+            print(f"❌ Error during migration: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    migrate_taste_overlap()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Migration script to add indexes for the trending endpoints
+
+Every trending query keeps rows newer than a cutoff and groups them by
+media, user or tag. These composite indexes lead with created_at and carry
+the grouping columns, so recent activity is read with an index-only scan
+instead of a sequential scan of each activity table. Indexes are built
+CONCURRENTLY so the live tables stay writable. Safe to run repeatedly.
+Run this script: python migrate_trending_indexes.py
+"""
+
+from app import app
+from models import db
+from sqlalchemy import text
+
+INDEXES = [
+    # (name, SQL)
+    ('ix_media_like_trending',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_media_like_trending "
+     "ON media_like (created_at DESC, media_id, media_type) INCLUDE (user_id)"),
+    ('ix_media_comment_trending',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_media_comment_trending "
+     "ON media_comment (created_at DESC, media_id, media_type) INCLUDE (user_id) "
+     "WHERE NOT is_deleted"),
+    ('ix_review_trending',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_review_trending "
+     "ON review (created_at DESC, media_id, user_id)"),
+    ('ix_user_media_tag_trending',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_user_media_tag_trending "
+     "ON user_media_tag (created_at DESC, tag_id)"),
+]
+
+def migrate_trending_indexes():
+    """Create indexes for the trending media, user and tag aggregates"""
+    with app.app_context():
+        try:
+            print("🔥 Adding Trending Indexes...")
+            print("=" * 60)
+
+            # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                for name, sql in INDEXES:
+                    print(f"⚙️  Creating {name}...")
+                    conn.execute(text(sql))
+
+            print("\n🎉 Migration Complete!")
+            print("=" * 60)
+
+        except Exception as e:
+            print(f"❌ Error during migration: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    migrate_trending_indexes()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the trending materialized views
+
+/api/trending/media and /api/trending/users aggregate likes, comments and
+reviews over the last N days on every cache miss. trending_media_mv and
+trending_users_mv precompute the counts and score for the standard
+1/7/30-day windows, so the endpoints become an indexed ORDER BY score
+LIMIT n. Only media/users with activity in a window are included. Safe to
+run again to add views missing from an older run.
+Refresh them with scripts/refresh_trending.py.
+Run this script: python migrate_trending_views.py
+"""
+
+from app import app
+from models import db
+from sqlalchemy import text
+
+# Keep in sync with TRENDING_WINDOWS in routes/trending.py
+TRENDING_WINDOWS = (1, 7, 30)
+
+def migrate_trending_views():
+    """Create trending_media_mv, trending_users_mv and their indexes"""
+    windows = ', '.join(f'({days})' for days in TRENDING_WINDOWS)
+    with app.app_context():
+        try:
+            print("🔥 Creating Trending Views...")
+            print("=" * 60)
+
+            with db.engine.connect() as conn:
+                print("⚙️  Creating trending_media_mv...")
+                # created_at columns hold naive UTC timestamps
+                conn.execute(text(f"""
+                    CREATE MATERIALIZED VIEW IF NOT EXISTS trending_media_mv AS
+                    WITH windows(window_days) AS (VALUES {windows}),
+                    likes AS (
+                        SELECT w.window_days, l.media_id, l.media_type, COUNT(*) AS n
+                        FROM windows w
+                        JOIN media_like l
+                          ON l.created_at >= (now() AT TIME ZONE 'utc') - make_interval(days => w.window_days)
+                        GROUP BY w.window_days, l.media_id, l.media_type
+                    ),
+                    comments AS (
+                        SELECT w.window_days, c.media_id, c.media_type, COUNT(*) AS n
+                        FROM windows w
+                        JOIN media_comment c
+                          ON c.created_at >= (now() AT TIME ZONE 'utc') - make_interval(days => w.window_days)
+                         AND NOT c.is_deleted
+                        GROUP BY w.window_days, c.media_id, c.media_type
+                    ),
+                    reviews AS (
+                        SELECT w.window_days, r.media_id, COUNT(*) AS n
+                        FROM windows w
+                        JOIN review r
+                          ON r.created_at >= (now() AT TIME ZONE 'utc') - make_interval(days => w.window_days)
+                        GROUP BY w.window_days, r.media_id
+                    ),
+                    counted AS (
+                        SELECT w.window_days, m.id, m.tmdb_id, m.media_type, m.title, m.poster_path,
+                               COALESCE(l.n, 0) AS like_count,
+                               COALESCE(c.n, 0) AS comment_count,
+                               COALESCE(r.n, 0) AS review_count
+                        FROM windows w
+                        CROSS JOIN media_item m
+                        LEFT JOIN likes l
+                          ON l.window_days = w.window_days AND l.media_id = m.tmdb_id AND l.media_type = m.media_type
+                        LEFT JOIN comments c
+                          ON c.window_days = w.window_days AND c.media_id = m.tmdb_id AND c.media_type = m.media_type
+                        LEFT JOIN reviews r
+                          ON r.window_days = w.window_days AND r.media_id = m.id
+                        WHERE l.n IS NOT NULL OR c.n IS NOT NULL OR r.n IS NOT NULL
+                    )
+                    SELECT counted.*, like_count * 2 + comment_count * 3 + review_count * 5 AS score
+                    FROM counted
+                """))
+
+                # The unique index is required for REFRESH ... CONCURRENTLY
+                print("⚙️  Creating indexes...")
+                conn.execute(text("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS ix_trending_media_mv_window_media
+                    ON trending_media_mv (window_days, id)
+                """))
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_trending_media_mv_score
+                    ON trending_media_mv (window_days, score DESC, id)
+                """))
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_trending_media_mv_type_score
+                    ON trending_media_mv (window_days, media_type, score DESC, id)
+                """))
+
+                print("⚙️  Creating trending_users_mv...")
+                conn.execute(text(f"""
+                    CREATE MATERIALIZED VIEW IF NOT EXISTS trending_users_mv AS
+                    WITH windows(window_days) AS (VALUES {windows}),
+                    activity AS (
+                        SELECT w.window_days, r.user_id, COUNT(*) AS reviews, 0 AS comments, 0 AS likes
+                        FROM windows w
+                        JOIN review r
+                          ON r.created_at >= (now() AT TIME ZONE 'utc') - make_interval(days => w.window_days)
+                        GROUP BY w.window_days, r.user_id
+                        UNION ALL
+                        SELECT w.window_days, c.user_id, 0, COUNT(*), 0
+                        FROM windows w
+                        JOIN media_comment c
+                          ON c.created_at >= (now() AT TIME ZONE 'utc') - make_interval(days => w.window_days)
+                         AND NOT c.is_deleted
+                        GROUP BY w.window_days, c.user_id
+                        UNION ALL
+                        SELECT w.window_days, l.user_id, 0, 0, COUNT(*)
+                        FROM windows w
+                        JOIN media_like l
+                          ON l.created_at >= (now() AT TIME ZONE 'utc') - make_interval(days => w.window_days)
+                        GROUP BY w.window_days, l.user_id
+                    )
+                    SELECT window_days, user_id,
+                           SUM(reviews)::bigint AS review_count,
+                           SUM(comments)::bigint AS comment_count,
+                           SUM(likes)::bigint AS like_count,
+                           (SUM(reviews) * 5 + SUM(comments) * 3 + SUM(likes))::bigint AS activity_score
+                    FROM activity
+                    GROUP BY window_days, user_id
+                """))
+                conn.execute(text("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS ix_trending_users_mv_window_user
+                    ON trending_users_mv (window_days, user_id)
+                """))
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_trending_users_mv_score
+                    ON trending_users_mv (window_days, activity_score DESC, user_id)
+                """))
+                conn.commit()
+
+            print("✅ Trending views created successfully!")
+            print("\n🎉 Migration Complete!")
+            print("=" * 60)
+
+        except Exception as e:
+            print(f"❌ Error during migration: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    migrate_trending_views()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Migration script to add indexes for the TV tracking endpoints
+
+Progress recounts group a user's first-time watches of a show by season,
+and the upcoming/calendar views select a user's shows by status and then
+those shows' episodes in a date range. Lookups of single watches use the
+uq_tv_episode_watch unique index (see migrate_episode_watch_unique.py).
+Indexes are built CONCURRENTLY so the live tables stay writable. Safe to
+run repeatedly.
+Run this script: python migrate_tv_tracking_indexes.py
+"""
+
+from app import app
+from models import db
+from sqlalchemy import text
+
+INDEXES = [
+    # (name, SQL)
+    ('ix_tv_episode_watch_counted',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tv_episode_watch_counted "
+     "ON tv_episode_watch (user_id, show_id, season_number) WHERE NOT is_rewatch"),
+    ('ix_tv_show_progress_user_status',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tv_show_progress_user_status "
+     "ON tv_show_progress (user_id, status)"),
+    ('ix_upcoming_episode_show_air',
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_upcoming_episode_show_air "
+     "ON upcoming_episode (show_id, air_date)"),
+]
+
+def migrate_tv_tracking_indexes():
+    """Create indexes for progress recounts and the upcoming/calendar views"""
+    with app.app_context():
+        try:
+            print("📺 Adding TV Tracking Indexes...")
+            print("=" * 60)
+
+            # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                for name, sql in INDEXES:
+                    print(f"⚙️  Creating {name}...")
+                    conn.execute(text(sql))
+
+            print("\n🎉 Migration Complete!")
+            print("=" * 60)
+
+        except Exception as e:
+            print(f"❌ Error during migration: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    migrate_tv_tracking_indexes()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the optimistic-locking version column
+
+Adds a 'version' counter to the review table. Review rows use it as
+SQLAlchemy's version_id_col; counter UPDATEs bump it.
+Run this script: python migrate_version_columns.py
+"""
+
+from app import app
+from models import db
+from sqlalchemy import text
+
+def migrate_version_columns():
+    """Add version column to review table"""
+    with app.app_context():
+        try:
+            print("🔢 Adding Version Columns...")
+            print("=" * 60)
+
+            inspector = db.inspect(db.engine)
+
+            for table in ['review']:
+                columns = [col['name'] for col in inspector.get_columns(table)]
+
+                if 'version' in columns:
+                    print(f"✅ {table}.version already exists!")
+                    continue
+
+                print(f"⚙️  Adding {table}.version...")
+                with db.engine.connect() as conn:
+                    conn.execute(text(f"""
+                        ALTER TABLE "{table}"
+                        ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0
+                    """))
+                    conn.commit()
+                print(f"✅ {table}.version added successfully!")
+
+            print("\n🎉 Migration Complete!")
+            print("=" * 60)
+
+        except Exception as e:
+            print(f"❌ Error during migration: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == '__main__':
+    migrate_version_columns()
@@ -2,7 +2,12 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin, current_user
 from datetime import datetime
+from types import SimpleNamespace
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import select, literal, table, column, exists, update, case, event, inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from api.cache import cache_get_many, cache_set_many
+from api.counter_buffer import counter_buffer
 
 db = SQLAlchemy()
 
@@ -33,6 +38,58 @@ user_viewed = db.Table('user_viewed',
     db.Column('rating', db.Integer)  # Optional rating from 1-10
 )
 
+# Materialized view of shared-media counts between pairs of users, one row per
+# direction. Created by migrates/migrate_taste_overlap.py and refreshed by
+# scripts/refresh_taste_overlap.py; not part of the metadata, so create_all skips it.
+user_taste_overlap = table('user_taste_overlap',
+    column('user_a'),
+    column('user_b'),
+    column('shared_count')
+)
+
+# Materialized views behind /api/stats/platform: one row of platform totals
+# and the most watched titles. Created by migrates/migrate_platform_stats.py
+# and refreshed by scripts/refresh_platform_stats.py.
+platform_stats_view = table('mv_platform_stats',
+    column('total_users'),
+    column('total_reviews'),
+    column('total_watched'),
+    column('average_rating')
+)
+most_watched_view = table('mv_most_watched',
+    column('media_id'),
+    column('media_type'),
+    column('title'),
+    column('watch_count')
+)
+
+# Trending media per standard window (1/7/30 days), with counts and score.
+# Created by migrates/migrate_trending_views.py and refreshed by
+# scripts/refresh_trending.py.
+trending_media_view = table('trending_media_mv',
+    column('window_days'),
+    column('id'),
+    column('tmdb_id'),
+    column('media_type'),
+    column('title'),
+    column('poster_path'),
+    column('like_count'),
+    column('comment_count'),
+    column('review_count'),
+    column('score')
+)
+
+# Activity counts and score per user for the same windows; user details are
+# joined at read time. Created and refreshed alongside trending_media_mv.
+trending_users_view = table('trending_users_mv',
+    column('window_days'),
+    column('user_id'),
+    column('review_count'),
+    column('comment_count'),
+    column('like_count'),
+    column('activity_score')
+)
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -107,6 +164,46 @@ class MediaItem(db.Model):
         return f'<MediaItem {self.title}>'
 
 
+class MediaGenre(db.Model):
+    """One row per genre of a media item, split out of MediaItem.genres for indexed grouping"""
+    __tablename__ = 'media_genre'
+    
+    media_id = db.Column(db.Integer, db.ForeignKey('media_item.id', ondelete='CASCADE'), primary_key=True)
+    genre = db.Column(db.String(50), primary_key=True, index=True)
+    
+    @staticmethod
+    def parse(genres):
+        """Distinct, trimmed labels from a comma-separated genres string"""
+        return list(dict.fromkeys(g.strip()[:50] for g in (genres or '').split(',') if g.strip()))
+    
+    @classmethod
+    def sync(cls, media, connection):
+        """Replace a media item's genre rows with the labels in media.genres"""
+        connection.execute(db.delete(cls).where(cls.media_id == media.id))
+        labels = cls.parse(media.genres)
+        if labels:
+            connection.execute(pg_insert(cls).values([
+                {'media_id': media.id, 'genre': label} for label in labels
+            ]).on_conflict_do_nothing())
+    
+    def __repr__(self):
+        return f'<MediaGenre {self.media_id} {self.genre}>'
+
+
+# Keep media_genre in step with every ORM write of MediaItem.genres, in the
+# same flush, whichever route creates or edits the item
+@event.listens_for(MediaItem, 'after_insert')
+def _sync_new_media_genres(mapper, connection, media):
+    if media.genres:
+        MediaGenre.sync(media, connection)
+
+
+@event.listens_for(MediaItem, 'after_update')
+def _sync_changed_media_genres(mapper, connection, media):
+    if inspect(media).attrs.genres.history.has_changes():
+        MediaGenre.sync(media, connection)
+
+
 class Review(db.Model):
     """User-generated movie/TV show reviews"""
     __tablename__ = 'review'
@@ -135,6 +232,9 @@ class Review(db.Model):
     not_helpful_count = db.Column(db.Integer, default=0)  # Week 3: not helpful votes
     comments_count = db.Column(db.Integer, default=0)
     
+    # Optimistic concurrency token (checked on ORM flushes, bumped by counter UPDATEs)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
     # Relationships
     user = db.relationship('User', backref=db.backref('user_reviews', lazy='dynamic'))
     media = db.relationship('MediaItem', backref=db.backref('user_reviews', lazy='dynamic'))
@@ -148,10 +248,108 @@ class Review(db.Model):
     __table_args__ = (
         db.UniqueConstraint('user_id', 'media_id', 'media_type', name='unique_user_media_review'),
         db.CheckConstraint('rating >= 0.5 AND rating <= 5.0', name='valid_rating'),
+        # Keyset-paginated feeds seek on (created_at, id) over live reviews
+        db.Index('ix_review_live_created_id', created_at.desc(), id.desc(),
+                 postgresql_where=db.text('NOT is_deleted')),
+        # Per-user rating stats (averages, distributions) over live reviews
+        db.Index('ix_review_user_active_rating', 'user_id', 'rating',
+                 postgresql_where=db.text('NOT is_deleted AND rating IS NOT NULL')),
+        # Trending windows: recent reviews grouped by media or by user
+        db.Index('ix_review_trending', created_at.desc(), 'media_id', 'user_id'),
     )
+    __mapper_args__ = {'version_id_col': version}
+    
+    # Seconds a serialized review stays cached; keys carry the row version,
+    # so counter/content changes are picked up immediately
+    DICT_CACHE_TTL = 300
+    
+    @classmethod
+    def update_counters(cls, review_id, **deltas):
+        """
+        Apply counter deltas to a live review in a single UPDATE ... RETURNING.
+        Increments happen server-side so concurrent requests can't lose updates,
+        and the version is bumped so stale ORM copies fail their optimistic check.
+        Returns the new counter values, or None if the review is missing/deleted.
+        
+        With the write-behind counter buffer enabled the deltas are queued instead,
+        reaching the buffer only if this transaction commits, and the returned
+        values are the stored counts plus pending deltas plus this request's own.
+        """
+        if counter_buffer.enabled:
+            stored = db.session.query(
+                *[getattr(cls, name) for name in deltas]
+            ).filter(cls.id == review_id, cls.is_deleted == False).first()
+            if stored is None:
+                return None
+            
+            counters = {}
+            for name, delta in deltas.items():
+                pending = counter_buffer.pending(cls, review_id, name)
+                counter_buffer.incr_on_commit(db.session, cls, review_id, name, delta)
+                counters[name] = max(0, (getattr(stored, name) or 0) + pending + delta)
+            return SimpleNamespace(**counters)
+        
+        values = {}
+        if any(deltas.values()):
+            values['version'] = cls.version + 1
+        for name, delta in deltas.items():
+            col = getattr(cls, name)
+            if delta < 0:
+                values[name] = case((col + delta > 0, col + delta), else_=0)
+            else:
+                values[name] = col + delta
+        
+        stmt = update(cls).where(
+            cls.id == review_id,
+            cls.is_deleted == False
+        ).values(values).returning(*[getattr(cls, name) for name in deltas])
+        
+        return db.session.execute(stmt, execution_options={'synchronize_session': False}).first()
     
     def to_dict(self):
         """Convert review to dictionary for JSON responses"""
+        data = self._shared_dict()
+        data['is_author_self'] = current_user.is_authenticated and self.user_id == current_user.id
+        return data
+    
+    @classmethod
+    def to_dict_many(cls, reviews):
+        """Serialize a page of reviews, reusing cached dicts for unchanged rows"""
+        keys = [f'review:{review.id}:{review.version}' for review in reviews]
+        cached = cache_get_many(keys)
+        viewer_id = current_user.id if current_user.is_authenticated else None
+        
+        # Rows that must be serialized need their author and media; load them
+        # for the whole page in one IN query each instead of one lazy load per row.
+        # Kept referenced so the many-to-one lazy loads resolve from the identity map.
+        uncached = [review for review, key in zip(reviews, keys) if key not in cached]
+        related = cls._prefetch_related(uncached)
+        
+        results = []
+        misses = {}
+        for review, key in zip(reviews, keys):
+            data = cached.get(key)
+            if data is None:
+                data = misses[key] = review._shared_dict()
+            results.append(dict(data, is_author_self=review.user_id == viewer_id))
+        
+        cache_set_many(misses, cls.DICT_CACHE_TTL)
+        return results
+    
+    @staticmethod
+    def _prefetch_related(reviews):
+        """Load the users and media items referenced by reviews into the session"""
+        if not reviews:
+            return []
+        user_ids = {review.user_id for review in reviews}
+        media_ids = {review.media_id for review in reviews}
+        return (
+            User.query.filter(User.id.in_(user_ids)).all() +
+            MediaItem.query.filter(MediaItem.id.in_(media_ids)).all()
+        )
+    
+    def _shared_dict(self):
+        """The viewer-independent part of to_dict()"""
         return {
             'id': self.id,
             'user': {
@@ -174,8 +372,7 @@ class Review(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'contains_spoilers': self.contains_spoilers,
             'likes_count': self.likes_count,
-            'comments_count': self.comments_count,
-            'is_author_self': current_user.is_authenticated and self.user_id == current_user.id
+            'comments_count': self.comments_count
         }
     
     def __repr__(self):
@@ -222,11 +419,21 @@ class ReviewComment(db.Model):
     user = db.relationship('User', backref=db.backref('review_comments', lazy='dynamic'))
     replies = db.relationship('ReviewComment', backref=db.backref('parent_comment', remote_side=[id]), lazy='dynamic', cascade='all, delete-orphan')
     
+    # Backs the "top-level replies of a review, oldest first" listing without a sort step
+    __table_args__ = (
+        db.Index('ix_review_comment_thread', 'review_id', 'parent_id', 'is_deleted', 'created_at'),
+    )
+    
     def __init__(self, **kwargs):
         super(ReviewComment, self).__init__(**kwargs)
     
-    def to_dict(self):
-        """Convert comment to dictionary for JSON responses"""
+    def to_dict(self, reply_count=None):
+        """Convert comment to dictionary for JSON responses
+        
+        Pass reply_count when it was already fetched in bulk to skip the COUNT query.
+        """
+        if reply_count is None:
+            reply_count = self.replies.filter_by(is_deleted=False).count()
         return {
             'id': self.id,
             'user': {
@@ -238,7 +445,7 @@ class ReviewComment(db.Model):
             'parent_id': self.parent_id,
             'content': self.content,
             'created_at': self.created_at.isoformat(),
-            'reply_count': self.replies.filter_by(is_deleted=False).count()
+            'reply_count': reply_count
         }
     
     def __repr__(self):
@@ -294,8 +501,38 @@ class UserFollow(db.Model):
     __table_args__ = (
         db.UniqueConstraint('follower_id', 'following_id', name='unique_follower_following'),
         db.CheckConstraint('follower_id != following_id', name='no_self_follow'),
+        # Partial indexes covering the hot "active follow" lookups in both directions
+        db.Index('ix_user_follow_follower_active', 'follower_id', 'following_id',
+                 postgresql_where=db.text('is_active')),
+        db.Index('ix_user_follow_following_active', 'following_id', 'follower_id',
+                 postgresql_where=db.text('is_active')),
+        # Keyset-paginated follower/following lists, newest first
+        db.Index('ix_user_follow_following_created', following_id, created_at.desc(), id.desc(),
+                 postgresql_where=db.text('is_active')),
+        db.Index('ix_user_follow_follower_created', follower_id, created_at.desc(), id.desc(),
+                 postgresql_where=db.text('is_active')),
     )
     
+    @classmethod
+    def is_following(cls, follower_id, following_id):
+        """Whether follower_id actively follows following_id (a single EXISTS, no row load)"""
+        return db.session.query(exists().where(
+            cls.follower_id == follower_id,
+            cls.following_id == following_id,
+            cls.is_active == True
+        )).scalar()
+    
+    @classmethod
+    def followed_ids(cls, follower_id, user_ids):
+        """The subset of user_ids that follower_id actively follows, in one IN query"""
+        if not user_ids:
+            return set()
+        return {row[0] for row in db.session.query(cls.following_id).filter(
+            cls.follower_id == follower_id,
+            cls.following_id.in_(user_ids),
+            cls.is_active == True
+        ).all()}
+    
     def to_dict(self):
         """Convert follow relationship to dictionary for JSON responses"""
         return {
@@ -317,6 +554,71 @@ class UserFollow(db.Model):
         return f'<UserFollow {self.follower_id} -> {self.following_id}>'
 
 
+class FeedEntry(db.Model):
+    """Fan-out-on-write activity feed: one row per follower per review by someone they follow"""
+    __tablename__ = 'feed_entry'
+    
+    # How many of an author's recent reviews are copied in when someone follows them
+    BACKFILL_LIMIT = 100
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)  # Feed owner
+    review_id = db.Column(db.Integer, db.ForeignKey('review.id'), primary_key=True)
+    author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)  # Copy of review.created_at
+    
+    __table_args__ = (
+        # Feed page = one range scan in display order
+        db.Index('ix_feed_entry_user_created', user_id, created_at.desc(), review_id.desc()),
+        # Unfollow removes one author's entries from one feed
+        db.Index('ix_feed_entry_user_author', user_id, author_id),
+    )
+    
+    @classmethod
+    def fan_out(cls, review):
+        """Copy a new review into the feed of everyone following its author"""
+        followers = select(
+            UserFollow.follower_id,
+            literal(review.user_id),
+            literal(review.id),
+            literal(review.created_at)
+        ).where(
+            UserFollow.following_id == review.user_id,
+            UserFollow.is_active == True
+        )
+        db.session.execute(
+            pg_insert(cls).from_select(['user_id', 'author_id', 'review_id', 'created_at'], followers)
+            .on_conflict_do_nothing()
+        )
+    
+    @classmethod
+    def backfill(cls, follower_id, author_ids):
+        """Copy recent reviews by newly followed authors into a follower's feed"""
+        for author_id in author_ids:
+            recent = select(
+                literal(follower_id), Review.user_id, Review.id, Review.created_at
+            ).where(
+                Review.user_id == author_id,
+                Review.is_deleted == False
+            ).order_by(Review.created_at.desc()).limit(cls.BACKFILL_LIMIT)
+            db.session.execute(
+                pg_insert(cls).from_select(['user_id', 'author_id', 'review_id', 'created_at'], recent)
+                .on_conflict_do_nothing()
+            )
+    
+    @classmethod
+    def remove_author(cls, follower_id, author_id):
+        """Drop an unfollowed author's reviews from a follower's feed"""
+        cls.query.filter_by(user_id=follower_id, author_id=author_id).delete(synchronize_session=False)
+    
+    @classmethod
+    def remove_review(cls, review_id):
+        """Drop a deleted review from every feed"""
+        cls.query.filter_by(review_id=review_id).delete(synchronize_session=False)
+    
+    def __repr__(self):
+        return f'<FeedEntry user={self.user_id} review={self.review_id}>'
+
+
 class UserList(db.Model):
     """User-created custom lists of movies/TV shows"""
     __tablename__ = 'user_list'
@@ -565,6 +867,10 @@ class DiaryEntry(db.Model):
     media_id = db.Column(db.Integer, db.ForeignKey('media_item.id'), nullable=False, index=True)
     media_type = db.Column(db.String(20), nullable=False)  # 'movie' or 'tv'
     watched_date = db.Column(db.Date, nullable=False, index=True)
+    # Stored copies of the date's year/month so stats filter and group on
+    # plain indexed columns instead of extract() per row
+    watched_year = db.Column(db.SmallInteger, db.Computed('EXTRACT(year FROM watched_date)::smallint', persisted=True))
+    watched_month = db.Column(db.SmallInteger, db.Computed('EXTRACT(month FROM watched_date)::smallint', persisted=True))
     rating = db.Column(db.Float)  # Optional rating 0.5 to 5.0
     review_id = db.Column(db.Integer, db.ForeignKey('review.id'), nullable=True)  # Optional linked review
     is_rewatch = db.Column(db.Boolean, default=False)
@@ -578,6 +884,10 @@ class DiaryEntry(db.Model):
     # Constraints
     __table_args__ = (
         db.CheckConstraint('rating IS NULL OR (rating >= 0.5 AND rating <= 5.0)', name='valid_diary_rating'),
+        # Stats scan one user's diary by date; INCLUDE lets media lookups skip the heap
+        db.Index('ix_diary_user_watched', 'user_id', 'watched_date',
+                 postgresql_include=['media_id', 'media_type']),
+        db.Index('ix_diary_user_year_month', 'user_id', 'watched_year', 'watched_month'),
     )
     
     def __init__(self, **kwargs):
@@ -621,6 +931,15 @@ class Tag(db.Model):
     # Relationships
     user_media_tags = db.relationship('UserMediaTag', backref='tag', cascade='all, delete-orphan', lazy='dynamic')
     
+    __table_args__ = (
+        # Popular tags: index-only scan in (usage_count, id) order over used tags
+        db.Index('ix_tag_popular', usage_count.desc(), id.desc(),
+                 postgresql_where=db.text('usage_count > 0'),
+                 postgresql_include=['name']),
+        # Autocomplete prefix search (LIKE 'q%') regardless of the database collation
+        db.Index('ix_tag_name_pattern', 'name', postgresql_ops={'name': 'varchar_pattern_ops'}),
+    )
+    
     def __init__(self, **kwargs):
         """Initialize Tag with keyword arguments"""
         super(Tag, self).__init__(**kwargs)
@@ -655,6 +974,10 @@ class UserMediaTag(db.Model):
     # Constraints - each user can only tag a media with the same tag once
     __table_args__ = (
         db.UniqueConstraint('user_id', 'media_id', 'media_type', 'tag_id', name='unique_user_media_tag'),
+        # A user's tag list groups their rows by tag
+        db.Index('ix_user_media_tag_user_tag', 'user_id', 'tag_id'),
+        # Trending tags: recent rows grouped by tag
+        db.Index('ix_user_media_tag_trending', created_at.desc(), 'tag_id'),
     )
     
     def __init__(self, **kwargs):
@@ -692,6 +1015,9 @@ class MediaLike(db.Model):
     # Constraints - one like per user per media
     __table_args__ = (
         db.UniqueConstraint('user_id', 'media_id', 'media_type', name='unique_user_media_like'),
+        # Trending windows: recent likes grouped by media or by user
+        db.Index('ix_media_like_trending', created_at.desc(), 'media_id', 'media_type',
+                 postgresql_include=['user_id']),
     )
     
     def __init__(self, **kwargs):
@@ -728,6 +1054,12 @@ class MediaComment(db.Model):
     # Relationships
     user = db.relationship('User', backref=db.backref('media_comments', lazy='dynamic'))
     
+    __table_args__ = (
+        # Trending windows: recent live comments grouped by media or by user
+        db.Index('ix_media_comment_trending', created_at.desc(), 'media_id', 'media_type',
+                 postgresql_include=['user_id'], postgresql_where=db.text('NOT is_deleted')),
+    )
+    
     def __init__(self, **kwargs):
         """Initialize MediaComment with keyword arguments"""
         super(MediaComment, self).__init__(**kwargs)
@@ -785,6 +1117,8 @@ class TVShowProgress(db.Model):
     # Constraints - one progress entry per user per show
     __table_args__ = (
         db.UniqueConstraint('user_id', 'show_id', name='unique_user_show_progress'),
+        # Upcoming/calendar views pick a user's shows by status
+        db.Index('ix_tv_show_progress_user_status', 'user_id', 'status'),
     )
     
     def __init__(self, **kwargs):
@@ -849,7 +1183,11 @@ class TVEpisodeWatch(db.Model):
     # Constraints
     __table_args__ = (
         db.CheckConstraint('rating IS NULL OR (rating >= 0.5 AND rating <= 5.0)', name='valid_episode_rating'),
-        db.Index('idx_user_show_season_episode', 'user_id', 'show_id', 'season_number', 'episode_number'),
+        # One watch row per user and episode; mark-season upserts against it
+        db.UniqueConstraint('user_id', 'show_id', 'season_number', 'episode_number', name='uq_tv_episode_watch'),
+        # Progress recounts group a show's first-time watches by season
+        db.Index('ix_tv_episode_watch_counted', 'user_id', 'show_id', 'season_number',
+                 postgresql_where=db.text('NOT is_rewatch')),
     )
     
     def __init__(self, **kwargs):
@@ -906,6 +1244,8 @@ class UpcomingEpisode(db.Model):
     __table_args__ = (
         db.UniqueConstraint('show_id', 'season_number', 'episode_number', name='unique_episode'),
         db.Index('idx_air_date', 'air_date'),
+        # Upcoming/calendar views: tracked shows' episodes in a date range
+        db.Index('ix_upcoming_episode_show_air', 'show_id', 'air_date'),
     )
     
     def __init__(self, **kwargs):
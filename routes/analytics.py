@@ -2,20 +2,27 @@
 Analytics API Routes
 Handles data aggregation for user statistics and charts
 """
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, abort
 from flask_login import current_user, login_required
 from models import db, User, Review, MediaItem, user_viewed
-from sqlalchemy import func, extract
+from sqlalchemy import func, extract, select
 from collections import Counter
+import heapq
 from datetime import datetime, timedelta
 
 analytics = Blueprint('analytics', __name__)
 
+# Rows fetched per round trip when streaming a user's full review history
+STREAM_BATCH_SIZE = 1000
+
 @analytics.route('/api/users/<int:user_id>/stats', methods=['GET'])
 @login_required
 def get_user_stats(user_id):
     """Get aggregated statistics for a specific user"""
-    user = User.query.get_or_404(user_id)
+    # Only the username is shown, so skip loading the whole User row
+    username = db.session.query(User.username).filter(User.id == user_id).scalar()
+    if username is None:
+        abort(404)
     
     # 1. basic counts
     total_reviews = Review.query.filter_by(user_id=user_id, is_deleted=False).count()
@@ -61,10 +68,15 @@ def get_user_stats(user_id):
     }
 
     # 3. Genre Distribution & Performance
-    # Get all media items reviewed by user
-    media_items_query = db.session.query(MediaItem.genres, Review.rating).join(
-        Review, MediaItem.id == Review.media_id
-    ).filter(Review.user_id == user_id, Review.is_deleted == False).all()
+    # Stream (genres, rating) for every media item reviewed by user: yield_per
+    # turns on stream_results, so rows come from a server-side cursor in
+    # batches instead of one list of all reviews
+    media_items_query = db.session.execute(
+        select(MediaItem.genres, Review.rating).join(
+            Review, MediaItem.id == Review.media_id
+        ).where(Review.user_id == user_id, Review.is_deleted == False),
+        execution_options={'yield_per': STREAM_BATCH_SIZE}
+    )
     
     genre_counts = Counter()
     genre_ratings = {} # genre -> [ratings]
@@ -91,11 +103,11 @@ def get_user_stats(user_id):
         avg = sum(ratings) / len(ratings)
         perf_list.append((g, round(avg, 2), len(ratings)))
     
-    # Sort by avg rating, then count
-    perf_list.sort(key=lambda x: (x[1], x[2]), reverse=True)
+    # Best 5 by avg rating, then count (a heap; no need to sort every genre)
+    top_perf = heapq.nlargest(5, perf_list, key=lambda x: (x[1], x[2]))
     perf_data = {
-        'labels': [p[0] for p in perf_list[:5]],
-        'data': [p[1] for p in perf_list[:5]]
+        'labels': [p[0] for p in top_perf],
+        'data': [p[1] for p in top_perf]
     }
     
     # 4. Monthly Activity (last 6 months)
@@ -122,7 +134,7 @@ def get_user_stats(user_id):
     
     return jsonify({
         'user_id': user_id,
-        'username': user.username,
+        'username': username,
         'stats': {
             'total_reviews': total_reviews,
             'total_watched': total_watched,
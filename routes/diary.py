@@ -6,6 +6,8 @@ from flask import Blueprint, request, jsonify, render_template
 from flask_login import login_required, current_user
 from models import db, User, DiaryEntry, MediaItem, Review
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from api.cache import bump_version
 from datetime import datetime, date
 import requests
 import os
@@ -32,13 +34,16 @@ def get_diary_entries():
     month = request.args.get('month', type=int)
     
     # Build query
-    query = current_user.diary_entries.order_by(DiaryEntry.watched_date.desc(), DiaryEntry.created_at.desc())
+    # Media items for the page come from one IN query instead of a lazy load per entry
+    query = current_user.diary_entries.options(
+        selectinload(DiaryEntry.media)
+    ).order_by(DiaryEntry.watched_date.desc(), DiaryEntry.created_at.desc())
     
     # Filter by year/month if provided
     if year:
-        query = query.filter(db.extract('year', DiaryEntry.watched_date) == year)
+        query = query.filter(DiaryEntry.watched_year == year)
     if month:
-        query = query.filter(db.extract('month', DiaryEntry.watched_date) == month)
+        query = query.filter(DiaryEntry.watched_month == month)
     
     # Paginate
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
@@ -62,7 +67,10 @@ def get_user_diary(user_id):
     per_page = request.args.get('per_page', 20, type=int)
     
     # Query diary entries
-    query = user.diary_entries.order_by(DiaryEntry.watched_date.desc(), DiaryEntry.created_at.desc())
+    # Media items for the page come from one IN query instead of a lazy load per entry
+    query = user.diary_entries.options(
+        selectinload(DiaryEntry.media)
+    ).order_by(DiaryEntry.watched_date.desc(), DiaryEntry.created_at.desc())
     
     # Paginate
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
@@ -157,6 +165,7 @@ def log_diary_entry():
         current_user.total_movies_watched = (current_user.total_movies_watched or 0) + 1
         
         db.session.commit()
+        bump_version(f'stats:{current_user.id}')
         
         return jsonify({
             'message': f'Logged {media_item.title} to diary',
@@ -189,6 +198,7 @@ def update_diary_entry(entry_id):
             entry.rating = data['rating']
         
         db.session.commit()
+        bump_version(f'stats:{current_user.id}')
         
         return jsonify({
             'message': 'Diary entry updated successfully',
@@ -219,6 +229,7 @@ def delete_diary_entry(entry_id):
         current_user.total_movies_watched = max(0, (current_user.total_movies_watched or 0) - 1)
         
         db.session.commit()
+        bump_version(f'stats:{current_user.id}')
         
         return jsonify({'message': 'Diary entry deleted successfully'}), 200
         
@@ -779,12 +779,7 @@ def user_profile(user_id):
     # Check if current user follows this user
     is_following = False
     if current_user.is_authenticated:
-        follow = UserFollow.query.filter_by(
-            follower_id=current_user.id,
-            following_id=user_id,
-            is_active=True
-        ).first()
-        is_following = follow is not None
+        is_following = UserFollow.is_following(current_user.id, user_id)
     
     # Get user reviews
     recent_reviews = user.user_reviews.order_by(db.desc(Review.created_at)).limit(5).all()
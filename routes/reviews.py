@@ -4,9 +4,12 @@ Handles CRUD operations for user-generated reviews
 """
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from models import db, Review, ReviewLike, ReviewComment, MediaItem, User, UserFollow
+from models import db, Review, FeedEntry, ReviewLike, ReviewComment, MediaItem, User, UserFollow
 from datetime import datetime
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from api.cache import bump_version
+from api.pagination import window_paginate
 
 reviews = Blueprint('reviews', __name__)
 
@@ -67,12 +70,18 @@ def create_review():
         )
         
         db.session.add(review)
+        db.session.flush()
+        
+        # Push the review into followers' feeds in the same transaction
+        FeedEntry.fan_out(review)
         
         # Update user stats
         current_user.total_reviews = (current_user.total_reviews or 0) + 1
         current_user.total_movies_watched = (current_user.total_movies_watched or 0) + 1
         
         db.session.commit()
+        bump_version('reviews')
+        bump_version(f'stats:{current_user.id}')
         
         return jsonify({
             'message': 'Review created successfully',
@@ -139,12 +148,17 @@ def update_review(review_id):
         review.updated_at = datetime.utcnow()
         
         db.session.commit()
+        bump_version('reviews')
+        bump_version(f'stats:{current_user.id}')
         
         return jsonify({
             'message': 'Review updated successfully',
             'review': review.to_dict()
         }), 200
         
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({'error': 'Review was modified by another request, please retry'}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -166,14 +180,20 @@ def delete_review(review_id):
     try:
         # Soft delete
         review.is_deleted = True
+        FeedEntry.remove_review(review.id)
         
         # Update user stats
         current_user.total_reviews = max(0, (current_user.total_reviews or 0) - 1)
         
         db.session.commit()
+        bump_version('reviews')
+        bump_version(f'stats:{current_user.id}')
         
         return jsonify({'message': 'Review deleted successfully'}), 200
         
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({'error': 'Review was modified by another request, please retry'}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -209,9 +229,13 @@ def create_comment(review_id):
         )
         
         db.session.add(comment)
+        db.session.flush()
         
-        # Update review comment count
-        review.comments_count = (review.comments_count or 0) + 1
+        # Update review comment count server-side; the loaded review is not
+        # modified, so its version is never checked against the bumped row
+        if Review.update_counters(review_id, comments_count=1) is None:
+            db.session.rollback()
+            return jsonify({'error': 'Review not found'}), 404
         
         db.session.commit()
         
@@ -267,14 +291,24 @@ def get_media_reviews(media_type, tmdb_id):
     ).order_by(Review.created_at.desc())
     
     # Paginate
-    pagination = reviews_query.paginate(page=page, per_page=per_page, error_out=False)
+    pagination = window_paginate(reviews_query, page, per_page)
     
-    reviews_data = [review.to_dict() for review in pagination.items]
+    reviews_data = Review.to_dict_many(pagination.items)
     
     # Check which reviews current user has liked and authors they follow (if logged in)
     if current_user.is_authenticated:
-        liked_review_ids = {like.review_id for like in ReviewLike.query.filter_by(user_id=current_user.id).all()}
-        followed_user_ids = {follow.following_id for follow in UserFollow.query.filter_by(follower_id=current_user.id, is_active=True).all()}
+        # Only look up likes/follows for the reviews and authors on this page
+        review_ids = [review.id for review in pagination.items]
+        author_ids = list({review.user_id for review in pagination.items})
+        liked_review_ids = {row[0] for row in db.session.query(ReviewLike.review_id).filter(
+            ReviewLike.user_id == current_user.id,
+            ReviewLike.review_id.in_(review_ids)
+        ).all()} if review_ids else set()
+        followed_user_ids = {row[0] for row in db.session.query(UserFollow.following_id).filter(
+            UserFollow.follower_id == current_user.id,
+            UserFollow.following_id.in_(author_ids),
+            UserFollow.is_active == True
+        ).all()} if author_ids else set()
         for review_data in reviews_data:
             review_data['is_liked_by_user'] = review_data['id'] in liked_review_ids
             # Pass user id of the author to check against followed_user_ids
@@ -312,9 +346,9 @@ def get_user_reviews(user_id):
     ).order_by(Review.created_at.desc())
     
     # Paginate
-    pagination = reviews_query.paginate(page=page, per_page=per_page, error_out=False)
+    pagination = window_paginate(reviews_query, page, per_page)
     
-    reviews_data = [review.to_dict() for review in pagination.items]
+    reviews_data = Review.to_dict_many(pagination.items)
     
     return jsonify({
         'reviews': reviews_data,
@@ -4,12 +4,32 @@ Adds helpful votes and enhanced discovery features
 """
 from flask import Blueprint, request, jsonify, render_template
 from flask_login import login_required, current_user
-from models import db, Review, ReviewLike, ReviewHelpful, ReviewComment, User, UserFollow, MediaItem
+from models import db, Review, FeedEntry, ReviewLike, ReviewHelpful, ReviewComment, User, UserFollow, MediaItem
 from datetime import datetime, date
-from sqlalchemy import desc, func, and_
+from sqlalchemy import desc, func, and_, case, update, delete, exists, literal_column, select, bindparam
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
+from api.cache import bump_version
+from api.pagination import window_paginate
 
 reviews_enhanced_bp = Blueprint('reviews_enhanced', __name__)
 
+# Viewer state for get_review (uid/rid) and the 403-vs-404 check in delete_review_reply
+LIKE_EXISTS = select(exists().where(
+    ReviewLike.user_id == bindparam('uid'),
+    ReviewLike.review_id == bindparam('rid')
+))
+HELPFUL_VOTE = select(ReviewHelpful.is_helpful).where(
+    ReviewHelpful.user_id == bindparam('uid'),
+    ReviewHelpful.review_id == bindparam('rid')
+)
+LIVE_REPLY_EXISTS = select(exists().where(
+    ReviewComment.id == bindparam('reply_id'),
+    ReviewComment.is_deleted == False
+))
+
 
 # ============================================================================
 # REVIEW FEED PAGES (HTML)
@@ -89,7 +109,14 @@ def create_review():
         )
         
         db.session.add(review)
+        db.session.flush()
+        
+        # Push the review into followers' feeds in the same transaction
+        FeedEntry.fan_out(review)
+        
         db.session.commit()
+        bump_version('reviews')
+        bump_version(f'stats:{current_user.id}')
         
         return jsonify({
             'message': 'Review created successfully',
@@ -111,17 +138,9 @@ def get_review(review_id):
     user_helpful_vote = None
     
     if current_user.is_authenticated:
-        user_liked = ReviewLike.query.filter_by(
-            user_id=current_user.id,
-            review_id=review_id
-        ).first() is not None
-        
-        helpful_vote = ReviewHelpful.query.filter_by(
-            user_id=current_user.id,
-            review_id=review_id
-        ).first()
-        if helpful_vote:
-            user_helpful_vote = helpful_vote.is_helpful
+        params = {'uid': current_user.id, 'rid': review_id}
+        user_liked = db.session.execute(LIKE_EXISTS, params).scalar()
+        user_helpful_vote = db.session.execute(HELPFUL_VOTE, params).scalar()
     
     review_data = review.to_dict()
     review_data['user_liked'] = user_liked
@@ -176,12 +195,17 @@ def update_review(review_id):
         
         review.updated_at = datetime.utcnow()
         db.session.commit()
+        bump_version('reviews')
+        bump_version(f'stats:{current_user.id}')
         
         return jsonify({
             'message': 'Review updated successfully',
             'review': review.to_dict()
         }), 200
         
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({'error': 'Review was modified by another request, please retry'}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -199,10 +223,16 @@ def delete_review(review_id):
     
     try:
         review.is_deleted = True
+        FeedEntry.remove_review(review.id)
         db.session.commit()
+        bump_version('reviews')
+        bump_version(f'stats:{current_user.id}')
         
         return jsonify({'message': 'Review deleted successfully'}), 200
         
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({'error': 'Review was modified by another request, please retry'}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -256,7 +286,7 @@ def get_media_reviews(media_id):
         query = query.order_by(desc(Review.created_at))
     
     # Paginate
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    pagination = window_paginate(query, page, per_page)
     
     # Calculate average rating using internal media_item.id
     avg_rating = db.session.query(func.avg(Review.rating)).filter_by(
@@ -266,7 +296,7 @@ def get_media_reviews(media_id):
     ).scalar()
     
     return jsonify({
-        'reviews': [review.to_dict() for review in pagination.items],
+        'reviews': Review.to_dict_many(pagination.items),
         'total': pagination.total,
         'pages': pagination.pages,
         'current_page': page,
@@ -315,10 +345,10 @@ def review_feed():
     query = query.order_by(desc(Review.created_at))
     
     # Paginate
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    pagination = window_paginate(query, page, per_page)
     
     return jsonify({
-        'reviews': [review.to_dict() for review in pagination.items],
+        'reviews': Review.to_dict_many(pagination.items),
         'total': pagination.total,
         'pages': pagination.pages,
         'current_page': page,
@@ -354,10 +384,10 @@ def popular_reviews():
     query = query.order_by(desc(Review.likes_count + Review.helpful_count))
     
     # Paginate
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    pagination = window_paginate(query, page, per_page)
     
     return jsonify({
-        'reviews': [review.to_dict() for review in pagination.items],
+        'reviews': Review.to_dict_many(pagination.items),
         'total': pagination.total,
         'pages': pagination.pages,
         'current_page': page,
@@ -381,7 +411,7 @@ def user_reviews(user_id):
     ).order_by(desc(Review.created_at))
     
     # Paginate
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    pagination = window_paginate(query, page, per_page)
     
     return jsonify({
         'user': {
@@ -406,34 +436,34 @@ def user_reviews(user_id):
 @login_required
 def like_review(review_id):
     """Like a review"""
-    review = Review.query.filter_by(id=review_id, is_deleted=False).first_or_404()
-    
-    # Check if already liked
-    existing = ReviewLike.query.filter_by(
-        user_id=current_user.id,
-        review_id=review_id
-    ).first()
-    
-    if existing:
-        return jsonify({'error': 'You already liked this review'}), 400
-    
     try:
-        like = ReviewLike(
-            user_id=current_user.id,
-            review_id=review_id
+        # Insert the like; the unique constraint decides whether it already existed
+        result = db.session.execute(
+            insert(ReviewLike).values(
+                user_id=current_user.id,
+                review_id=review_id
+            ).on_conflict_do_nothing(index_elements=['user_id', 'review_id'])
         )
-        db.session.add(like)
+        if result.rowcount == 0:
+            db.session.rollback()
+            return jsonify({'error': 'You already liked this review'}), 400
         
-        # Update like count
-        review.likes_count += 1
+        # Update like count only for a like that was actually added
+        counters = Review.update_counters(review_id, likes_count=1)
+        if counters is None:
+            db.session.rollback()
+            return jsonify({'error': 'Review not found'}), 404
         
         db.session.commit()
         
         return jsonify({
             'message': 'Review liked',
-            'like_count': review.likes_count
+            'like_count': counters.likes_count
         }), 201
         
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Review not found'}), 404
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -443,25 +473,29 @@ def like_review(review_id):
 @login_required
 def unlike_review(review_id):
     """Unlike a review"""
-    review = Review.query.filter_by(id=review_id, is_deleted=False).first_or_404()
-    
-    like = ReviewLike.query.filter_by(
-        user_id=current_user.id,
-        review_id=review_id
-    ).first_or_404()
-    
     try:
-        db.session.delete(like)
+        result = db.session.execute(
+            delete(ReviewLike).where(
+                ReviewLike.user_id == current_user.id,
+                ReviewLike.review_id == review_id
+            ),
+            execution_options={'synchronize_session': False}
+        )
+        if result.rowcount == 0:
+            db.session.rollback()
+            return jsonify({'error': 'You have not liked this review'}), 404
         
         # Update like count
-        if review.likes_count > 0:
-            review.likes_count -= 1
+        counters = Review.update_counters(review_id, likes_count=-1)
+        if counters is None:
+            db.session.rollback()
+            return jsonify({'error': 'Review not found'}), 404
         
         db.session.commit()
         
         return jsonify({
             'message': 'Review unliked',
-            'like_count': review.likes_count
+            'like_count': counters.likes_count
         }), 200
         
     except Exception as e:
@@ -473,57 +507,56 @@ def unlike_review(review_id):
 @login_required
 def mark_helpful(review_id):
     """Mark a review as helpful or not helpful"""
-    review = Review.query.filter_by(id=review_id, is_deleted=False).first_or_404()
-    
     data = request.get_json()
     is_helpful = data.get('is_helpful')
     
     if is_helpful is None:
         return jsonify({'error': 'is_helpful (true/false) is required'}), 400
     
-    # Check if user already voted
-    existing = ReviewHelpful.query.filter_by(
-        user_id=current_user.id,
-        review_id=review_id
-    ).first()
+    is_helpful = bool(is_helpful)
     
     try:
-        if existing:
-            # Update existing vote
-            old_vote = existing.is_helpful
-            existing.is_helpful = is_helpful
-            
-            # Update counts
-            if old_vote != is_helpful:
-                if old_vote:
-                    review.helpful_count -= 1
-                    review.not_helpful_count += 1
-                else:
-                    review.not_helpful_count -= 1
-                    review.helpful_count += 1
-        else:
-            # Create new vote
-            vote = ReviewHelpful(
-                user_id=current_user.id,
-                review_id=review_id,
-                is_helpful=is_helpful
-            )
-            db.session.add(vote)
-            
-            # Update counts
-            if is_helpful:
-                review.helpful_count += 1
-            else:
-                review.not_helpful_count += 1
+        # Insert the vote, or flip an existing one. No row comes back when the
+        # user repeats their current vote; xmax = 0 marks a fresh insert.
+        # The counter deltas for the transition are computed in the RETURNING:
+        # a new vote adds 1 to its side, a flipped vote also takes 1 off the other.
+        inserted = literal_column('xmax = 0')
+        stmt = insert(ReviewHelpful).values(
+            user_id=current_user.id,
+            review_id=review_id,
+            is_helpful=is_helpful
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'review_id'],
+            set_={'is_helpful': stmt.excluded.is_helpful},
+            where=ReviewHelpful.is_helpful != stmt.excluded.is_helpful
+        ).returning(
+            case((ReviewHelpful.is_helpful, 1), (inserted, 0), else_=-1).label('helpful_delta'),
+            case((~ReviewHelpful.is_helpful, 1), (inserted, 0), else_=-1).label('not_helpful_delta')
+        )
+        vote = db.session.execute(stmt).first()
+        helpful_delta, not_helpful_delta = vote if vote is not None else (0, 0)
+        
+        counters = Review.update_counters(
+            review_id,
+            helpful_count=helpful_delta,
+            not_helpful_count=not_helpful_delta
+        )
+        if counters is None:
+            db.session.rollback()
+            return jsonify({'error': 'Review not found'}), 404
         
         db.session.commit()
         
         return jsonify({
             'message': 'Vote recorded',
-            'helpful_count': review.helpful_count,
-            'not_helpful_count': review.not_helpful_count
+            'helpful_count': counters.helpful_count,
+            'not_helpful_count': counters.not_helpful_count
         }), 200
         
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Review not found'}), 404
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -534,14 +567,27 @@ def get_review_replies(review_id):
     """Get all replies for a review"""
     review = Review.query.filter_by(id=review_id, is_deleted=False).first_or_404()
     
-    replies = ReviewComment.query.filter_by(
+    # Authors arrive in one IN query instead of one lazy load per reply
+    replies = ReviewComment.query.options(
+        selectinload(ReviewComment.user)
+    ).filter_by(
         review_id=review_id,
         is_deleted=False,
         parent_id=None
     ).order_by(ReviewComment.created_at.asc()).all()
     
+    # Count nested replies for the whole page in one GROUP BY
+    reply_counts = {}
+    if replies:
+        reply_counts = dict(db.session.query(
+            ReviewComment.parent_id, func.count(ReviewComment.id)
+        ).filter(
+            ReviewComment.parent_id.in_([reply.id for reply in replies]),
+            ReviewComment.is_deleted == False
+        ).group_by(ReviewComment.parent_id).all())
+    
     return jsonify({
-        'replies': [reply.to_dict() for reply in replies],
+        'replies': [reply.to_dict(reply_count=reply_counts.get(reply.id, 0)) for reply in replies],
         'count': len(replies)
     }), 200
 
@@ -550,8 +596,6 @@ def get_review_replies(review_id):
 @login_required
 def create_review_reply(review_id):
     """Reply to a review"""
-    review = Review.query.filter_by(id=review_id, is_deleted=False).first_or_404()
-    
     data = request.get_json()
     content = data.get('content', '').strip()
     
@@ -568,9 +612,12 @@ def create_review_reply(review_id):
             content=content
         )
         db.session.add(reply)
+        db.session.flush()
         
-        # Update comment count
-        review.comments_count += 1
+        # Update comment count once the reply row is in
+        if Review.update_counters(review_id, comments_count=1) is None:
+            db.session.rollback()
+            return jsonify({'error': 'Review not found'}), 404
         
         db.session.commit()
         
@@ -579,6 +626,9 @@ def create_review_reply(review_id):
             'reply': reply.to_dict()
         }), 201
         
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Review not found'}), 404
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -588,19 +638,27 @@ def create_review_reply(review_id):
 @login_required
 def delete_review_reply(reply_id):
     """Delete a reply"""
-    reply = ReviewComment.query.filter_by(id=reply_id, is_deleted=False).first_or_404()
-    
-    # Check ownership
-    if reply.user_id != current_user.id:
-        return jsonify({'error': 'You can only delete your own replies'}), 403
-    
     try:
-        reply.is_deleted = True
+        # Ownership check and soft delete in one statement
+        review_id = db.session.execute(
+            update(ReviewComment).where(
+                ReviewComment.id == reply_id,
+                ReviewComment.user_id == current_user.id,
+                ReviewComment.is_deleted == False
+            ).values(is_deleted=True).returning(ReviewComment.review_id),
+            execution_options={'synchronize_session': False}
+        ).scalar()
+        
+        if review_id is None:
+            db.session.rollback()
+            # Nothing updated: tell "not yours" apart from "not there"
+            reply_exists = db.session.execute(LIVE_REPLY_EXISTS, {'reply_id': reply_id}).scalar()
+            if reply_exists:
+                return jsonify({'error': 'You can only delete your own replies'}), 403
+            return jsonify({'error': 'Reply not found'}), 404
         
         # Update comment count
-        review = Review.query.get(reply.review_id)
-        if review and review.comments_count > 0:
-            review.comments_count -= 1
+        Review.update_counters(review_id, comments_count=-1)
         
         db.session.commit()
         
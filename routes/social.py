@@ -4,12 +4,210 @@ Handles user following/follower relationships
 """
 from flask import Blueprint, request, jsonify, render_template
 from flask_login import login_required, current_user
-from models import db, User, UserFollow, Review
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy import or_, and_
+from models import db, User, UserFollow, Review, FeedEntry, user_taste_overlap, user_watchlist, user_wishlist, user_viewed
+from sqlalchemy.exc import IntegrityError, ProgrammingError
+from sqlalchemy import or_, and_, case, func, update, select, exists, bindparam, union_all, any_, all_, Integer
+from sqlalchemy.dialects.postgresql import insert, ARRAY
+from sqlalchemy.orm import raiseload, selectinload
+from api.cache import cache_get, cache_set, cached_json_response, cached_count, get_version, bump_version
+from api.pagination import parse_per_page, parse_cursor, make_cursor, keyset_paginate, offset_page, page_count
 
 social = Blueprint('social', __name__)
 
+# Feed pages are served from cache for this long (seconds)
+FEED_CACHE_TTL = 30
+
+# Follower/following list pages are served from cache for this long (seconds)
+FOLLOW_LIST_CACHE_TTL = 30
+
+# Suggested follows and follow status are cached for this long (seconds)
+SUGGESTIONS_CACHE_TTL = 600
+FOLLOW_STATUS_CACHE_TTL = 60
+
+# Most active users kept in cache as the suggested-follows fallback pool
+TOP_ACTIVE_USERS_LIMIT = 200
+TOP_ACTIVE_USERS_CACHE_TTL = 600
+
+# Upper bound on users followed by one follow-batch request
+MAX_FOLLOW_BATCH = 50
+
+# PostgreSQL SQLSTATE for foreign_key_violation
+FOREIGN_KEY_VIOLATION = '23503'
+
+# Follow checks for get_follow_status, with 'me'/'them' bound per call
+_ME_FOLLOWS_THEM = and_(UserFollow.follower_id == bindparam('me'), UserFollow.following_id == bindparam('them'))
+_THEY_FOLLOW_ME = and_(UserFollow.follower_id == bindparam('them'), UserFollow.following_id == bindparam('me'))
+# One row: (target exists, me -> them, them -> me). The aggregate always
+# yields a row, even when neither follow exists.
+FOLLOW_STATUS = select(
+    exists().where(User.id == bindparam('them')),
+    func.coalesce(func.bool_or(_ME_FOLLOWS_THEM), False),
+    func.coalesce(func.bool_or(_THEY_FOLLOW_ME), False)
+).select_from(UserFollow).where(
+    UserFollow.is_active == True,
+    or_(_ME_FOLLOWS_THEM, _THEY_FOLLOW_ME)
+)
+
+
+def _update_follow_counts(follower_id, following_id, delta):
+    """
+    Shift both sides' cached follow counters server-side (never below zero).
+    Returns (followed, following_count): followed is a row with the followed
+    user's username and followers_count (None if that user does not exist),
+    following_count is the follower's new count.
+    """
+    def shifted(column):
+        current = func.coalesce(column, 0)
+        return case((current + delta > 0, current + delta), else_=0)
+    
+    followed = db.session.execute(
+        update(User).where(User.id == following_id)
+        .values(followers_count=shifted(User.followers_count))
+        .returning(User.username, User.followers_count),
+        execution_options={'synchronize_session': False}
+    ).first()
+    following_count = db.session.execute(
+        update(User).where(User.id == follower_id)
+        .values(following_count=shifted(User.following_count))
+        .returning(User.following_count),
+        execution_options={'synchronize_session': False}
+    ).scalar()
+    
+    return followed, following_count
+
+
+def _follow_page(follow_query, page, per_page, cursor):
+    """
+    One page of active follows, newest first: by keyset when a cursor is
+    given, otherwise by page number. Returns (follows, has_next, next_cursor).
+    """
+    if cursor:
+        return keyset_paginate(follow_query, UserFollow.created_at, UserFollow.id, per_page, cursor)
+    
+    follows, has_next = offset_page(
+        follow_query.order_by(UserFollow.created_at.desc(), UserFollow.id.desc()), page, per_page
+    )
+    next_cursor = make_cursor(follows[-1].created_at, follows[-1].id) if has_next else None
+    return follows, has_next, next_cursor
+
+
+def _feed_payload(feed_query, page, per_page, cursor, count_key,
+                  sort_column=Review.created_at, id_column=Review.id):
+    """
+    Serialize one page of a review feed. With a cursor (?after=&after_id=) the
+    page is fetched by keyset; otherwise page-number pagination is used for
+    older clients. Both modes return next_cursor for continuing by keyset.
+    The page-number total comes from a cached COUNT stored under count_key.
+    sort_column/id_column must carry the review's created_at and id values.
+    """
+    if cursor:
+        reviews, has_next, next_cursor = keyset_paginate(
+            feed_query, sort_column, id_column, per_page, cursor,
+            cursor_of=lambda review: (review.created_at, review.id)
+        )
+        return {
+            'reviews': Review.to_dict_many(reviews),
+            'has_next': has_next,
+            'next_cursor': next_cursor
+        }
+    
+    # Paginate
+    reviews, has_next = offset_page(
+        feed_query.order_by(sort_column.desc(), id_column.desc()), page, per_page
+    )
+    total = cached_count(count_key, feed_query)
+    
+    next_cursor = None
+    if has_next and reviews:
+        next_cursor = make_cursor(reviews[-1].created_at, reviews[-1].id)
+    
+    return {
+        'reviews': Review.to_dict_many(reviews),
+        'total': total,
+        'pages': page_count(total, per_page),
+        'current_page': page,
+        'has_next': has_next,
+        'has_prev': page > 1,
+        'next_cursor': next_cursor
+    }
+
+
+def _top_active_users():
+    """
+    The community's most active users (by review count) as suggestion dicts.
+    Shared by every viewer, so it is computed once per TTL rather than with
+    an ORDER BY on each under-filled suggestions request.
+    """
+    top = cache_get('top_active_users')
+    if top is None:
+        top = [{
+            'id': u.id,
+            'username': u.username,
+            'profile_picture': u.profile_picture,
+            'bio': u.bio,
+            'followers_count': u.followers_count or 0,
+            'total_reviews': u.total_reviews or 0
+        } for u in User.query.order_by(User.total_reviews.desc()).limit(TOP_ACTIVE_USERS_LIMIT).all()]
+        cache_set('top_active_users', top, TOP_ACTIVE_USERS_CACHE_TTL)
+    return top
+
+
+def _id_array(ids):
+    """Bind a set of ids as one integer[] parameter (for = ANY / != ALL)"""
+    return bindparam(None, list(ids), type_=ARRAY(Integer))
+
+
+def _taste_matches(exclude_ids, limit):
+    """
+    (User, shared_count) pairs for the users sharing the most media with
+    the current user, best first. Reads the precomputed user_taste_overlap
+    view; falls back to aggregating the interaction tables live when the
+    view has not been created yet.
+    
+    Id sets are bound as arrays rather than IN lists: heavy users can have
+    thousands of media ids, and a single array parameter keeps the SQL text
+    and plan the same size regardless.
+    """
+    try:
+        return db.session.query(
+            User, user_taste_overlap.c.shared_count
+        ).join(
+            user_taste_overlap, User.id == user_taste_overlap.c.user_b
+        ).filter(
+            user_taste_overlap.c.user_a == current_user.id,
+            user_taste_overlap.c.user_b != all_(_id_array(exclude_ids))
+        ).order_by(user_taste_overlap.c.shared_count.desc()).limit(limit).all()
+    except ProgrammingError:
+        db.session.rollback()
+    
+    # Find users who have these same movies in their lists, looking across
+    # watchlist, wishlist, and viewed
+    interactions = union_all(
+        select(user_watchlist.c.user_id, user_watchlist.c.media_id),
+        select(user_wishlist.c.user_id, user_wishlist.c.media_id),
+        select(user_viewed.c.user_id, user_viewed.c.media_id)
+    ).alias('all_interactions')
+    
+    # Get all media IDs the current user has interacted with, straight from
+    # the association tables rather than loading the MediaItem relationships
+    media_ids = {row[0] for row in db.session.query(interactions.c.media_id).filter(
+        interactions.c.user_id == current_user.id
+    ).all()}
+    if not media_ids:
+        # New users have nothing to match on; skip the aggregation over
+        # everyone's interactions and let the caller fill from active users
+        return []
+    
+    return db.session.query(
+        User,
+        db.func.count(interactions.c.media_id).label('shared_count')
+    ).join(
+        interactions, User.id == interactions.c.user_id
+    ).filter(
+        interactions.c.media_id == any_(_id_array(media_ids)),
+        User.id != all_(_id_array(exclude_ids))
+    ).group_by(User.id).order_by(db.desc('shared_count')).limit(limit).all()
+
 
 @social.route('/api/users/<int:user_id>/follow', methods=['POST'])
 @login_required
@@ -19,62 +217,120 @@ def toggle_follow(user_id):
     if user_id == current_user.id:
         return jsonify({'error': 'You cannot follow yourself'}), 400
     
-    # Check if target user exists
-    target_user = User.query.get(user_id)
-    if not target_user:
-        return jsonify({'error': 'User not found'}), 404
-    
     try:
-        # Check if already following
-        existing_follow = UserFollow.query.filter_by(
+        # Flip the follow in one statement: insert it, or toggle is_active on
+        # the existing row (unfollow is a soft delete). The foreign key rejects
+        # unknown users, so no lookup is needed first.
+        stmt = insert(UserFollow).values(
             follower_id=current_user.id,
             following_id=user_id,
             is_active=True
-        ).first()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['follower_id', 'following_id'],
+            set_={'is_active': ~UserFollow.is_active}
+        ).returning(UserFollow.is_active)
+        is_following = db.session.execute(stmt).scalar()
         
-        if existing_follow:
-            # Unfollow (soft delete)
-            existing_follow.is_active = False
-            
-            # Update counts
-            current_user.following_count = max(0, (current_user.following_count or 0) - 1)
-            target_user.followers_count = max(0, (target_user.followers_count or 0) - 1)
-            
-            action = 'unfollowed'
-            is_following = False
-        else:
-            # Check if there's an inactive follow (previously unfollowed)
-            inactive_follow = UserFollow.query.filter_by(
-                follower_id=current_user.id,
-                following_id=user_id,
-                is_active=False
-            ).first()
-            
-            if inactive_follow:
-                # Reactivate the follow
-                inactive_follow.is_active = True
-            else:
-                # Create new follow
-                follow = UserFollow(
-                    follower_id=current_user.id,  # type: ignore
-                    following_id=user_id # type: ignore
-                )  # type: ignore
-                db.session.add(follow)
-            
-            # Update counts
-            current_user.following_count = (current_user.following_count or 0) + 1
-            target_user.followers_count = (target_user.followers_count or 0) + 1
-            
+        # Update counts and the follower's feed
+        followed, following_count = _update_follow_counts(
+            current_user.id, user_id, 1 if is_following else -1
+        )
+        if is_following:
+            FeedEntry.backfill(current_user.id, [user_id])
             action = 'followed'
-            is_following = True
+        else:
+            FeedEntry.remove_author(current_user.id, user_id)
+            action = 'unfollowed'
+        
+        if followed is None:
+            db.session.rollback()
+            return jsonify({'error': 'User not found'}), 404
         
         db.session.commit()
+        bump_version(f'follows:{current_user.id}')
+        bump_version(f'followers:{user_id}')
         
         return jsonify({
-            'message': f'Successfully {action} {target_user.username}',
+            'message': f'Successfully {action} {followed.username}',
             'is_following': is_following,
-            'followers_count': target_user.followers_count,
-            'following_count': current_user.following_count
+            'followers_count': followed.followers_count,
+            'following_count': following_count
+        }), 200
+        
+    except IntegrityError as e:
+        db.session.rollback()
+        if getattr(e.orig, 'pgcode', None) == FOREIGN_KEY_VIOLATION:
+            return jsonify({'error': 'User not found'}), 404
+        return jsonify({'error': 'Database error occurred'}), 500
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@social.route('/api/users/follow-batch', methods=['POST'])
+@login_required
+def follow_batch():
+    """Follow several users at once (e.g. "follow all" on suggestions)"""
+    data = request.get_json(silent=True) or {}
+    user_ids = data.get('user_ids')
+    
+    if not isinstance(user_ids, list) or not user_ids:
+        return jsonify({'error': 'user_ids must be a non-empty list'}), 400
+    
+    try:
+        user_ids = {int(uid) for uid in user_ids}
+    except (TypeError, ValueError):
+        return jsonify({'error': 'user_ids must be integers'}), 400
+    
+    user_ids.discard(current_user.id)
+    if len(user_ids) > MAX_FOLLOW_BATCH:
+        return jsonify({'error': f'You can follow at most {MAX_FOLLOW_BATCH} users at once'}), 400
+    
+    # Only follow users that exist
+    target_ids = [row[0] for row in db.session.query(User.id).filter(User.id.in_(user_ids)).all()]
+    if not target_ids:
+        return jsonify({'error': 'User not found'}), 404
+    
+    try:
+        # One multi-row upsert; RETURNING lists only follows this request created or reactivated
+        stmt = insert(UserFollow).values([
+            {'follower_id': current_user.id, 'following_id': target_id, 'is_active': True}
+            for target_id in target_ids
+        ])
+        newly_followed = [row[0] for row in db.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=['follower_id', 'following_id'],
+                set_={'is_active': True},
+                where=UserFollow.is_active == False
+            ).returning(UserFollow.following_id)
+        ).all()]
+        
+        # Update counts: +1 for every newly followed user, +N for the current user
+        if newly_followed:
+            FeedEntry.backfill(current_user.id, newly_followed)
+            db.session.execute(
+                update(User).where(User.id.in_(newly_followed)).values(
+                    followers_count=func.coalesce(User.followers_count, 0) + 1
+                ),
+                execution_options={'synchronize_session': False}
+            )
+        following_count = db.session.execute(
+            update(User).where(User.id == current_user.id).values(
+                following_count=func.coalesce(User.following_count, 0) + len(newly_followed)
+            ).returning(User.following_count),
+            execution_options={'synchronize_session': False}
+        ).scalar()
+        
+        db.session.commit()
+        bump_version(f'follows:{current_user.id}')
+        for followed_id in newly_followed:
+            bump_version(f'followers:{followed_id}')
+        
+        return jsonify({
+            'message': f'Followed {len(newly_followed)} users',
+            'followed': newly_followed,
+            'following_count': following_count
         }), 200
         
     except IntegrityError as e:
@@ -88,141 +344,185 @@ def toggle_follow(user_id):
 @social.route('/api/users/<int:user_id>/followers', methods=['GET'])
 def get_followers(user_id):
     """Get list of users following the target user"""
-    # Check if user exists
-    user = User.query.get(user_id)
-    if not user:
+    # Check if user exists, reading only the counter used for the total
+    user = db.session.query(User.followers_count).filter(User.id == user_id).first()
+    if user is None:
         return jsonify({'error': 'User not found'}), 404
     
     # Get pagination parameters
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = parse_per_page(request.args)
+    cursor = parse_cursor(request.args)
     
-    # Query followers (users who follow this user)
-    followers_query = UserFollow.query.filter_by(
-        following_id=user_id,
-        is_active=True
-    ).order_by(UserFollow.created_at.desc())
+    # Cached briefly; the key changes as soon as this list or the viewer's own
+    # follows change, and the ETag lets polling clients get a 304
+    viewer_id = current_user.id if current_user.is_authenticated else 0
+    cache_key = (
+        f"followers:{user_id}:{get_version(f'followers:{user_id}')}:"
+        f"{viewer_id}:{get_version(f'follows:{viewer_id}')}:{page}:{per_page}:{cursor}"
+    )
     
-    # Paginate
-    pagination = followers_query.paginate(page=page, per_page=per_page, error_out=False)  # type: ignore
-    
-    # Build follower list with user details
-    followers_data = []
-    for follow in pagination.items:
-        follower = follow.follower_user
-        follower_data = {
-            'id': follower.id,
-            'username': follower.username,
-            'profile_picture': follower.profile_picture,
-            'bio': follower.bio,
-            'followers_count': follower.followers_count or 0,
-            'following_count': follower.following_count or 0,
-            'total_reviews': follower.total_reviews or 0,
-            'followed_at': follow.created_at.isoformat()
-        }
+    def build_payload():
+        # Query followers (users who follow this user)
+        # Load the page's follower users with one IN query; the followed user is
+        # the profile owner and never needed, so any access that would need SQL
+        # for it raises instead of quietly adding a query per row
+        followers_query = UserFollow.query.filter_by(
+            following_id=user_id,
+            is_active=True
+        ).options(
+            selectinload(UserFollow.follower_user),
+            raiseload(UserFollow.following_user, sql_only=True)
+        )
+        
+        # Paginate
+        # Total comes from the denormalized counter instead of a COUNT(*)
+        follows, has_next, next_cursor = _follow_page(followers_query, page, per_page, cursor)
+        total = user.followers_count or 0
         
-        # Check if current user follows this follower
+        # Resolve which of these followers the current user follows in one query
+        following_set = set()
         if current_user.is_authenticated:
-            is_following = UserFollow.query.filter_by(
-                follower_id=current_user.id,
-                following_id=follower.id,
-                is_active=True
-            ).first() is not None
-            follower_data['is_following'] = is_following
+            following_set = UserFollow.followed_ids(current_user.id, [follow.follower_id for follow in follows])
         
-        followers_data.append(follower_data)
+        # Build follower list with user details
+        followers_data = []
+        for follow in follows:
+            follower = follow.follower_user
+            follower_data = {
+                'id': follower.id,
+                'username': follower.username,
+                'profile_picture': follower.profile_picture,
+                'bio': follower.bio,
+                'followers_count': follower.followers_count or 0,
+                'following_count': follower.following_count or 0,
+                'total_reviews': follower.total_reviews or 0,
+                'followed_at': follow.created_at.isoformat()
+            }
+            
+            # Check if current user follows this follower
+            if current_user.is_authenticated:
+                follower_data['is_following'] = follower.id in following_set
+            
+            followers_data.append(follower_data)
+        
+        return {
+            'followers': followers_data,
+            'total': total,
+            'pages': page_count(total, per_page),
+            'current_page': page,
+            'has_next': has_next,
+            'has_prev': page > 1,
+            'next_cursor': next_cursor,
+            'current_user_id': current_user.id if current_user.is_authenticated else None
+        }
     
-    return jsonify({
-        'followers': followers_data,
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': page,
-        'has_next': pagination.has_next,
-        'has_prev': pagination.has_prev,
-        'current_user_id': current_user.id if current_user.is_authenticated else None
-    }), 200
+    return cached_json_response(cache_key, FOLLOW_LIST_CACHE_TTL, build_payload)
 
 
 @social.route('/api/users/<int:user_id>/following', methods=['GET'])
 def get_following(user_id):
     """Get list of users that the target user is following"""
-    # Check if user exists
-    user = User.query.get(user_id)
-    if not user:
+    # Check if user exists, reading only the counter used for the total
+    user = db.session.query(User.following_count).filter(User.id == user_id).first()
+    if user is None:
         return jsonify({'error': 'User not found'}), 404
     
     # Get pagination parameters
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = parse_per_page(request.args)
+    cursor = parse_cursor(request.args)
     
-    # Query following (users this user follows)
-    following_query = UserFollow.query.filter_by(
-        follower_id=user_id,
-        is_active=True
-    ).order_by(UserFollow.created_at.desc())
+    # Cached briefly; the key changes as soon as this list or the viewer's own
+    # follows change, and the ETag lets polling clients get a 304
+    viewer_id = current_user.id if current_user.is_authenticated else 0
+    cache_key = (
+        f"follows:{user_id}:{get_version(f'follows:{user_id}')}:"
+        f"{viewer_id}:{get_version(f'follows:{viewer_id}')}:{page}:{per_page}:{cursor}"
+    )
     
-    # Paginate
-    pagination = following_query.paginate(page=page, per_page=per_page, error_out=False)  # type: ignore
-    
-    # Build following list with user details
-    following_data = []
-    for follow in pagination.items:
-        following_user = follow.following_user
-        following_user_data = {
-            'id': following_user.id,
-            'username': following_user.username,
-            'profile_picture': following_user.profile_picture,
-            'bio': following_user.bio,
-            'followers_count': following_user.followers_count or 0,
-            'following_count': following_user.following_count or 0,
-            'total_reviews': following_user.total_reviews or 0,
-            'followed_at': follow.created_at.isoformat()
-        }
+    def build_payload():
+        # Query following (users this user follows)
+        # Load the page's followed users with one IN query; the follower is the
+        # profile owner and never needed, so any access that would need SQL
+        # for it raises instead of quietly adding a query per row
+        following_query = UserFollow.query.filter_by(
+            follower_id=user_id,
+            is_active=True
+        ).options(
+            selectinload(UserFollow.following_user),
+            raiseload(UserFollow.follower_user, sql_only=True)
+        )
+        
+        # Paginate
+        # Total comes from the denormalized counter instead of a COUNT(*)
+        follows, has_next, next_cursor = _follow_page(following_query, page, per_page, cursor)
+        total = user.following_count or 0
         
-        # Check if current user follows this user
+        # Resolve which of these users the current user follows in one query
+        following_set = set()
         if current_user.is_authenticated:
-            is_following = UserFollow.query.filter_by(
-                follower_id=current_user.id,
-                following_id=following_user.id,
-                is_active=True
-            ).first() is not None
-            following_user_data['is_following'] = is_following
+            following_set = UserFollow.followed_ids(current_user.id, [follow.following_id for follow in follows])
+        
+        # Build following list with user details
+        following_data = []
+        for follow in follows:
+            following_user = follow.following_user
+            following_user_data = {
+                'id': following_user.id,
+                'username': following_user.username,
+                'profile_picture': following_user.profile_picture,
+                'bio': following_user.bio,
+                'followers_count': following_user.followers_count or 0,
+                'following_count': following_user.following_count or 0,
+                'total_reviews': following_user.total_reviews or 0,
+                'followed_at': follow.created_at.isoformat()
+            }
+            
+            # Check if current user follows this user
+            if current_user.is_authenticated:
+                following_user_data['is_following'] = following_user.id in following_set
+            
+            following_data.append(following_user_data)
         
-        following_data.append(following_user_data)
+        return {
+            'following': following_data,
+            'total': total,
+            'pages': page_count(total, per_page),
+            'current_page': page,
+            'has_next': has_next,
+            'has_prev': page > 1,
+            'next_cursor': next_cursor,
+            'current_user_id': current_user.id if current_user.is_authenticated else None
+        }
     
-    return jsonify({
-        'following': following_data,
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': page,
-        'has_next': pagination.has_next,
-        'has_prev': pagination.has_prev,
-        'current_user_id': current_user.id if current_user.is_authenticated else None
-    }), 200
+    return cached_json_response(cache_key, FOLLOW_LIST_CACHE_TTL, build_payload)
 
 
 @social.route('/api/users/<int:user_id>/follow-status', methods=['GET'])
 @login_required
 def get_follow_status(user_id):
     """Check follow status between current user and target user"""
-    # Check if target user exists
-    target_user = User.query.get(user_id)
-    if not target_user:
-        return jsonify({'error': 'User not found'}), 404
+    # Cached per pair; a follow/unfollow by either side changes the key
+    cache_key = (
+        f"follow_status:{current_user.id}:{user_id}:"
+        f"{get_version(f'follows:{current_user.id}')}:{get_version(f'follows:{user_id}')}"
+    )
+    status = cache_get(cache_key)
     
-    # Check if current user follows target user
-    is_following = UserFollow.query.filter_by(
-        follower_id=current_user.id,
-        following_id=user_id,
-        is_active=True
-    ).first() is not None
+    if status is None:
+        # Target existence and both directions of the relationship in one query
+        user_exists, is_following, is_followed_by = db.session.execute(
+            FOLLOW_STATUS, {'me': current_user.id, 'them': user_id}
+        ).one()
+        if not user_exists:
+            return jsonify({'error': 'User not found'}), 404
+        
+        # Current user follows target user / target user follows current user
+        status = [is_following, is_followed_by]
+        cache_set(cache_key, status, FOLLOW_STATUS_CACHE_TTL)
     
-    # Check if target user follows current user
-    is_followed_by = UserFollow.query.filter_by(
-        follower_id=user_id,
-        following_id=current_user.id,
-        is_active=True
-    ).first() is not None
+    is_following, is_followed_by = status
     
     return jsonify({
         'is_following': is_following,
@@ -236,28 +536,30 @@ def get_follow_status(user_id):
 def get_activity_feed():
     """Get recent reviews from users the current user follows"""
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = parse_per_page(request.args)
+    cursor = parse_cursor(request.args)
     
-    # Query: Get reviews from users the current user follows
-    feed_query = db.session.query(Review).join(
-        UserFollow, Review.user_id == UserFollow.following_id
-    ).filter(
-        UserFollow.follower_id == current_user.id,
-        UserFollow.is_active == True,
-        Review.is_deleted == False
-    ).order_by(Review.created_at.desc())
+    # Cache key changes whenever reviews change or this user's follows change
+    cache_key = (
+        f"feed:activity:{current_user.id}:{get_version('reviews')}:"
+        f"{get_version(f'follows:{current_user.id}')}:{page}:{per_page}:{cursor}"
+    )
     
-    # Paginate
-    pagination = feed_query.paginate(page=page, per_page=per_page, error_out=False)  # type: ignore
+    def build_payload():
+        # Query: Reviews fanned out to this user's feed when they were posted
+        feed_query = db.session.query(Review).join(
+            FeedEntry, FeedEntry.review_id == Review.id
+        ).filter(
+            FeedEntry.user_id == current_user.id,
+            Review.is_deleted == False
+        )
+        
+        return _feed_payload(
+            feed_query, page, per_page, cursor, f'count:feed:activity:{current_user.id}',
+            sort_column=FeedEntry.created_at, id_column=FeedEntry.review_id
+        )
     
-    return jsonify({
-        'reviews': [review.to_dict() for review in pagination.items],
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': page,
-        'has_next': pagination.has_next,
-        'has_prev': pagination.has_prev
-    }), 200
+    return cached_json_response(cache_key, FEED_CACHE_TTL, build_payload)
 
 
 @social.route('/feed')
@@ -270,22 +572,20 @@ def feed():
 def get_global_feed():
     """Get recent reviews from all users"""
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = parse_per_page(request.args)
+    cursor = parse_cursor(request.args)
     
-    # Query: Get all reviews
-    feed_query = Review.query.filter_by(is_deleted=False).order_by(Review.created_at.desc())
+    # Payload includes is_author_self, so key on the viewer as well
+    viewer_id = current_user.id if current_user.is_authenticated else 0
+    cache_key = f"feed:global:{viewer_id}:{get_version('reviews')}:{page}:{per_page}:{cursor}"
     
-    # Paginate
-    pagination = feed_query.paginate(page=page, per_page=per_page, error_out=False)  # type: ignore
+    def build_payload():
+        # Query: Get all reviews
+        feed_query = Review.query.filter_by(is_deleted=False)
+        
+        return _feed_payload(feed_query, page, per_page, cursor, 'count:feed:global')
     
-    return jsonify({
-        'reviews': [review.to_dict() for review in pagination.items],
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': page,
-        'has_next': pagination.has_next,
-        'has_prev': pagination.has_prev
-    }), 200
+    return cached_json_response(cache_key, FEED_CACHE_TTL, build_payload)
 
 @social.route('/api/social/suggested-follows', methods=['GET'])
 @login_required
@@ -293,79 +593,24 @@ def get_suggested_follows():
     """Get user recommendations based on shared movie tastes"""
     limit = request.args.get('limit', 5, type=int)
     
-    # Get all media IDs the current user has interacted with
-    watchlist_ids = {item.id for item in current_user.watchlist}
-    wishlist_ids = {item.id for item in current_user.wishlist}
-    viewed_ids = {item.id for item in current_user.viewed_media}
-    
-    all_current_user_media = watchlist_ids | wishlist_ids | viewed_ids
-    
-    # Get IDs of users already being followed
-    following_ids = {f.following_id for f in current_user.following if f.is_active}
-    following_ids.add(current_user.id)  # Exclude self
-    
-    # Taste matching logic:
-    # 1. Find users who have these same movies in their lists
-    # we'll look across watchlist, wishlist, and viewed for other users
-    from models import user_watchlist, user_wishlist, user_viewed
-    from sqlalchemy import union_all, select, literal_column
-    
-    # Create a subquery for all media interactions by all users
-    interactions = union_all(
-        select(user_watchlist.c.user_id, user_watchlist.c.media_id),
-        select(user_wishlist.c.user_id, user_wishlist.c.media_id),
-        select(user_viewed.c.user_id, user_viewed.c.media_id)
-    ).alias('all_interactions')
-    
-    from sqlalchemy import text
+    # Suggestions change slowly; recompute at most every SUGGESTIONS_CACHE_TTL
+    # seconds, or as soon as this user follows/unfollows someone
+    cache_key = f"suggestions:{current_user.id}:{get_version(f'follows:{current_user.id}')}:{limit}"
     
-    # Query for user IDs with shared media items
-    shared_counts_query = db.session.query(
-        User.id, 
-        db.func.count(interactions.c.media_id).label('shared_count')
-    ).join(
-        interactions, User.id == interactions.c.user_id
-    ).filter(
-        interactions.c.media_id.in_(all_current_user_media) if all_current_user_media else db.false(),
-        User.id.notin_(following_ids)
-    ).group_by(User.id).order_by(db.desc('shared_count')).limit(limit)
-    
-    # Store ID and count pairs
-    shared_media_results = shared_counts_query.all()
-    user_ids = [r[0] for r in shared_media_results]
-    counts_map = {r[0]: r[1] for r in shared_media_results}
-    
-    # Fetch full user objects for these IDs
-    matched_users = []
-    if user_ids:
-        users_lookup = {u.id: u for u in User.query.filter(User.id.in_(user_ids)).all()}
-        # Maintain order from shared_media_results
-        matched_users = [(users_lookup[uid], counts_map[uid]) for uid in user_ids if uid in users_lookup]
-    
-    # If not enough results based on shared media, fill with active community members
-    suggestions = []
-    for u, count in matched_users:
-        suggestions.append({
-            'id': u.id,
-            'username': u.username,
-            'profile_picture': u.profile_picture,
-            'bio': u.bio,
-            'followers_count': u.followers_count or 0,
-            'total_reviews': u.total_reviews or 0,
-            'shared_count': count,
-            'reason': f'Shared {count} movie{"s" if count > 1 else ""} with you'
-        })
-        
-    if len(suggestions) < limit:
-        already_suggested = {u.id for u, count in matched_users}
-        remaining_limit = limit - len(suggestions)
+    def build_payload():
+        # Get IDs of users already being followed
+        following_ids = {row[0] for row in db.session.query(UserFollow.following_id).filter_by(
+            follower_id=current_user.id,
+            is_active=True
+        ).all()}
+        following_ids.add(current_user.id)  # Exclude self
         
-        fallback_users = User.query.filter(
-            User.id.notin_(following_ids),
-            User.id.notin_(already_suggested)
-        ).order_by(User.total_reviews.desc()).limit(remaining_limit).all()
+        # Taste matching: users ranked by how many movies they share with us
+        matched_users = _taste_matches(following_ids, limit)
         
-        for u in fallback_users:
+        # If not enough results based on shared media, fill with active community members
+        suggestions = []
+        for u, count in matched_users:
             suggestions.append({
                 'id': u.id,
                 'username': u.username,
@@ -373,11 +618,23 @@ def get_suggested_follows():
                 'bio': u.bio,
                 'followers_count': u.followers_count or 0,
                 'total_reviews': u.total_reviews or 0,
-                'shared_count': 0,
-                'reason': 'Active in the community'
+                'shared_count': count,
+                'reason': f'Shared {count} movie{"s" if count > 1 else ""} with you'
             })
+        
+        if len(suggestions) < limit:
+            excluded = following_ids | {u.id for u, count in matched_users}
             
-    return jsonify({
-        'suggestions': suggestions,
-        'count': len(suggestions)
-    }), 200
+            for candidate in _top_active_users():
+                if len(suggestions) >= limit:
+                    break
+                if candidate['id'] in excluded:
+                    continue
+                suggestions.append(dict(candidate, shared_count=0, reason='Active in the community'))
+            
+        return {
+            'suggestions': suggestions,
+            'count': len(suggestions)
+        }
+    
+    return cached_json_response(cache_key, SUGGESTIONS_CACHE_TTL, build_payload)
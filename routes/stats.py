@@ -5,15 +5,155 @@ Week 3 Implementation: Personal stats, viewing patterns, Year in Review
 
 from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
-from sqlalchemy import func, extract, desc, and_, or_, select
-from datetime import datetime, timedelta
-from collections import defaultdict, Counter
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy import func, extract, desc, and_, or_, select, cast, literal, null, union_all, bindparam, Integer, Float
+from datetime import datetime, timedelta, MINYEAR, MAXYEAR
+from collections import defaultdict
+from operator import itemgetter
 import calendar
 
-from models import db, Review, User, DiaryEntry, MediaItem, user_watchlist, user_viewed
+from models import (
+    db, Review, User, DiaryEntry, MediaItem, MediaGenre, user_watchlist, user_viewed,
+    platform_stats_view, most_watched_view
+)
+from api.cache import cached_json_response, get_version
 
 stats_bp = Blueprint('stats', __name__)
 
+# Aggregate stats are cached (seconds). Per-user entries are keyed by the
+# user's stats version, bumped on their diary/review writes, so the TTL only
+# bounds how long an unused entry lives.
+GENRE_STATS_CACHE_TTL = 3600
+YEAR_IN_REVIEW_CACHE_TTL = 86400
+PLATFORM_STATS_CACHE_TTL = 600
+
+def _user_total_columns(uid):
+    """Scalar subqueries for one user's (reviews, average rating, watched)"""
+    live_reviews = and_(Review.user_id == uid, Review.is_deleted.is_(False))
+    return (
+        select(func.count(Review.id)).where(live_reviews).scalar_subquery(),
+        select(func.avg(Review.rating)).where(live_reviews, Review.rating.isnot(None)).scalar_subquery(),
+        select(func.count(DiaryEntry.id)).where(DiaryEntry.user_id == uid).scalar_subquery()
+    )
+
+
+def _watched_media(uid):
+    """(media_id, media_type) of every diary entry of one user"""
+    return select(DiaryEntry.media_id, DiaryEntry.media_type).where(DiaryEntry.user_id == uid)
+
+
+_LIVE_RATED_REVIEWS = and_(
+    Review.user_id == bindparam('uid'), Review.is_deleted.is_(False), Review.rating.isnot(None)
+)
+# One row per user: (reviews, average rating, watched)
+USER_TOTALS = select(*_user_total_columns(bindparam('uid')))
+# USER_TOTALS plus (watched this year, watchlist size)
+OVERVIEW_TOTALS = USER_TOTALS.add_columns(
+    select(func.count(DiaryEntry.id)).where(
+        DiaryEntry.user_id == bindparam('uid'),
+        DiaryEntry.watched_year == bindparam('year')
+    ).scalar_subquery(),
+    select(func.count()).select_from(user_watchlist).where(
+        user_watchlist.c.user_id == bindparam('uid')
+    ).scalar_subquery()
+)
+RATINGS_DISTRIBUTION = select(Review.rating, func.count(Review.id)).where(
+    _LIVE_RATED_REVIEWS
+).group_by(Review.rating)
+
+# A user's diary counts for one year, per (watched_month, media_type)
+YEAR_ACTIVITY = select(
+    DiaryEntry.watched_month, DiaryEntry.media_type, func.count(DiaryEntry.id)
+).where(
+    DiaryEntry.user_id == bindparam('uid'),
+    DiaryEntry.watched_year == bindparam('year')
+).group_by(DiaryEntry.watched_month, DiaryEntry.media_type)
+
+# Per-year rows of (year, watched_count, avg_rating, reviews_count): diary
+# entries and rated reviews are stacked with UNION ALL and grouped once.
+# Only years with diary entries are reported.
+_year_activity = union_all(
+    select(
+        cast(DiaryEntry.watched_year, Integer).label('year'),
+        literal(1).label('watched'),
+        cast(null(), Float).label('rating'),
+        literal(0).label('reviewed')
+    ).where(DiaryEntry.user_id == bindparam('uid')),
+    select(
+        cast(extract('year', Review.created_at), Integer),
+        literal(0),
+        Review.rating,
+        literal(1)
+    ).where(_LIVE_RATED_REVIEWS)
+).subquery()
+STATS_BY_YEAR = select(
+    _year_activity.c.year,
+    func.sum(_year_activity.c.watched).label('watched_count'),
+    func.avg(_year_activity.c.rating).label('avg_rating'),
+    func.sum(_year_activity.c.reviewed).label('reviews_count')
+).group_by(_year_activity.c.year).having(
+    func.sum(_year_activity.c.watched) > 0
+).order_by(_year_activity.c.year)
+
+# Everything compare_with_user needs in one row: the other user's username
+# (None when they do not exist), both users' totals, then the number of
+# distinct titles both have watched (INTERSECT, so no rows are fetched)
+COMPARE_TOTALS = select(
+    select(User.username).where(User.id == bindparam('them')).scalar_subquery(),
+    *_user_total_columns(bindparam('me')),
+    *_user_total_columns(bindparam('them')),
+    select(func.count()).select_from(
+        _watched_media(bindparam('me')).intersect(_watched_media(bindparam('them'))).subquery()
+    ).scalar_subquery()
+)
+
+# Viewing streaks as gaps-and-islands: consecutive days minus their row
+# number share one anchor date, so each island is one GROUP BY bucket
+_watched_days = select(DiaryEntry.watched_date.label('day')).where(
+    DiaryEntry.user_id == bindparam('uid')
+).distinct().subquery()
+_islands = select(
+    _watched_days.c.day,
+    (_watched_days.c.day - cast(func.row_number().over(order_by=_watched_days.c.day), Integer)).label('anchor')
+).subquery()
+_streaks = select(
+    func.count().label('length'),
+    func.max(_islands.c.day).label('last_day')
+).group_by(_islands.c.anchor).subquery()
+# One row (most recent streak's length, its last day, longest streak, total
+# days), or no row when the diary is empty
+STREAK_SUMMARY = select(
+    _streaks.c.length,
+    _streaks.c.last_day,
+    func.max(_streaks.c.length).over(),
+    func.sum(_streaks.c.length).over()
+).order_by(_streaks.c.last_day.desc()).limit(1)
+
+
+def _genre_counts(limit, *filters):
+    """
+    Most watched genres among the diary entries matching filters, grouped in
+    SQL on the media_genre table (one row per media item and genre), so only
+    the top rows come back. Returns ([(genre, count)], number of distinct
+    genres).
+    """
+    rows = db.session.execute(
+        select(
+            MediaGenre.genre,
+            func.count().label('count'),
+            func.count().over().label('total_genres')
+        ).select_from(DiaryEntry).join(
+            MediaGenre, DiaryEntry.media_id == MediaGenre.media_id
+        ).where(
+            *filters
+        ).group_by(MediaGenre.genre).order_by(
+            desc('count'), MediaGenre.genre
+        ).limit(limit)
+    ).all()
+    
+    total_genres = rows[0].total_genres if rows else 0
+    return [(row.genre, row.count) for row in rows], total_genres
+
 
 @stats_bp.route('/api/stats/overview', methods=['GET'])
 @login_required
@@ -22,54 +162,22 @@ def get_stats_overview():
     try:
         user_id = current_user.id
         
-        # Total counts
-        total_reviews = Review.query.filter_by(
-            user_id=user_id,
-            is_deleted=False
-        ).count()
-        
-        # Total watched (from diary entries)
-        total_watched = DiaryEntry.query.filter_by(
-            user_id=user_id
-        ).count()
-        
-        # Total watchlist
-        total_watchlist = db.session.execute(
-            select(func.count()).select_from(user_watchlist).where(
-                user_watchlist.c.user_id == user_id
-            )
-        ).scalar()
+        current_year = datetime.now().year
         
-        # Average rating
-        avg_rating = db.session.query(
-            func.avg(Review.rating)
-        ).filter(
-            Review.user_id == user_id,
-            Review.is_deleted.is_(False),
-            Review.rating.isnot(None)
-        ).scalar()
+        # Every scalar total in one round trip, one subquery per figure:
+        # reviews, average rating, watched (diary), this year, watchlist
+        totals = db.session.execute(
+            OVERVIEW_TOTALS, {'uid': user_id, 'year': current_year}
+        ).one()
+        total_reviews, avg_rating, total_watched, this_year_count, total_watchlist = totals
         
         # Ratings distribution
-        ratings_dist = db.session.query(
-            Review.rating,
-            func.count(Review.id)
-        ).filter(
-            Review.user_id == user_id,
-            Review.is_deleted.is_(False),
-            Review.rating.isnot(None)
-        ).group_by(Review.rating).all()
+        ratings_dist = db.session.execute(RATINGS_DISTRIBUTION, {'uid': user_id}).all()
         
         ratings_distribution = {
             str(rating): count for rating, count in ratings_dist
         }
         
-        # This year stats
-        current_year = datetime.now().year
-        this_year_count = DiaryEntry.query.filter(
-            DiaryEntry.user_id == user_id,
-            extract('year', DiaryEntry.watched_date) == current_year
-        ).count()
-        
         return jsonify({
             'success': True,
             'stats': {
@@ -93,40 +201,16 @@ def get_stats_by_year():
     try:
         user_id = current_user.id
         
-        # Group watched items by year from diary entries
-        watched_by_year = db.session.query(
-            extract('year', DiaryEntry.watched_date).label('year'),
-            func.count(DiaryEntry.id).label('count')
-        ).filter(
-            DiaryEntry.user_id == user_id,
-            DiaryEntry.watched_date.isnot(None)
-        ).group_by('year').order_by('year').all()
-        
-        # Calculate average rating by year
-        ratings_by_year = db.session.query(
-            extract('year', Review.created_at).label('year'),
-            func.avg(Review.rating).label('avg_rating'),
-            func.count(Review.id).label('count')
-        ).filter(
-            Review.user_id == user_id,
-            Review.is_deleted.is_(False),
-            Review.rating.isnot(None)
-        ).group_by('year').order_by('year').all()
-        
-        year_stats = []
-        for watched in watched_by_year:
-            year = int(watched.year) if watched.year else 0
-            rating_info = next(
-                (r for r in ratings_by_year if int(r.year) == year),
-                None
-            )
-            
-            year_stats.append({
-                'year': year,
-                'watched_count': watched.count,
-                'average_rating': round(float(rating_info.avg_rating), 2) if rating_info else 0,
-                'reviews_count': rating_info.count if rating_info else 0
-            })
+        # Watched counts and review ratings per year, joined in the database
+        year_stats = [
+            {
+                'year': row.year or 0,
+                'watched_count': int(row.watched_count),
+                'average_rating': round(float(row.avg_rating), 2) if row.avg_rating else 0,
+                'reviews_count': int(row.reviews_count)
+            }
+            for row in db.session.execute(STATS_BY_YEAR, {'uid': user_id})
+        ]
         
         return jsonify({
             'success': True,
@@ -147,13 +231,12 @@ def get_stats_by_month():
         
         # Group watched items by month for the specified year
         watched_by_month = db.session.query(
-            extract('month', DiaryEntry.watched_date).label('month'),
+            DiaryEntry.watched_month.label('month'),
             func.count(DiaryEntry.id).label('count')
         ).filter(
             DiaryEntry.user_id == user_id,
-            extract('year', DiaryEntry.watched_date) == year,
-            DiaryEntry.watched_date.isnot(None)
-        ).group_by('month').all()
+            DiaryEntry.watched_year == year
+        ).group_by(DiaryEntry.watched_month).all()
         
         # Create a full 12-month array
         month_stats = []
@@ -182,35 +265,24 @@ def get_genre_stats():
     """Get statistics by genre"""
     try:
         user_id = current_user.id
+        cache_key = f"stats:genres:{user_id}:{get_version(f'stats:{user_id}')}"
         
-        # Get all diary entries with their media items
-        diary_entries = db.session.query(DiaryEntry, MediaItem).join(
-            MediaItem, DiaryEntry.media_id == MediaItem.id
-        ).filter(
-            DiaryEntry.user_id == user_id
-        ).all()
-        
-        # Count genres
-        genre_counts = Counter()
-        for entry, media in diary_entries:
-            if media.genres:
-                genres = media.genres if isinstance(media.genres, list) else media.genres.split(',')
-                for genre in genres:
-                    genre = genre.strip()
-                    if genre:
-                        genre_counts[genre] += 1
-        
-        # Get top genres
-        top_genres = [
-            {'genre': genre, 'count': count}
-            for genre, count in genre_counts.most_common(10)
-        ]
+        def build_payload():
+            # Top genres, aggregated in the database
+            genre_counts, total_genres = _genre_counts(10, DiaryEntry.user_id == user_id)
+            
+            top_genres = [
+                {'genre': genre, 'count': count}
+                for genre, count in genre_counts
+            ]
+            
+            return {
+                'success': True,
+                'top_genres': top_genres,
+                'total_genres': total_genres
+            }
         
-        return jsonify({
-            'success': True,
-            'top_genres': top_genres,
-            'total_genres': len(genre_counts)
-        })
+        return cached_json_response(cache_key, GENRE_STATS_CACHE_TTL, build_payload)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -222,35 +294,32 @@ def get_decade_stats():
     """Get statistics by decade"""
     try:
         user_id = current_user.id
+        cache_key = f"stats:decades:{user_id}:{get_version(f'stats:{user_id}')}"
+        
+        def build_payload():
+            # Count by decade of release, grouped in the database
+            decade = cast(func.floor(extract('year', MediaItem.release_date) / 10) * 10, Integer).label('decade')
+            decade_counts = db.session.query(
+                decade,
+                func.count(DiaryEntry.id).label('count')
+            ).join(
+                MediaItem, DiaryEntry.media_id == MediaItem.id
+            ).filter(
+                DiaryEntry.user_id == user_id,
+                MediaItem.release_date.isnot(None)
+            ).group_by(decade).order_by(decade).all()
+            
+            decade_stats = [
+                {'decade': f"{row.decade}s", 'count': row.count}
+                for row in decade_counts
+            ]
+            
+            return {
+                'success': True,
+                'decade_stats': decade_stats
+            }
         
-        # Get all diary entries with their media items
-        diary_entries = db.session.query(DiaryEntry, MediaItem).join(
-            MediaItem, DiaryEntry.media_id == MediaItem.id
-        ).filter(
-            DiaryEntry.user_id == user_id
-        ).all()
-        
-        # Count by decade
-        decade_counts = Counter()
-        for entry, media in diary_entries:
-            if media.release_date:
-                try:
-                    year = media.release_date.year
-                    decade = (year // 10) * 10
-                    decade_counts[f"{decade}s"] += 1
-                except (ValueError, TypeError, AttributeError):
-                    pass
-        
-        # Sort decades
-        decade_stats = [
-            {'decade': decade, 'count': count}
-            for decade, count in sorted(decade_counts.items())
-        ]
-        
-        return jsonify({
-            'success': True,
-            'decade_stats': decade_stats
-        })
+        return cached_json_response(cache_key, GENRE_STATS_CACHE_TTL, build_payload)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -263,15 +332,10 @@ def get_viewing_streaks():
     try:
         user_id = current_user.id
         
-        # Get all watched dates, ordered
-        watched_dates = db.session.query(
-            func.date(DiaryEntry.watched_date).label('date')
-        ).filter(
-            DiaryEntry.user_id == user_id,
-            DiaryEntry.watched_date.isnot(None)
-        ).distinct().order_by('date').all()
+        # Streaks are measured in the database; only the summary row comes back
+        summary = db.session.execute(STREAK_SUMMARY, {'uid': user_id}).first()
         
-        if not watched_dates:
+        if not summary:
             return jsonify({
                 'success': True,
                 'current_streak': 0,
@@ -279,44 +343,23 @@ def get_viewing_streaks():
                 'total_days': 0
             })
         
-        # Convert to date objects
-        dates = [d.date for d in watched_dates]
-        
-        # Calculate streaks
-        current_streak = 0
-        longest_streak = 0
-        temp_streak = 1
-        
-        today = datetime.now().date()
-        
-        for i in range(len(dates) - 1):
-            diff = (dates[i + 1] - dates[i]).days
-            
-            if diff == 1:
-                temp_streak += 1
-            else:
-                longest_streak = max(longest_streak, temp_streak)
-                temp_streak = 1
-        
-        longest_streak = max(longest_streak, temp_streak)
+        last_streak, last_date, longest_streak, total_days = summary
         
         # Calculate current streak
-        if dates:
-            last_date = dates[-1]
-            days_since = (today - last_date).days
-            
-            if days_since == 0:
-                current_streak = temp_streak
-            elif days_since == 1:
-                current_streak = temp_streak - 1 if temp_streak > 1 else 0
-            else:
-                current_streak = 0
+        days_since = (datetime.now().date() - last_date).days
+        
+        if days_since == 0:
+            current_streak = last_streak
+        elif days_since == 1:
+            current_streak = last_streak - 1 if last_streak > 1 else 0
+        else:
+            current_streak = 0
         
         return jsonify({
             'success': True,
             'current_streak': current_streak,
             'longest_streak': longest_streak,
-            'total_days': len(dates)
+            'total_days': int(total_days)
         })
         
     except Exception as e:
@@ -327,103 +370,98 @@ def get_viewing_streaks():
 @login_required
 def get_year_in_review(year):
     """Generate Year in Review for a specific year"""
+    # The range filter needs datetime(year + 1, 1, 1) to exist
+    if not MINYEAR <= year < MAXYEAR:
+        return jsonify({'success': False, 'error': f'year must be between {MINYEAR} and {MAXYEAR - 1}'}), 400
+    
     try:
         user_id = current_user.id
+        cache_key = f"stats:year:{user_id}:{year}:{get_version(f'stats:{user_id}')}"
         
-        # Total watched this year
-        total_watched = DiaryEntry.query.filter(
-            DiaryEntry.user_id == user_id,
-            extract('year', DiaryEntry.watched_date) == year
-        ).count()
-        
-        # Get all watched items for the year with media data
-        watched_items = db.session.query(DiaryEntry, MediaItem).join(
-            MediaItem, DiaryEntry.media_id == MediaItem.id
-        ).filter(
-            DiaryEntry.user_id == user_id,
-            extract('year', DiaryEntry.watched_date) == year
-        ).all()
-        
-        # Top genres
-        genre_counts = Counter()
-        for entry, media in watched_items:
-            if media.genres:
-                genres = media.genres if isinstance(media.genres, list) else media.genres.split(',')
-                for genre in genres:
-                    genre = genre.strip()
-                    if genre:
-                        genre_counts[genre] += 1
-        
-        top_genres = [genre for genre, count in genre_counts.most_common(3)]
-        
-        # Top rated (reviews from this year)
-        top_rated = db.session.query(Review).filter(
-            Review.user_id == user_id,
-            Review.is_deleted.is_(False),
-            extract('year', Review.created_at) == year,
-            Review.rating.isnot(None)
-        ).order_by(desc(Review.rating)).limit(10).all()
-        
-        top_rated_list = [
-            {
-                'media_id': r.media_id,
-                'media_type': r.media_type,
-                'title': r.title,
-                'rating': r.rating
+        def build_payload():
+            # Range bounds keep the created_at index usable (no extract() per row)
+            year_start, year_end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+            
+            # Diary counts per (month, media type) in one round trip; the
+            # total, busiest month and movie/TV split all derive from these rows
+            month_type_counts = db.session.execute(
+                YEAR_ACTIVITY, {'uid': user_id, 'year': year}
+            ).all()
+            total_watched = 0
+            month_counts = defaultdict(int)
+            media_breakdown = defaultdict(int)
+            for month, media_type, count in month_type_counts:
+                total_watched += count
+                month_counts[month] += count
+                media_breakdown[media_type] += count
+            
+            # Top genres, aggregated in the database
+            genre_counts, _ = _genre_counts(
+                3,
+                DiaryEntry.user_id == user_id,
+                DiaryEntry.watched_year == year
+            )
+            top_genres = [genre for genre, count in genre_counts]
+            
+            # Top rated (reviews from this year)
+            # Only the four columns the response uses; no Review objects are built
+            top_rated = db.session.query(
+                Review.media_id,
+                Review.media_type,
+                Review.title,
+                Review.rating
+            ).filter(
+                Review.user_id == user_id,
+                Review.is_deleted.is_(False),
+                Review.created_at >= year_start,
+                Review.created_at < year_end,
+                Review.rating.isnot(None)
+            ).order_by(desc(Review.rating)).limit(10).all()
+            
+            top_rated_list = [
+                {
+                    'media_id': r.media_id,
+                    'media_type': r.media_type,
+                    'title': r.title,
+                    'rating': r.rating
+                }
+                for r in top_rated
+            ]
+            
+            # Average rating for the year
+            avg_rating = db.session.query(
+                func.avg(Review.rating)
+            ).filter(
+                Review.user_id == user_id,
+                Review.is_deleted.is_(False),
+                Review.created_at >= year_start,
+                Review.created_at < year_end,
+                Review.rating.isnot(None)
+            ).scalar()
+            
+            # Busiest month (earliest one on ties)
+            busiest = max(sorted(month_counts.items()), key=itemgetter(1), default=None)
+            
+            busiest_month = {
+                'month': busiest[0] if busiest else 0,
+                'month_name': calendar.month_name[busiest[0]] if busiest else 'N/A',
+                'count': busiest[1] if busiest else 0
             }
-            for r in top_rated
-        ]
-        
-        # Average rating for the year
-        avg_rating = db.session.query(
-            func.avg(Review.rating)
-        ).filter(
-            Review.user_id == user_id,
-            Review.is_deleted.is_(False),
-            extract('year', Review.created_at) == year,
-            Review.rating.isnot(None)
-        ).scalar()
-        
-        # Busiest month
-        busiest_month_data = db.session.query(
-            extract('month', DiaryEntry.watched_date).label('month'),
-            func.count(DiaryEntry.id).label('count')
-        ).filter(
-            DiaryEntry.user_id == user_id,
-            extract('year', DiaryEntry.watched_date) == year
-        ).group_by('month').order_by(desc('count')).first()
-        
-        busiest_month = {
-            'month': int(busiest_month_data.month) if busiest_month_data else 0,
-            'month_name': calendar.month_name[int(busiest_month_data.month)] if busiest_month_data else 'N/A',
-            'count': busiest_month_data.count if busiest_month_data else 0
-        }
-        
-        # Movie vs TV breakdown
-        media_type_counts = db.session.query(
-            DiaryEntry.media_type,
-            func.count(DiaryEntry.id)
-        ).filter(
-            DiaryEntry.user_id == user_id,
-            extract('year', DiaryEntry.watched_date) == year
-        ).group_by(DiaryEntry.media_type).all()
-        
-        media_breakdown = {
-            media_type: count for media_type, count in media_type_counts
-        }
-        
-        return jsonify({
-            'success': True,
-            'year': year,
-            'year_in_review': {
-                'total_watched': total_watched,
-                'top_genres': top_genres,
-                'top_rated': top_rated_list,
-                'average_rating': round(float(avg_rating), 2) if avg_rating else 0,
-                'busiest_month': busiest_month,
-                'media_breakdown': media_breakdown
+            
+            return {
+                'success': True,
+                'year': year,
+                'year_in_review': {
+                    'total_watched': total_watched,
+                    'top_genres': top_genres,
+                    'top_rated': top_rated_list,
+                    'average_rating': round(float(avg_rating), 2) if avg_rating else 0,
+                    'busiest_month': busiest_month,
+                    'media_breakdown': dict(media_breakdown)
+                }
             }
-        })
+        
+        return cached_json_response(cache_key, YEAR_IN_REVIEW_CACHE_TTL, build_payload)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -436,47 +474,16 @@ def compare_with_user(other_user_id):
     try:
         user_id = current_user.id
         
-        # Get both users
-        other_user = User.query.get(other_user_id)
-        if not other_user:
-            return jsonify({'success': False, 'error': 'User not found'}), 404
+        # Both users' stats and their shared titles in one round trip
+        (other_username,
+         user1_reviews, user1_avg, user1_watched,
+         user2_reviews, user2_avg, user2_watched,
+         common_watched) = db.session.execute(
+            COMPARE_TOTALS, {'me': user_id, 'them': other_user_id}
+        ).one()
         
-        # Get stats for both users
-        user1_watched = DiaryEntry.query.filter_by(user_id=user_id).count()
-        user2_watched = DiaryEntry.query.filter_by(user_id=other_user_id).count()
-        
-        user1_reviews = Review.query.filter_by(
-            user_id=user_id,
-            is_deleted=False
-        ).count()
-        user2_reviews = Review.query.filter_by(
-            user_id=other_user_id,
-            is_deleted=False
-        ).count()
-        
-        user1_avg = db.session.query(func.avg(Review.rating)).filter(
-            Review.user_id == user_id,
-            Review.is_deleted.is_(False),
-            Review.rating.isnot(None)
-        ).scalar()
-        
-        user2_avg = db.session.query(func.avg(Review.rating)).filter(
-            Review.user_id == other_user_id,
-            Review.is_deleted.is_(False),
-            Review.rating.isnot(None)
-        ).scalar()
-        
-        # Find common watched items
-        user1_media = set(
-            (v.media_id, v.media_type)
-            for v in DiaryEntry.query.filter_by(user_id=user_id).all()
-        )
-        user2_media = set(
-            (v.media_id, v.media_type)
-            for v in DiaryEntry.query.filter_by(user_id=other_user_id).all()
-        )
-        
-        common_watched = len(user1_media & user2_media)
+        if other_username is None:
+            return jsonify({'success': False, 'error': 'User not found'}), 404
         
         # Calculate taste compatibility (simple version)
         if user1_watched > 0 and user2_watched > 0:
@@ -494,7 +501,7 @@ def compare_with_user(other_user_id):
                     'average_rating': round(float(user1_avg), 2) if user1_avg else 0
                 },
                 'other_user': {
-                    'username': other_user.username,
+                    'username': other_username,
                     'watched_count': user2_watched,
                     'reviews_count': user2_reviews,
                     'average_rating': round(float(user2_avg), 2) if user2_avg else 0
@@ -508,60 +515,84 @@ def compare_with_user(other_user_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def _platform_stats():
+    """
+    ((total users, total reviews, total watched, average rating), top 10
+    most watched rows). Reads the mv_platform_stats / mv_most_watched views;
+    falls back to scanning the tables live when the views have not been
+    created yet.
+    """
+    try:
+        totals = db.session.execute(select(
+            platform_stats_view.c.total_users,
+            platform_stats_view.c.total_reviews,
+            platform_stats_view.c.total_watched,
+            platform_stats_view.c.average_rating
+        )).one()
+        most_watched = db.session.execute(
+            select(most_watched_view).order_by(most_watched_view.c.watch_count.desc()).limit(10)
+        ).all()
+        return totals, most_watched
+    except ProgrammingError:
+        db.session.rollback()
+    
+    live_reviews = Review.is_deleted.is_(False)
+    totals = db.session.execute(select(
+        select(func.count(User.id)).where(User.is_active.is_(True)).scalar_subquery(),
+        select(func.count(Review.id)).where(live_reviews).scalar_subquery(),
+        select(func.count(DiaryEntry.id)).scalar_subquery(),
+        select(func.avg(Review.rating)).where(live_reviews, Review.rating.isnot(None)).scalar_subquery()
+    )).one()
+    
+    most_watched = db.session.query(
+        DiaryEntry.media_id,
+        DiaryEntry.media_type,
+        MediaItem.title,
+        func.count(DiaryEntry.id).label('watch_count')
+    ).join(
+        MediaItem, DiaryEntry.media_id == MediaItem.id
+    ).group_by(
+        DiaryEntry.media_id,
+        DiaryEntry.media_type,
+        MediaItem.title
+    ).order_by(desc('watch_count')).limit(10).all()
+    
+    return totals, most_watched
+
+
 @stats_bp.route('/api/stats/platform', methods=['GET'])
 @login_required
 def get_platform_stats():
     """Get platform-wide statistics"""
     try:
-        # Total users
-        total_users = User.query.filter_by(is_active=True).count()
-        
-        # Total reviews
-        total_reviews = Review.query.filter_by(is_deleted=False).count()
-        
-        # Total watched
-        total_watched = DiaryEntry.query.count()
-        
-        # Most watched media
-        most_watched = db.session.query(
-            DiaryEntry.media_id,
-            DiaryEntry.media_type,
-            MediaItem.title,
-            func.count(DiaryEntry.id).label('watch_count')
-        ).join(
-            MediaItem, DiaryEntry.media_id == MediaItem.id
-        ).group_by(
-            DiaryEntry.media_id,
-            DiaryEntry.media_type,
-            MediaItem.title
-        ).order_by(desc('watch_count')).limit(10).all()
-        
-        most_watched_list = [
-            {
-                'media_id': m.media_id,
-                'media_type': m.media_type,
-                'title': m.title,
-                'watch_count': m.watch_count
-            }
-            for m in most_watched
-        ]
-        
-        # Platform average rating
-        platform_avg = db.session.query(func.avg(Review.rating)).filter(
-            Review.is_deleted.is_(False),
-            Review.rating.isnot(None)
-        ).scalar()
+        # Platform-wide numbers are shared by every user and may lag a few minutes
+        cache_key = 'stats:platform'
         
-        return jsonify({
-            'success': True,
-            'platform_stats': {
-                'total_users': total_users,
-                'total_reviews': total_reviews,
-                'total_watched': total_watched,
-                'average_rating': round(float(platform_avg), 2) if platform_avg else 0,
-                'most_watched': most_watched_list
+        def build_payload():
+            (total_users, total_reviews, total_watched, platform_avg), most_watched = _platform_stats()
+            
+            most_watched_list = [
+                {
+                    'media_id': m.media_id,
+                    'media_type': m.media_type,
+                    'title': m.title,
+                    'watch_count': m.watch_count
+                }
+                for m in most_watched
+            ]
+            
+            return {
+                'success': True,
+                'platform_stats': {
+                    'total_users': total_users,
+                    'total_reviews': total_reviews,
+                    'total_watched': total_watched,
+                    'average_rating': round(float(platform_avg), 2) if platform_avg else 0,
+                    'most_watched': most_watched_list
+                }
             }
-        })
+        
+        return cached_json_response(cache_key, PLATFORM_STATS_CACHE_TTL, build_payload)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
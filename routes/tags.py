@@ -2,7 +2,10 @@
 from flask import Blueprint, request, jsonify, render_template
 from flask_login import login_required, current_user
 from models import db, Tag, UserMediaTag
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import contains_eager
+from api.tag_index import get_tag_index
 
 tags_bp = Blueprint('tags', __name__)
 
@@ -17,14 +20,36 @@ def test_tags_page():
 def get_popular_tags():
     """Get most used tags globally"""
     limit = request.args.get('limit', 20, type=int)
+    # Keyset cursor from the previous page: ?after_count=<usage_count>&after_id=<id>
+    after_count = request.args.get('after_count', type=int)
+    after_id = request.args.get('after_id', type=int)
     
-    popular_tags = Tag.query.filter(Tag.usage_count > 0).order_by(desc(Tag.usage_count)).limit(limit).all()
+    query = Tag.query.filter(Tag.usage_count > 0)
+    if after_count is not None and after_id is not None:
+        query = query.filter(tuple_(Tag.usage_count, Tag.id) < tuple_(after_count, after_id))
+    
+    rows = query.order_by(desc(Tag.usage_count), desc(Tag.id)).limit(limit + 1).all()
+    popular_tags = rows[:limit]
+    
+    next_cursor = None
+    if len(rows) > limit and popular_tags:
+        last = popular_tags[-1]
+        next_cursor = {'after_count': last.usage_count, 'after_id': last.id}
     
     return jsonify({
-        'tags': [tag.to_dict() for tag in popular_tags]
+        'tags': [tag.to_dict() for tag in popular_tags],
+        'next_cursor': next_cursor
     }), 200
 
 
+def _load_popular_tags(size):
+    """The `size` most used tags as dicts, for the autocomplete index"""
+    tags = Tag.query.filter(Tag.usage_count > 0).order_by(
+        desc(Tag.usage_count), desc(Tag.id)
+    ).limit(size).all()
+    return [tag.to_dict() for tag in tags]
+
+
 @tags_bp.route('/api/tags/search', methods=['GET'])
 def search_tags():
     """Search/autocomplete tags"""
@@ -34,11 +59,23 @@ def search_tags():
     if not query:
         return jsonify({'tags': []}), 200
     
-    # Search tags that start with or contain the query
+    # Hot prefixes are answered from this worker's in-memory tag index
+    indexed = get_tag_index(_load_popular_tags).search(query, limit) if limit > 0 else None
+    if indexed is not None:
+        return jsonify({'tags': indexed}), 200
+    
+    # Prefix matches first: LIKE 'q%' is an index range scan
     matching_tags = Tag.query.filter(
-        Tag.name.like(f'%{query}%')
+        Tag.name.startswith(query, autoescape=True)
     ).order_by(desc(Tag.usage_count)).limit(limit).all()
     
+    # Only fall back to the unindexable '%q%' scan when prefixes don't fill the page
+    if len(matching_tags) < limit:
+        matching_tags += Tag.query.filter(
+            Tag.name.contains(query, autoescape=True),
+            ~Tag.name.startswith(query, autoescape=True)
+        ).order_by(desc(Tag.usage_count)).limit(limit - len(matching_tags)).all()
+    
     return jsonify({
         'tags': [tag.to_dict() for tag in matching_tags]
     }), 200
@@ -47,28 +84,21 @@ def search_tags():
 @tags_bp.route('/api/users/<int:user_id>/tags', methods=['GET'])
 def get_user_tags(user_id):
     """Get a user's tags (all tags they've used)"""
-    # Get distinct tags used by this user
-    user_tags = db.session.query(Tag).join(UserMediaTag).filter(
-        UserMediaTag.user_id == user_id
-    ).order_by(Tag.name).all()
-    
-    # Count how many times each tag is used by this user
-    tag_counts = db.session.query(
-        Tag.id,
+    # Tags used by this user with their per-user counts, in one GROUP BY
+    user_tags = db.session.query(
+        Tag,
         func.count(UserMediaTag.id).label('count')
     ).join(UserMediaTag).filter(
         UserMediaTag.user_id == user_id
-    ).group_by(Tag.id).all()
-    
-    tag_count_map = {tag_id: count for tag_id, count in tag_counts}
+    ).group_by(Tag.id).order_by(Tag.name).all()
     
     return jsonify({
         'tags': [
             {
                 **tag.to_dict(),
-                'user_usage_count': tag_count_map.get(tag.id, 0)
+                'user_usage_count': count
             }
-            for tag in user_tags
+            for tag, count in user_tags
         ]
     }), 200
 
@@ -82,8 +112,11 @@ def get_media_tags(media_id):
     if not user_id:
         return jsonify({'error': 'user_id is required'}), 400
     
-    # Get tags applied by this user to this media
-    user_media_tags = UserMediaTag.query.join(Tag).filter(
+    # Get tags applied by this user to this media; the tag columns ride
+    # along on the join instead of a lazy load per row
+    user_media_tags = UserMediaTag.query.join(Tag).options(
+        contains_eager(UserMediaTag.tag)
+    ).filter(
         UserMediaTag.user_id == user_id,
         UserMediaTag.media_id == media_id,
         UserMediaTag.media_type == media_type
@@ -132,38 +165,50 @@ def add_tags_to_media(media_id):
     if not normalized_tags:
         return jsonify({'error': 'No valid tags provided'}), 400
     
-    added_tags = []
+    # Duplicates in the request would only be skipped one by one
+    normalized_tags = list(dict.fromkeys(normalized_tags))
+    
+    # Get or create every tag in one statement. The no-op update on conflict
+    # makes RETURNING include tags that already existed.
+    stmt = insert(Tag).values([
+        {'name': tag_name, 'usage_count': 0} for tag_name in normalized_tags
+    ])
+    tag_ids = dict(db.session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=['name'],
+            set_={'name': stmt.excluded.name}
+        ).returning(Tag.name, Tag.id)
+    ).all())
+    
+    # Tag the media; pairs the user already has are skipped by the unique constraint
+    added_ids = set(db.session.execute(
+        insert(UserMediaTag).values([
+            {
+                'user_id': current_user.id,
+                'media_id': media_id,
+                'media_type': media_type,
+                'tag_id': tag_ids[tag_name]
+            }
+            for tag_name in normalized_tags
+        ]).on_conflict_do_nothing(
+            constraint='unique_user_media_tag'
+        ).returning(UserMediaTag.tag_id)
+    ).scalars())
     
-    for tag_name in normalized_tags:
-        # Get or create tag
-        tag = Tag.query.filter_by(name=tag_name).first()
-        if not tag:
-            tag = Tag(name=tag_name, usage_count=0)
-            db.session.add(tag)
-            db.session.flush()  # Get the tag ID
-        
-        # Check if user already tagged this media with this tag
-        existing = UserMediaTag.query.filter_by(
-            user_id=current_user.id,
-            media_id=media_id,
-            media_type=media_type,
-            tag_id=tag.id
-        ).first()
-        
-        if not existing:
-            # Create new user media tag
-            user_media_tag = UserMediaTag(
-                user_id=current_user.id,
-                media_id=media_id,
-                media_type=media_type,
-                tag_id=tag.id
-            )
-            db.session.add(user_media_tag)
-            
-            # Increment tag usage count
-            tag.usage_count += 1
-            
-            added_tags.append(tag)
+    # Increment usage counts of the newly applied tags in one UPDATE
+    added_tags = []
+    if added_ids:
+        updated = {tag.id: tag for tag in db.session.scalars(
+            update(Tag).where(
+                Tag.id.in_(added_ids)
+            ).values(
+                usage_count=func.coalesce(Tag.usage_count, 0) + 1
+            ).returning(Tag)
+        )}
+        added_tags = [
+            updated[tag_ids[tag_name]] for tag_name in normalized_tags
+            if tag_ids[tag_name] in updated
+        ]
     
     db.session.commit()
     
@@ -4,22 +4,50 @@ Tracks and displays trending media, tags, and users
 """
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-from models import db, MediaItem, Tag, User, Review, MediaLike, MediaComment, UserMediaTag
-from sqlalchemy import func, desc, and_
+from models import db, MediaItem, Tag, User, Review, MediaLike, MediaComment, UserMediaTag, trending_media_view, trending_users_view
+from sqlalchemy import func, desc, and_, select, union_all, literal
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.exc import ProgrammingError
 from datetime import datetime, timedelta
 
+from api.cache import cached_json_response
+
 trending = Blueprint('trending', __name__)
 
+# Trending responses are shared by every visitor and only drift slowly, so
+# they are cached (seconds) instead of re-aggregated on each request
+TRENDING_CACHE_TTL = 300
 
-@trending.route('/api/trending/media', methods=['GET'])
-def get_trending_media():
-    """Get trending movies and TV shows based on recent activity"""
-    days = request.args.get('days', 7, type=int)
-    media_type = request.args.get('type', None)  # 'movie', 'tv', or None for both
-    limit = request.args.get('limit', 20, type=int)
-    
-    since_date = datetime.utcnow() - timedelta(days=days)
-    
+# Windows (days) precomputed in the trending views; others are aggregated live
+TRENDING_WINDOWS = (1, 7, 30)
+
+# Items per list in /api/trending/summary
+SUMMARY_LIMIT = 5
+
+# Upper bounds for ?days= and ?limit=; larger values would aggregate whole
+# tables and build huge responses
+MAX_TRENDING_DAYS = 365
+MAX_TRENDING_LIMIT = 100
+
+TRENDING_MEDIA_TYPES = ('movie', 'tv')
+
+
+def _parse_trending_args(default_days=7, default_limit=20):
+    """Read (days, limit) from request args, clamped to 1..MAX_TRENDING_DAYS/LIMIT"""
+    days = request.args.get('days', default_days, type=int)
+    limit = request.args.get('limit', default_limit, type=int)
+    return min(max(days, 1), MAX_TRENDING_DAYS), min(max(limit, 1), MAX_TRENDING_LIMIT)
+
+
+def _cached_trending(cache_key, build_payload):
+    """Serve a trending payload from cache; shared caches/CDNs may keep it too"""
+    response = cached_json_response(cache_key, TRENDING_CACHE_TTL, build_payload)
+    response.headers['Cache-Control'] = f'public, s-maxage={TRENDING_CACHE_TTL}, stale-while-revalidate=86400'
+    return response
+
+
+def _live_trending_media_query(since_date, media_type, limit):
+    """Query for the top media by trending score since since_date, aggregated from the activity tables"""
     # Score based on multiple factors:
     # - Number of likes
     # - Number of comments
@@ -27,88 +55,114 @@ def get_trending_media():
     # - Number of tags added
     # - Recency bonus
     
-    # Query to calculate trending scores
+    # Each signal is counted once per media item in its own aggregate
+    # subquery and LEFT JOINed on, so every count arrives with the media row
+    like_counts = db.session.query(
+        MediaLike.media_id,
+        MediaLike.media_type,
+        func.count().label('count')
+    ).filter(
+        MediaLike.created_at >= since_date
+    ).group_by(MediaLike.media_id, MediaLike.media_type).subquery()
+    
+    comment_counts = db.session.query(
+        MediaComment.media_id,
+        MediaComment.media_type,
+        func.count().label('count')
+    ).filter(
+        MediaComment.created_at >= since_date,
+        MediaComment.is_deleted == False
+    ).group_by(MediaComment.media_id, MediaComment.media_type).subquery()
+    
+    # Review.media_id references media_item.id (likes/comments store TMDB ids)
+    review_counts = db.session.query(
+        Review.media_id,
+        func.count().label('count')
+    ).filter(
+        Review.created_at >= since_date
+    ).group_by(Review.media_id).subquery()
+    
+    like_count = func.coalesce(like_counts.c.count, 0)
+    comment_count = func.coalesce(comment_counts.c.count, 0)
+    review_count = func.coalesce(review_counts.c.count, 0)
+    # Trending score, ranked in the database so LIMIT keeps the true top items
+    score = (like_count * 2 + comment_count * 3 + review_count * 5).label('score')
+    
     base_query = db.session.query(
         MediaItem.id,
         MediaItem.tmdb_id,
         MediaItem.media_type,
         MediaItem.title,
         MediaItem.poster_path,
-        func.count(MediaLike.id).label('like_count'),
-    ).outerjoin(MediaLike, and_(
-        MediaLike.media_id == MediaItem.tmdb_id,
-        MediaLike.media_type == MediaItem.media_type,
-        MediaLike.created_at >= since_date
-    ))
+        score,
+        like_count.label('like_count'),
+        comment_count.label('comment_count'),
+        review_count.label('review_count')
+    ).outerjoin(like_counts, and_(
+        like_counts.c.media_id == MediaItem.tmdb_id,
+        like_counts.c.media_type == MediaItem.media_type
+    )).outerjoin(comment_counts, and_(
+        comment_counts.c.media_id == MediaItem.tmdb_id,
+        comment_counts.c.media_type == MediaItem.media_type
+    )).outerjoin(
+        review_counts, review_counts.c.media_id == MediaItem.id
+    )
     
     if media_type:
         base_query = base_query.filter(MediaItem.media_type == media_type)
     
-    base_query = base_query.group_by(
-        MediaItem.id, MediaItem.tmdb_id, MediaItem.media_type, 
-        MediaItem.title, MediaItem.poster_path
-    )
-    
-    results = base_query.order_by(desc('like_count')).limit(limit).all()
-    
-    # Enhance with additional data
-    trending_items = []
-    for item in results:
-        # Get comment count
-        comment_count = MediaComment.query.filter(
-            MediaComment.media_id == item.tmdb_id,
-            MediaComment.media_type == item.media_type,
-            MediaComment.created_at >= since_date,
-            MediaComment.is_deleted == False
-        ).count()
-        
-        # Get review count
-        review_count = Review.query.filter(
-            Review.media_id == item.tmdb_id,
-            Review.media_type == item.media_type,
-            Review.created_at >= since_date
-        ).count()
-        
-        # Calculate trending score
-        score = (item.like_count * 2) + (comment_count * 3) + (review_count * 5)
-        
-        trending_items.append({
-            'id': item.id,
-            'tmdb_id': item.tmdb_id,
-            'media_type': item.media_type,
-            'title': item.title,
-            'poster_path': item.poster_path,
-            'score': score,
-            'like_count': item.like_count,
-            'comment_count': comment_count,
-            'review_count': review_count
-        })
-    
-    # Re-sort by calculated score
-    trending_items.sort(key=lambda x: x['score'], reverse=True)
-    
-    return jsonify({
-        'success': True,
-        'period_days': days,
-        'media_type': media_type or 'all',
-        'items': trending_items[:limit]
-    })
+    return base_query.order_by(desc(score), MediaItem.id).limit(limit)
 
 
-@trending.route('/api/trending/tags', methods=['GET'])
-def get_trending_tags():
-    """Get trending tags based on recent usage"""
-    days = request.args.get('days', 7, type=int)
-    limit = request.args.get('limit', 20, type=int)
+def _trending_media_view_query(days, media_type, limit):
+    """Query for the top media of a precomputed window in trending_media_mv"""
+    query = db.session.query(
+        trending_media_view.c.id,
+        trending_media_view.c.tmdb_id,
+        trending_media_view.c.media_type,
+        trending_media_view.c.title,
+        trending_media_view.c.poster_path,
+        trending_media_view.c.score,
+        trending_media_view.c.like_count,
+        trending_media_view.c.comment_count,
+        trending_media_view.c.review_count
+    ).filter(trending_media_view.c.window_days == days)
+    if media_type:
+        query = query.filter(trending_media_view.c.media_type == media_type)
+    return query.order_by(
+        trending_media_view.c.score.desc(), trending_media_view.c.id
+    ).limit(limit)
+
+
+def _trending_media_rows(days, media_type, limit):
+    """
+    Top media by trending score over the last `days`. Standard windows are
+    read from trending_media_mv (refreshed by scripts/refresh_trending.py);
+    other windows, or a database without the view, aggregate live.
+    """
+    if days in TRENDING_WINDOWS:
+        try:
+            return _trending_media_view_query(days, media_type, limit).all()
+        except ProgrammingError:
+            db.session.rollback()
     
     since_date = datetime.utcnow() - timedelta(days=days)
-    
+    return _live_trending_media_query(since_date, media_type, limit).all()
+
+
+def _compute_trending_media(days, media_type, limit):
+    """Trending media item dicts for the last `days` (column labels are the keys)"""
+    return [dict(row._mapping) for row in _trending_media_rows(days, media_type, limit)]
+
+
+def _trending_tags_query(since_date, limit):
+    """Query for the tags used most since since_date"""
     # Count recent tag usage
-    trending_tags = db.session.query(
+    return db.session.query(
         Tag.id,
         Tag.name,
-        Tag.usage_count,
-        func.count(UserMediaTag.id).label('recent_usage')
+        Tag.usage_count.label('total_usage'),
+        func.count().label('recent_usage')
     ).join(
         UserMediaTag, UserMediaTag.tag_id == Tag.id
     ).filter(
@@ -116,144 +170,274 @@ def get_trending_tags():
     ).group_by(
         Tag.id, Tag.name, Tag.usage_count
     ).order_by(
-        desc('recent_usage')
-    ).limit(limit).all()
-    
-    return jsonify({
-        'success': True,
-        'period_days': days,
-        'tags': [{
-            'id': tag.id,
-            'name': tag.name,
-            'total_usage': tag.usage_count,
-            'recent_usage': tag.recent_usage
-        } for tag in trending_tags]
-    })
+        desc('recent_usage'), Tag.id
+    ).limit(limit)
 
 
-@trending.route('/api/trending/users', methods=['GET'])
-def get_trending_users():
-    """Get most active users based on recent activity"""
-    days = request.args.get('days', 7, type=int)
-    limit = request.args.get('limit', 20, type=int)
-    
+def _compute_trending_tags(days, limit):
+    """Tag dicts ranked by usage over the last `days` (column labels are the keys)"""
     since_date = datetime.utcnow() - timedelta(days=days)
+    return [dict(row._mapping) for row in _trending_tags_query(since_date, limit)]
+
+
+def _trending_users_query(since_date, limit):
+    """Query for the most active users since since_date"""
+    # Recent reviews, comments and likes form one activity stream tagged by
+    # kind; a single GROUP BY user_id with COUNT(*) FILTER produces all three
+    # counts, so only users with some recent activity are considered at all.
+    activity = union_all(
+        select(Review.user_id, literal('review').label('kind')).where(
+            Review.created_at >= since_date
+        ),
+        select(MediaComment.user_id, literal('comment').label('kind')).where(
+            MediaComment.created_at >= since_date,
+            MediaComment.is_deleted == False
+        ),
+        select(MediaLike.user_id, literal('like').label('kind')).where(
+            MediaLike.created_at >= since_date
+        )
+    ).subquery()
     
-    # Count activities: reviews, comments, likes
-    user_activity = db.session.query(
+    counts = select(
+        activity.c.user_id,
+        func.count().filter(activity.c.kind == 'review').label('review_count'),
+        func.count().filter(activity.c.kind == 'comment').label('comment_count'),
+        func.count().filter(activity.c.kind == 'like').label('like_count')
+    ).group_by(activity.c.user_id).subquery()
+    
+    # Calculate activity score
+    score = (counts.c.review_count * 5 + counts.c.comment_count * 3 + counts.c.like_count * 1).label('activity_score')
+    
+    return db.session.query(
         User.id,
         User.username,
         User.profile_picture,
-        User.followers_count,
-        func.count(Review.id).label('review_count')
-    ).outerjoin(
-        Review, and_(Review.user_id == User.id, Review.created_at >= since_date)
-    ).group_by(
-        User.id, User.username, User.profile_picture, User.followers_count
-    ).all()
+        func.coalesce(User.followers_count, 0).label('followers_count'),
+        score,
+        counts.c.review_count,
+        counts.c.comment_count,
+        counts.c.like_count
+    ).join(
+        counts, counts.c.user_id == User.id
+    ).order_by(desc(score), User.id).limit(limit)
+
+
+def _trending_users_view_query(days, limit):
+    """Query for the most active users of a precomputed window in trending_users_mv"""
+    return db.session.query(
+        User.id,
+        User.username,
+        User.profile_picture,
+        func.coalesce(User.followers_count, 0).label('followers_count'),
+        trending_users_view.c.activity_score,
+        trending_users_view.c.review_count,
+        trending_users_view.c.comment_count,
+        trending_users_view.c.like_count
+    ).select_from(trending_users_view).join(
+        User, User.id == trending_users_view.c.user_id
+    ).filter(
+        trending_users_view.c.window_days == days
+    ).order_by(
+        trending_users_view.c.activity_score.desc(), trending_users_view.c.user_id
+    ).limit(limit)
+
+
+def _trending_users_rows(days, limit):
+    """
+    Most active users over the last `days`, from trending_users_mv for the
+    standard windows and aggregated live otherwise (or without the view).
+    """
+    if days in TRENDING_WINDOWS:
+        try:
+            return _trending_users_view_query(days, limit).all()
+        except ProgrammingError:
+            db.session.rollback()
     
-    # Add comment counts
-    users_with_scores = []
-    for user in user_activity:
-        comment_count = MediaComment.query.filter(
-            MediaComment.user_id == user.id,
-            MediaComment.created_at >= since_date,
-            MediaComment.is_deleted == False
-        ).count()
-        
-        like_count = MediaLike.query.filter(
-            MediaLike.user_id == user.id,
-            MediaLike.created_at >= since_date
-        ).count()
-        
-        # Calculate activity score
-        score = (user.review_count * 5) + (comment_count * 3) + (like_count * 1)
-        
-        users_with_scores.append({
-            'id': user.id,
-            'username': user.username,
-            'profile_picture': user.profile_picture,
-            'followers_count': user.followers_count or 0,
-            'activity_score': score,
-            'review_count': user.review_count,
-            'comment_count': comment_count,
-            'like_count': like_count
-        })
+    since_date = datetime.utcnow() - timedelta(days=days)
+    return _trending_users_query(since_date, limit).all()
+
+
+def _compute_trending_users(days, limit):
+    """User dicts ranked by activity score over the last `days` (column labels are the keys)"""
+    return [dict(row._mapping) for row in _trending_users_rows(days, limit)]
+
+
+def _json_rows(query, order_by):
+    """
+    Scalar subquery folding a query's rows into a JSON array of objects
+    keyed by column label (NULL when there are no rows). order_by(rows)
+    gives the sort columns of the row subquery.
+    """
+    rows = query.subquery()
+    return select(
+        func.json_agg(aggregate_order_by(rows.table_valued(), *order_by(rows)))
+    ).scalar_subquery()
+
+
+def _trending_summary_lists(days, from_views):
+    """
+    Top media, tags and users for the summary in one statement: each list
+    is aggregated to JSON in its own scalar subquery of a single SELECT.
+    """
+    since_date = datetime.utcnow() - timedelta(days=days)
+    if from_views:
+        media = _trending_media_view_query(days, None, SUMMARY_LIMIT)
+        users = _trending_users_view_query(days, SUMMARY_LIMIT)
+    else:
+        media = _live_trending_media_query(since_date, None, SUMMARY_LIMIT)
+        users = _trending_users_query(since_date, SUMMARY_LIMIT)
+    
+    row = db.session.execute(select(
+        _json_rows(media, lambda rows: (rows.c.score.desc(), rows.c.id)).label('media'),
+        _json_rows(_trending_tags_query(since_date, SUMMARY_LIMIT),
+                   lambda rows: (rows.c.recent_usage.desc(), rows.c.id)).label('tags'),
+        _json_rows(users, lambda rows: (rows.c.activity_score.desc(), rows.c.id)).label('users')
+    )).one()
+    return row.media or [], row.tags or [], row.users or []
+
+
+@trending.route('/api/trending/media', methods=['GET'])
+def get_trending_media():
+    """Get trending movies and TV shows based on recent activity"""
+    days, limit = _parse_trending_args()
+    media_type = request.args.get('type') or None  # 'movie', 'tv', or None for both
+    if media_type is not None and media_type not in TRENDING_MEDIA_TYPES:
+        return jsonify({'error': "type must be 'movie' or 'tv'"}), 400
+    
+    def build_payload():
+        return {
+            'success': True,
+            'period_days': days,
+            'media_type': media_type or 'all',
+            'items': _compute_trending_media(days, media_type, limit)
+        }
+    
+    return _cached_trending(
+        f"trending:media:{days}:{media_type or 'all'}:{limit}",
+        build_payload
+    )
+
+
+@trending.route('/api/trending/tags', methods=['GET'])
+def get_trending_tags():
+    """Get trending tags based on recent usage"""
+    days, limit = _parse_trending_args()
+    
+    def build_payload():
+        return {
+            'success': True,
+            'period_days': days,
+            'tags': _compute_trending_tags(days, limit)
+        }
     
-    # Sort by activity score
-    users_with_scores.sort(key=lambda x: x['activity_score'], reverse=True)
+    return _cached_trending(
+        f"trending:tags:{days}:{limit}",
+        build_payload
+    )
+
+
+@trending.route('/api/trending/users', methods=['GET'])
+def get_trending_users():
+    """Get most active users based on recent activity"""
+    days, limit = _parse_trending_args()
+    
+    def build_payload():
+        return {
+            'success': True,
+            'period_days': days,
+            'users': _compute_trending_users(days, limit)
+        }
     
-    return jsonify({
-        'success': True,
-        'period_days': days,
-        'users': users_with_scores[:limit]
-    })
+    return _cached_trending(
+        f"trending:users:{days}:{limit}",
+        build_payload
+    )
 
 
 @trending.route('/api/trending/reviews', methods=['GET'])
 def get_trending_reviews():
     """Get trending/popular reviews based on likes"""
-    days = request.args.get('days', 30, type=int)
-    limit = request.args.get('limit', 10, type=int)
-    
-    since_date = datetime.utcnow() - timedelta(days=days)
-    
-    # Get reviews with like counts
-    trending_reviews = db.session.query(
-        Review,
-        func.count(MediaLike.id).label('like_count')
-    ).outerjoin(
-        MediaLike, and_(
-            MediaLike.media_id == Review.media_id,
-            MediaLike.media_type == Review.media_type,
-            MediaLike.user_id == Review.user_id
-        )
-    ).filter(
-        Review.created_at >= since_date
-    ).group_by(Review.id).order_by(desc('like_count')).limit(limit).all()
+    days, limit = _parse_trending_args(default_days=30, default_limit=10)
     
-    reviews_data = []
-    for review, like_count in trending_reviews:
-        reviews_data.append({
-            'id': review.id,
-            'user_id': review.user_id,
-            'username': review.user.username,
-            'media_id': review.media_id,
-            'media_type': review.media_type,
-            'media_title': review.media_title,
-            'rating': review.rating,
-            'content': review.content,
-            'created_at': review.created_at.isoformat(),
-            'like_count': like_count
-        })
+    def build_payload():
+        since_date = datetime.utcnow() - timedelta(days=days)
+        
+        # Rank recent reviews by their own (denormalized) like count. Only
+        # the columns the response needs are selected, so no Review/User
+        # objects are built and nothing is lazy-loaded per row.
+        trending_reviews = db.session.query(
+            Review.id,
+            Review.user_id,
+            User.username,
+            Review.media_id,
+            Review.media_type,
+            MediaItem.title.label('media_title'),
+            Review.rating,
+            Review.content,
+            Review.created_at,
+            func.coalesce(Review.likes_count, 0).label('like_count')
+        ).join(
+            User, User.id == Review.user_id
+        ).join(
+            MediaItem, MediaItem.id == Review.media_id
+        ).filter(
+            Review.created_at >= since_date,
+            Review.is_deleted == False
+        ).order_by(desc('like_count'), Review.id.desc()).limit(limit)
+        
+        reviews_data = [
+            {
+                'id': review.id,
+                'user_id': review.user_id,
+                'username': review.username,
+                'media_id': review.media_id,
+                'media_type': review.media_type,
+                'media_title': review.media_title,
+                'rating': review.rating,
+                'content': review.content,
+                'created_at': review.created_at.isoformat(),
+                'like_count': review.like_count
+            }
+            for review in trending_reviews
+        ]
+        
+        return {
+            'success': True,
+            'period_days': days,
+            'reviews': reviews_data
+        }
     
-    return jsonify({
-        'success': True,
-        'period_days': days,
-        'reviews': reviews_data
-    })
+    return _cached_trending(
+        f"trending:reviews:{days}:{limit}",
+        build_payload
+    )
 
 
 @trending.route('/api/trending/summary', methods=['GET'])
 def get_trending_summary():
     """Get a summary of all trending data"""
-    days = request.args.get('days', 7, type=int)
+    days, _ = _parse_trending_args()
     
     # Get top 5 of each category
-    trending_media_resp = get_trending_media()
-    trending_tags_resp = get_trending_tags()
-    trending_users_resp = get_trending_users()
-    
-    media_data = trending_media_resp.get_json()
-    tags_data = trending_tags_resp.get_json()
-    users_data = trending_users_resp.get_json()
-    
-    return jsonify({
-        'success': True,
-        'period_days': days,
-        'summary': {
-            'top_media': media_data['items'][:5],
-            'top_tags': tags_data['tags'][:5],
-            'top_users': users_data['users'][:5]
+    def build_payload():
+        lists = None
+        if days in TRENDING_WINDOWS:
+            try:
+                lists = _trending_summary_lists(days, from_views=True)
+            except ProgrammingError:
+                db.session.rollback()
+        if lists is None:
+            lists = _trending_summary_lists(days, from_views=False)
+        top_media, top_tags, top_users = lists
+        
+        return {
+            'success': True,
+            'period_days': days,
+            'summary': {
+                'top_media': top_media,
+                'top_tags': top_tags,
+                'top_users': top_users
+            }
         }
-    })
+    
+    return _cached_trending(f"trending:summary:{days}", build_payload)
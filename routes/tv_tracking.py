@@ -3,16 +3,80 @@ from flask import Blueprint, request, jsonify, render_template
 from flask_login import login_required, current_user
 from models import db, TVShowProgress, TVEpisodeWatch, UpcomingEpisode
 from api.tmdb_client import fetch_tv_show_details
+from api.cache import cache_get, cache_set
 from datetime import datetime, timedelta
-from sqlalchemy import and_, func
+from sqlalchemy import and_, func, select, delete
+from sqlalchemy.dialects.postgresql import insert
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 import requests
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 tv_tracking = Blueprint('tv_tracking', __name__)
 
 TMDB_API_KEY = os.getenv('TMDB_API_KEY')
 TMDB_BASE_URL = 'https://api.themoviedb.org/3'
 
+# Keep-alive connections to TMDb, shared by the season fetch threads below
+tmdb_session = requests.Session()
+tmdb_session.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
+# Season details for a whole series are fetched side by side
+_season_fetcher = ThreadPoolExecutor(max_workers=8, thread_name_prefix='tmdb-seasons')
+
+# How long raw TMDb show/season payloads are reused (seconds); shows that
+# have finished airing no longer change
+TMDB_AIRING_TTL = 86400
+TMDB_ENDED_TTL = 7 * 86400
+
+
+def cached_tmdb_get(path, ttl=TMDB_AIRING_TTL):
+    """
+    GET a TMDb path (e.g. /tv/1399) through the shared cache, keyed like
+    tmdb:tv:1399. ttl may be a callable of the payload. Returns None, and
+    caches nothing, when TMDb does not answer 200.
+    """
+    key = 'tmdb:' + path.strip('/').replace('/', ':')
+    data = cache_get(key)
+    if data is None:
+        response = tmdb_session.get(
+            f'{TMDB_BASE_URL}{path}',
+            params={'api_key': TMDB_API_KEY},
+            timeout=10
+        )
+        if response.status_code != 200:
+            logger.warning("TMDb request for %s failed: %s", path, response.status_code)
+            return None
+        data = response.json()
+        cache_set(key, data, ttl(data) if callable(ttl) else ttl)
+    return data
+
+
+def _show_ttl(show_data):
+    """Cache ended/canceled shows longer than ones still airing"""
+    return TMDB_ENDED_TTL if show_data.get('status') in ['Ended', 'Canceled'] else TMDB_AIRING_TTL
+
+
+def fetch_show_data(show_id):
+    """Raw TMDb show payload (with its seasons list), or None"""
+    return cached_tmdb_get(f'/tv/{show_id}', ttl=_show_ttl)
+
+
+def fetch_season_details(show_id, season_number, ttl=TMDB_AIRING_TTL):
+    """Raw TMDb season payload (with its episodes list), or None"""
+    return cached_tmdb_get(f'/tv/{show_id}/season/{season_number}', ttl=ttl)
+
+
+def _parse_watched_date(data):
+    """The request's watched_date (YYYY-MM-DD), defaulting to today"""
+    watched_date = data.get('watched_date')
+    if not watched_date:
+        return datetime.now().date()
+    return datetime.strptime(watched_date, '%Y-%m-%d').date()
+
 
 @tv_tracking.route('/tv/dashboard')
 @login_required
@@ -89,7 +153,7 @@ def get_show_progress(show_id):
             current_total = show.get('number_of_episodes', 0)
             
             if current_total != progress.total_episodes:
-                print(f"Show {show_id} has {current_total} episodes now (was {progress.total_episodes})")
+                logger.info("Show %s has %s episodes now (was %s)", show_id, current_total, progress.total_episodes)
                 progress.total_episodes = current_total
                 progress.total_seasons = show.get('number_of_seasons', 0)
                 
@@ -98,11 +162,11 @@ def get_show_progress(show_id):
                     show_status = show.get('status', '')
                     if show_status not in ['Ended', 'Canceled']:
                         progress.status = 'watching'
-                        print(f"Reverted status to 'watching' - new episodes available!")
+                        logger.info("Show %s reverted to 'watching' - new episodes available", show_id)
                 
                 db.session.commit()
         except Exception as e:
-            print(f"Could not refresh show data: {e}")
+            logger.warning("Could not refresh show data for %s: %s", show_id, e)
         
         # Get watched episodes
         watched_episodes = TVEpisodeWatch.query.filter_by(
@@ -127,9 +191,10 @@ def get_show_progress(show_id):
 def mark_episode_watched(show_id, season, episode):
     """Mark an episode as watched"""
     try:
-        print(f"\n=== MARK EPISODE WATCHED: Show {show_id}, S{season}E{episode}, User {current_user.id} ===")
+        logger.debug("Mark episode watched: show=%s S%sE%s user=%s", show_id, season, episode, current_user.id)
         
         data = request.get_json(silent=True) or {}
+        watched_on = _parse_watched_date(data)
         
         # Get or create progress entry
         progress = TVShowProgress.query.filter_by(
@@ -138,7 +203,7 @@ def mark_episode_watched(show_id, season, episode):
         ).first()
         
         if not progress:
-            print("Creating new progress entry...")
+            logger.debug("Creating new progress entry")
             # Auto-create progress if not exists
             show = fetch_tv_show_details(show_id)
             progress = TVShowProgress(
@@ -152,9 +217,9 @@ def mark_episode_watched(show_id, season, episode):
             )
             db.session.add(progress)
             db.session.flush()
-            print(f"Progress created with ID: {progress.id}")
+            logger.debug("Progress created with ID %s", progress.id)
         else:
-            print(f"Using existing progress ID: {progress.id}")
+            logger.debug("Using existing progress ID %s", progress.id)
         
         # Check if episode already marked
         existing = TVEpisodeWatch.query.filter_by(
@@ -165,15 +230,15 @@ def mark_episode_watched(show_id, season, episode):
         ).first()
         
         if existing:
-            print(f"Episode already watched, updating...")
+            logger.debug("Episode already watched, updating")
             # Update existing watch
-            existing.watched_date = datetime.strptime(data.get('watched_date', datetime.now().strftime('%Y-%m-%d')), '%Y-%m-%d').date()
+            existing.watched_date = watched_on
             existing.rating = data.get('rating')
             existing.notes = data.get('notes')
             existing.is_rewatch = data.get('is_rewatch', False)
             episode_watch = existing
         else:
-            print(f"Adding new episode watch...")
+            logger.debug("Adding new episode watch")
             # Create new watch entry
             episode_watch = TVEpisodeWatch(
                 user_id=current_user.id,
@@ -182,23 +247,19 @@ def mark_episode_watched(show_id, season, episode):
                 season_number=season,
                 episode_number=episode,
                 episode_name=data.get('episode_name'),
-                watched_date=datetime.strptime(data.get('watched_date', datetime.now().strftime('%Y-%m-%d')), '%Y-%m-%d').date(),
+                watched_date=watched_on,
                 rating=data.get('rating'),
                 notes=data.get('notes'),
                 is_rewatch=data.get('is_rewatch', False)
             )
             db.session.add(episode_watch)
-            
-            # Update progress counts
-            if not episode_watch.is_rewatch:
-                progress.watched_episodes += 1
-                print(f"Progress updated: {progress.watched_episodes}/{progress.total_episodes}")
         
         # Update last watched time
         progress.last_watched = datetime.utcnow()
         
-        # Check if season completed
+        # Recount episodes and check if season completed
         update_season_progress(progress, show_id)
+        logger.debug("Progress updated: %s/%s", progress.watched_episodes, progress.total_episodes)
         
         # Check if show completed - but only mark as completed if show has actually ended
         # For returning series, keep status as 'watching' even if all current episodes are watched
@@ -212,18 +273,17 @@ def mark_episode_watched(show_id, season, episode):
                 if show_status in ['Ended', 'Canceled']:
                     progress.status = 'completed'
                     progress.completed_at = datetime.utcnow()
-                    print(f"Show marked as COMPLETED (show status: {show_status})")
+                    logger.debug("Show %s marked as completed (show status: %s)", show_id, show_status)
                 else:
                     # Returning series - keep as watching
-                    print(f"All current episodes watched, but show is '{show_status}' - keeping status as 'watching'")
+                    logger.debug("All current episodes of %s watched, but show is '%s' - keeping status as 'watching'", show_id, show_status)
                     if progress.status == 'completed':
                         progress.status = 'watching'  # Revert if was previously completed
             except Exception as e:
-                print(f"Could not fetch show status: {e}")
+                logger.warning("Could not fetch show status for %s: %s", show_id, e)
                 # If we can't determine, don't auto-complete
         
         db.session.commit()
-        print("✓ Database commit successful!")
         
         return jsonify({
             'success': True,
@@ -232,9 +292,7 @@ def mark_episode_watched(show_id, season, episode):
         }), 200
         
     except Exception as e:
-        print(f"ERROR in mark_episode_watched: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in mark_episode_watched")
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
@@ -244,24 +302,20 @@ def mark_episode_watched(show_id, season, episode):
 def mark_season_watched(show_id, season):
     """Mark entire season as watched"""
     try:
-        print(f"\n=== MARK SEASON WATCHED: Show {show_id}, Season {season}, User {current_user.id} ===")
+        logger.debug("Mark season watched: show=%s season=%s user=%s", show_id, season, current_user.id)
         
         data = request.get_json() or {}
-        watched_date = data.get('watched_date', datetime.now().strftime('%Y-%m-%d'))
+        watched_on = _parse_watched_date(data)
         
         # Fetch season details from TMDb
-        response = requests.get(
-            f'{TMDB_BASE_URL}/tv/{show_id}/season/{season}',
-            params={'api_key': TMDB_API_KEY}
-        )
+        season_data = fetch_season_details(show_id, season)
         
-        if response.status_code != 200:
-            print(f"ERROR: Failed to fetch season details from TMDb: {response.status_code}")
+        if season_data is None:
+            logger.warning("Failed to fetch season %s of show %s from TMDb", season, show_id)
             return jsonify({'error': 'Failed to fetch season details'}), 400
         
-        season_data = response.json()
         episodes = season_data.get('episodes', [])
-        print(f"Found {len(episodes)} episodes in season {season}")
+        logger.debug("Found %s episodes in season %s", len(episodes), season)
         
         # Get or create progress
         progress = TVShowProgress.query.filter_by(
@@ -270,7 +324,7 @@ def mark_season_watched(show_id, season):
         ).first()
         
         if not progress:
-            print("Creating new progress entry...")
+            logger.debug("Creating new progress entry")
             show = fetch_tv_show_details(show_id)
             progress = TVShowProgress(
                 user_id=current_user.id,
@@ -283,55 +337,42 @@ def mark_season_watched(show_id, season):
             )
             db.session.add(progress)
             db.session.flush()
-            print(f"Progress created with ID: {progress.id}")
+            logger.debug("Progress created with ID %s", progress.id)
         else:
-            print(f"Using existing progress ID: {progress.id}, Current watched: {progress.watched_episodes}/{progress.total_episodes}")
-        
-        # IMPORTANT: Delete existing episodes for this season first to ensure clean state
-        existing_count = TVEpisodeWatch.query.filter_by(
-            user_id=current_user.id,
-            show_id=show_id,
-            season_number=season
-        ).count()
-        
-        if existing_count > 0:
-            print(f"Found {existing_count} existing episodes for season {season}, deleting them first...")
-            TVEpisodeWatch.query.filter_by(
-                user_id=current_user.id,
-                show_id=show_id,
-                season_number=season
-            ).delete()
-            db.session.flush()
-            print(f"Deleted {existing_count} existing episodes")
-            # Update progress count
-            progress.watched_episodes -= existing_count
-        
-        # Mark all episodes in season
-        marked_count = 0
-        for ep in episodes:
-            ep_num = ep['episode_number']
-            
-            episode_watch = TVEpisodeWatch(
-                user_id=current_user.id,
-                show_id=show_id,
-                progress_id=progress.id,
-                season_number=season,
-                episode_number=ep_num,
-                episode_name=ep.get('name'),
-                watched_date=datetime.strptime(watched_date, '%Y-%m-%d').date()
-            )
-            db.session.add(episode_watch)
-            marked_count += 1
-        
-        print(f"Added {marked_count} episodes as watched")
+            logger.debug("Using existing progress ID %s, watched %s/%s", progress.id, progress.watched_episodes, progress.total_episodes)
+        
+        # Mark all episodes in season with one multi-row UPSERT: episodes
+        # already watched get the new date and keep their rating/notes
+        rows = [{
+            'user_id': current_user.id,
+            'show_id': show_id,
+            'progress_id': progress.id,
+            'season_number': season,
+            'episode_number': ep['episode_number'],
+            'episode_name': ep.get('name'),
+            'watched_date': watched_on
+        } for ep in episodes]
+        if rows:
+            stmt = insert(TVEpisodeWatch).values(rows)
+            db.session.execute(stmt.on_conflict_do_update(
+                index_elements=['user_id', 'show_id', 'season_number', 'episode_number'],
+                set_={
+                    'progress_id': stmt.excluded.progress_id,
+                    'episode_name': stmt.excluded.episode_name,
+                    'watched_date': stmt.excluded.watched_date,
+                    'updated_at': datetime.utcnow()
+                }
+            ))
+        marked_count = len(rows)
+        
+        logger.debug("Marked %s episodes as watched", marked_count)
         
         # Update progress
         old_watched = progress.watched_episodes
-        progress.watched_episodes += marked_count
         progress.last_watched = datetime.utcnow()
         update_season_progress(progress, show_id)
         
-        print(f"Progress updated: {old_watched} -> {progress.watched_episodes}")
+        logger.debug("Progress updated: %s -> %s", old_watched, progress.watched_episodes)
         
         # Check completion - but only mark as completed if show has actually ended
         if progress.watched_episodes >= progress.total_episodes and progress.total_episodes > 0:
@@ -344,27 +385,18 @@ def mark_season_watched(show_id, season):
                 if show_status in ['Ended', 'Canceled']:
                     progress.status = 'completed'
                     progress.completed_at = datetime.utcnow()
-                    print(f"Show marked as COMPLETED (show status: {show_status})")
+                    logger.debug("Show %s marked as completed (show status: %s)", show_id, show_status)
                 else:
                     # Returning series - keep as watching
-                    print(f"All current episodes watched, but show is '{show_status}' - keeping status as 'watching'")
+                    logger.debug("All current episodes of %s watched, but show is '%s' - keeping status as 'watching'", show_id, show_status)
                     if progress.status == 'completed':
                         progress.status = 'watching'  # Revert if was previously completed
             except Exception as e:
-                print(f"Could not fetch show status: {e}")
+                logger.warning("Could not fetch show status for %s: %s", show_id, e)
                 # If we can't determine, don't auto-complete
         
         # Commit to database
         db.session.commit()
-        print("✓ Database commit successful!")
-        
-        # Verify data was saved
-        saved_episodes = TVEpisodeWatch.query.filter_by(
-            user_id=current_user.id,
-            show_id=show_id,
-            season_number=season
-        ).count()
-        print(f"Verification: {saved_episodes} episodes saved in database for season {season}")
         
         return jsonify({
             'success': True,
@@ -374,9 +406,7 @@ def mark_season_watched(show_id, season):
         }), 200
         
     except Exception as e:
-        print(f"ERROR in mark_season_watched: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in mark_season_watched")
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
@@ -447,38 +477,37 @@ def update_show_status(show_id):
 def get_upcoming_episodes():
     """Get upcoming episodes for shows user is tracking"""
     try:
-        # Get shows user is currently watching or planning to watch
-        watching_shows = TVShowProgress.query.filter_by(
-            user_id=current_user.id
-        ).filter(TVShowProgress.status.in_(['watching', 'plan_to_watch'])).all()
-        
-        show_ids = [show.show_id for show in watching_shows]
+        # Shows user is currently watching or planning to watch
+        tracked_show_ids = select(TVShowProgress.show_id).where(
+            TVShowProgress.user_id == current_user.id,
+            TVShowProgress.status.in_(['watching', 'plan_to_watch'])
+        )
         
         # Get upcoming episodes for these shows
         today = datetime.utcnow().date()
         week_from_now = today + timedelta(days=7)
         
-        upcoming = UpcomingEpisode.query.filter(
-            UpcomingEpisode.show_id.in_(show_ids),
+        # Only include unwatched episodes: anti-join against the user's
+        # watches instead of looking each episode up separately
+        upcoming = UpcomingEpisode.query.outerjoin(
+            TVEpisodeWatch, and_(
+                TVEpisodeWatch.user_id == current_user.id,
+                TVEpisodeWatch.show_id == UpcomingEpisode.show_id,
+                TVEpisodeWatch.season_number == UpcomingEpisode.season_number,
+                TVEpisodeWatch.episode_number == UpcomingEpisode.episode_number
+            )
+        ).filter(
+            UpcomingEpisode.show_id.in_(tracked_show_ids),
             UpcomingEpisode.air_date >= today,
-            UpcomingEpisode.air_date <= week_from_now
+            UpcomingEpisode.air_date <= week_from_now,
+            TVEpisodeWatch.id.is_(None)
         ).order_by(UpcomingEpisode.air_date).all()
         
         episodes_list = []
         for ep in upcoming:
-            # Check if already watched
-            watched = TVEpisodeWatch.query.filter_by(
-                user_id=current_user.id,
-                show_id=ep.show_id,
-                season_number=ep.season_number,
-                episode_number=ep.episode_number
-            ).first()
-            
-            if not watched:  # Only include unwatched episodes
-                days_until = (ep.air_date - today).days
-                ep_dict = ep.to_dict()
-                ep_dict['days_until_air'] = days_until
-                episodes_list.append(ep_dict)
+            ep_dict = ep.to_dict()
+            ep_dict['days_until_air'] = (ep.air_date - today).days
+            episodes_list.append(ep_dict)
         
         return jsonify({
             'success': True,
@@ -508,17 +537,15 @@ def get_episode_calendar():
         else:
             end_date = start_date + timedelta(days=30)
         
-        # Get shows user is tracking
-        watching_shows = TVShowProgress.query.filter_by(
-            user_id=current_user.id,
-            status='watching'
-        ).all()
-        
-        show_ids = [show.show_id for show in watching_shows]
+        # Shows user is tracking, as a subquery rather than loaded rows
+        watching_show_ids = select(TVShowProgress.show_id).where(
+            TVShowProgress.user_id == current_user.id,
+            TVShowProgress.status == 'watching'
+        )
         
         # Get upcoming episodes in date range
         episodes = UpcomingEpisode.query.filter(
-            UpcomingEpisode.show_id.in_(show_ids),
+            UpcomingEpisode.show_id.in_(watching_show_ids),
             UpcomingEpisode.air_date >= start_date,
             UpcomingEpisode.air_date <= end_date
         ).order_by(UpcomingEpisode.air_date).all()
@@ -555,20 +582,34 @@ def my_shows_page():
     return render_template('tv_my_shows.html', api_key=TMDB_API_KEY)
 
 
-# Helper function
+# Helper functions
+def _recount(progress, show_id):
+    """
+    Set progress.watched_episodes from the stored (non-rewatch) watches and
+    return {season_number: watched count}, all from one GROUP BY query
+    """
+    watched_by_season = dict(db.session.query(
+        TVEpisodeWatch.season_number, func.count(TVEpisodeWatch.id)
+    ).filter(
+        TVEpisodeWatch.user_id == progress.user_id,
+        TVEpisodeWatch.show_id == show_id,
+        TVEpisodeWatch.is_rewatch == False
+    ).group_by(TVEpisodeWatch.season_number).all())
+    
+    progress.watched_episodes = sum(watched_by_season.values())
+    return watched_by_season
+
+
 def update_season_progress(progress, show_id):
-    """Update watched seasons count based on completed seasons"""
+    """Recount watched episodes and update watched seasons count based on completed seasons"""
+    watched_by_season = _recount(progress, show_id)
     try:
         # Fetch show details to get season info
-        response = requests.get(
-            f'{TMDB_BASE_URL}/tv/{show_id}',
-            params={'api_key': TMDB_API_KEY}
-        )
+        show_data = fetch_show_data(show_id)
         
-        if response.status_code != 200:
+        if show_data is None:
             return
         
-        show_data = response.json()
         seasons = show_data.get('seasons', [])
         
         # Count completed seasons
@@ -580,12 +621,7 @@ def update_season_progress(progress, show_id):
             season_num = season['season_number']
             episode_count = season['episode_count']
             
-            # Count watched episodes in this season
-            watched_in_season = TVEpisodeWatch.query.filter_by(
-                user_id=progress.user_id,
-                show_id=show_id,
-                season_number=season_num
-            ).filter(TVEpisodeWatch.is_rewatch == False).count()
+            watched_in_season = watched_by_season.get(season_num, 0)
             
             if watched_in_season >= episode_count:
                 completed_seasons += 1
@@ -593,7 +629,17 @@ def update_season_progress(progress, show_id):
         progress.watched_seasons = completed_seasons
         
     except Exception as e:
-        print(f"Error updating season progress: {e}")
+        logger.warning("Error updating season progress for show %s: %s", show_id, e)
+
+
+def _refresh_progress_counts(show_id):
+    """Recount the current user's progress for a show after watches change"""
+    progress = TVShowProgress.query.filter_by(
+        user_id=current_user.id,
+        show_id=show_id
+    ).first()
+    if progress:
+        update_season_progress(progress, show_id)
 
 
 # ===== NEW ROUTES FOR SEASON/EPISODE PAGES =====
@@ -603,11 +649,7 @@ def update_season_progress(progress, show_id):
 def season_detail(show_id, season_number):
     """Season detail page with episode list"""
     # Get show name from TMDb
-    response = requests.get(
-        f'{TMDB_BASE_URL}/tv/{show_id}',
-        params={'api_key': TMDB_API_KEY}
-    )
-    show_data = response.json()
+    show_data = fetch_show_data(show_id) or {}
     show_name = show_data.get('name', 'Unknown Show')
     
     return render_template(
@@ -624,11 +666,7 @@ def season_detail(show_id, season_number):
 def episode_detail(show_id, season_number, episode_number):
     """Episode detail page with watch controls"""
     # Get show name from TMDb
-    response = requests.get(
-        f'{TMDB_BASE_URL}/tv/{show_id}',
-        params={'api_key': TMDB_API_KEY}
-    )
-    show_data = response.json()
+    show_data = fetch_show_data(show_id) or {}
     show_name = show_data.get('name', 'Unknown Show')
     
     return render_template(
@@ -646,37 +684,33 @@ def episode_detail(show_id, season_number, episode_number):
 def get_watched_episodes(show_id):
     """Get all watched episodes for a show"""
     try:
-        print(f"\n=== GET WATCHED EPISODES: Show {show_id}, User {current_user.id} ===")
-        
-        episodes = TVEpisodeWatch.query.filter_by(
+        # Plain column tuples: no ORM objects are built for the (possibly
+        # hundreds of) rows; jsonify already encodes through orjson
+        episodes = db.session.query(
+            TVEpisodeWatch.season_number,
+            TVEpisodeWatch.episode_number,
+            TVEpisodeWatch.watched_date,
+            TVEpisodeWatch.rating,
+            TVEpisodeWatch.notes,
+            TVEpisodeWatch.is_rewatch
+        ).filter_by(
             user_id=current_user.id,
             show_id=show_id
         ).all()
         
-        print(f"Found {len(episodes)} watched episodes in database")
-        
-        # Group by season for debugging
-        season_counts = {}
-        for ep in episodes:
-            season_counts[ep.season_number] = season_counts.get(ep.season_number, 0) + 1
-        
-        print(f"Episodes by season: {season_counts}")
-        
         return jsonify({
             'success': True,
             'episodes': [{
-                'season_number': ep.season_number,
-                'episode_number': ep.episode_number,
-                'watched_date': ep.watched_date.isoformat() if ep.watched_date else None,
-                'rating': ep.rating,
-                'notes': ep.notes,
-                'is_rewatch': ep.is_rewatch
-            } for ep in episodes]
+                'season_number': season_number,
+                'episode_number': episode_number,
+                'watched_date': watched_date.isoformat() if watched_date else None,
+                'rating': rating,
+                'notes': notes,
+                'is_rewatch': is_rewatch
+            } for season_number, episode_number, watched_date, rating, notes, is_rewatch in episodes]
         })
     except Exception as e:
-        print(f"ERROR in get_watched_episodes: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in get_watched_episodes")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -685,13 +719,20 @@ def get_watched_episodes(show_id):
 def unmark_season_watched(show_id, season_number):
     """Unmark all episodes in a season as unwatched"""
     try:
-        # Delete all episode watches for this season
-        TVEpisodeWatch.query.filter_by(
-            user_id=current_user.id,
-            show_id=show_id,
-            season_number=season_number
-        ).delete()
-        
+        # Delete all episode watches for this season; the rows are not in
+        # the session, so skip synchronizing it
+        deleted = db.session.execute(
+            delete(TVEpisodeWatch).where(
+                TVEpisodeWatch.user_id == current_user.id,
+                TVEpisodeWatch.show_id == show_id,
+                TVEpisodeWatch.season_number == season_number
+            ),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        
+        # Counts only move if something was actually unmarked
+        if deleted:
+            _refresh_progress_counts(show_id)
         db.session.commit()
         
         return jsonify({'success': True})
@@ -706,16 +747,20 @@ def unmark_single_episode(show_id, season_number, episode_number):
     """Unmark a single episode as unwatched (new version)"""
     try:
         # Delete episode watch
-        TVEpisodeWatch.query.filter_by(
-            user_id=current_user.id,
-            show_id=show_id,
-            season_number=season_number,
-            episode_number=episode_number
-        ).delete()
-        
+        deleted = db.session.execute(
+            delete(TVEpisodeWatch).where(
+                TVEpisodeWatch.user_id == current_user.id,
+                TVEpisodeWatch.show_id == show_id,
+                TVEpisodeWatch.season_number == season_number,
+                TVEpisodeWatch.episode_number == episode_number
+            ),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        
+        if deleted:
+            _refresh_progress_counts(show_id)
         db.session.commit()
         
-
         return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
@@ -728,53 +773,63 @@ def mark_all_watched(show_id):
     """Mark all episodes in all seasons as watched (complete series)"""
     try:
         # Fetch show details
-        response = requests.get(
-            f'{TMDB_BASE_URL}/tv/{show_id}',
-            params={'api_key': TMDB_API_KEY}
-        )
-        show_data = response.json()
-        
-        # Mark each episode in each season
-        for season in show_data.get('seasons', []):
-            if season['season_number'] == 0:  # Skip specials
-                continue
-            
-            # Fetch season details
-            season_response = requests.get(
-                f'{TMDB_BASE_URL}/tv/{show_id}/season/{season["season_number"]}',
-                params={'api_key': TMDB_API_KEY}
-            )
-            season_data = season_response.json()
-            
-            # Mark each episode
-            for episode in season_data.get('episodes', []):
-                # Check if already watched
-                existing = TVEpisodeWatch.query.filter_by(
-                    user_id=current_user.id,
-                    show_id=show_id,
-                    season_number=season['season_number'],
-                    episode_number=episode['episode_number']
-                ).first()
-                
-                if not existing:
-                    watch = TVEpisodeWatch(
-                        user_id=current_user.id,
-                        show_id=show_id,
-                        season_number=season['season_number'],
-                        episode_number=episode['episode_number'],
-                        watched_at=datetime.utcnow()
-                    )
-                    db.session.add(watch)
+        show_data = fetch_show_data(show_id) or {}
+        season_ttl = _show_ttl(show_data)
         
-        # Update show progress to completed
         progress = TVShowProgress.query.filter_by(
             user_id=current_user.id,
             show_id=show_id
         ).first()
         
+        # Episodes already marked, fetched once instead of per episode
+        already_watched = {
+            (season_number, episode_number)
+            for season_number, episode_number in db.session.query(
+                TVEpisodeWatch.season_number, TVEpisodeWatch.episode_number
+            ).filter_by(user_id=current_user.id, show_id=show_id)
+        }
+        
+        # Fetch every season's details concurrently (skipping specials)
+        season_numbers = [
+            season['season_number'] for season in show_data.get('seasons', [])
+            if season['season_number'] != 0
+        ]
+        season_datas = _season_fetcher.map(
+            lambda season_number: fetch_season_details(show_id, season_number, ttl=season_ttl),
+            season_numbers
+        )
+        
+        # Collect every unwatched episode in each season
+        now = datetime.utcnow()
+        today = now.date()
+        rows = []
+        for season_number, season_data in zip(season_numbers, season_datas):
+            for episode in (season_data or {}).get('episodes', []):
+                key = (season_number, episode['episode_number'])
+                if key in already_watched:
+                    continue
+                already_watched.add(key)
+                rows.append({
+                    'user_id': current_user.id,
+                    'show_id': show_id,
+                    'progress_id': progress.id if progress else None,
+                    'season_number': key[0],
+                    'episode_number': key[1],
+                    'episode_name': episode.get('name'),
+                    'watched_date': today
+                })
+        
+        # One multi-row INSERT for the whole series; a watch added meanwhile
+        # by another request is left as it is
+        if rows:
+            db.session.execute(insert(TVEpisodeWatch).values(rows).on_conflict_do_nothing())
+        
+        # Update show progress to completed
         if progress:
+            update_season_progress(progress, show_id)
+            progress.last_watched = now
             progress.status = 'completed'
-            progress.completed_at = datetime.utcnow()
+            progress.completed_at = now
         
         db.session.commit()
         
@@ -805,7 +860,7 @@ def update_episode_watch(show_id, season_number, episode_number):
                 show_id=show_id,
                 season_number=season_number,
                 episode_number=episode_number,
-                watched_at=datetime.utcnow()
+                watched_date=datetime.utcnow().date()
             )
             db.session.add(watch)
         
@@ -814,6 +869,8 @@ def update_episode_watch(show_id, season_number, episode_number):
         watch.notes = data.get('notes')
         watch.is_rewatch = data.get('is_rewatch', False)
         
+        # A new watch or a changed rewatch flag moves the counts
+        _refresh_progress_counts(show_id)
         db.session.commit()
         
         return jsonify({'success': True})
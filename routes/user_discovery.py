@@ -6,6 +6,7 @@ from flask import Blueprint, request, jsonify, render_template
 from flask_login import login_required, current_user
 from models import db, User, UserFollow, Review, DiaryEntry
 from sqlalchemy import func, or_, and_, desc
+from api.pagination import window_paginate
 from datetime import datetime, timedelta
 import json
 
@@ -57,9 +58,13 @@ def search_users():
     )
     
     # Paginate
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)  # type: ignore
+    pagination = window_paginate(query, page, per_page)
+    
+    # Build response with follow status, resolved for the whole page in one query
+    following_set = set()
+    if current_user.is_authenticated:
+        following_set = UserFollow.followed_ids(current_user.id, [user.id for user in pagination.items])
     
-    # Build response with follow status
     users_data = []
     for user in pagination.items:
         user_dict = {
@@ -77,12 +82,7 @@ def search_users():
         
         # Check if current user follows this user
         if current_user.is_authenticated:
-            is_following = UserFollow.query.filter_by(
-                follower_id=current_user.id,
-                following_id=user.id,
-                is_active=True
-            ).first() is not None
-            user_dict['is_following'] = is_following
+            user_dict['is_following'] = user.id in following_set
         
         users_data.append(user_dict)
     
@@ -222,7 +222,12 @@ def popular_users():
     query = query.order_by(desc(User.followers_count), desc(User.total_reviews))
     
     # Paginate
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)  # type: ignore
+    pagination = window_paginate(query, page, per_page)
+    
+    # Follow status for the whole page in one query
+    following_set = set()
+    if current_user.is_authenticated:
+        following_set = UserFollow.followed_ids(current_user.id, [user.id for user in pagination.items])
     
     users_data = []
     for user in pagination.items:
@@ -240,12 +245,7 @@ def popular_users():
         }
         
         if current_user.is_authenticated:
-            is_following = UserFollow.query.filter_by(
-                follower_id=current_user.id,
-                following_id=user.id,
-                is_active=True
-            ).first() is not None
-            user_dict['is_following'] = is_following
+            user_dict['is_following'] = user.id in following_set
         
         users_data.append(user_dict)
     
@@ -305,6 +305,11 @@ def similar_users(user_id):
     users = User.query.filter(User.id.in_(similar_user_ids)).all()
     
     # Build response
+    # Follow status for the whole page in one query
+    following_set = set()
+    if current_user.is_authenticated:
+        following_set = UserFollow.followed_ids(current_user.id, [similar_user.id for similar_user in users])
+    
     users_data = []
     for similar_user in users:
         # Get stats for this user
@@ -325,12 +330,7 @@ def similar_users(user_id):
         }
         
         if current_user.is_authenticated:
-            is_following = UserFollow.query.filter_by(
-                follower_id=current_user.id,
-                following_id=similar_user.id,
-                is_active=True
-            ).first() is not None
-            user_dict['is_following'] = is_following
+            user_dict['is_following'] = similar_user.id in following_set
         
         users_data.append(user_dict)
     
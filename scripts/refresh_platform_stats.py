@@ -0,0 +1,30 @@
+"""
+Refresh the mv_platform_stats / mv_most_watched materialized views
+Run this periodically (every 10 minutes) so /api/stats/platform stays current
+"""
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, db
+from sqlalchemy import text
+
+VIEWS = ['mv_platform_stats', 'mv_most_watched']
+
+
+def refresh_platform_stats():
+    """Rebuild the views without blocking readers"""
+    with app.app_context():
+        started = time.time()
+        with db.engine.connect() as conn:
+            for view in VIEWS:
+                conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}"))
+            conn.commit()
+        print(f"Refreshed {', '.join(VIEWS)} in {time.time() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    refresh_platform_stats()
@@ -0,0 +1,28 @@
+"""
+Refresh the user_taste_overlap materialized view used for suggested follows
+Run this periodically (hourly) so new watchlist/viewing activity shows up
+"""
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, db
+from sqlalchemy import text
+
+
+def refresh_taste_overlap():
+    """Rebuild the view without blocking readers"""
+    with app.app_context():
+        started = time.time()
+        with db.engine.connect() as conn:
+            conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY user_taste_overlap"))
+            conn.commit()
+            rows = conn.execute(text("SELECT COUNT(*) FROM user_taste_overlap")).scalar()
+        print(f"Refreshed user_taste_overlap: {rows} user pairs in {time.time() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    refresh_taste_overlap()
@@ -10,6 +10,7 @@ class ActivityFeed {
         this.globalBtn = document.getElementById(options.globalBtnId || 'feed-btn-global');
         
         this.currentPage = 1;
+        this.nextCursor = null;
         this.currentMode = options.defaultMode || 'global';
         this.isLoading = false;
         this.hasMore = true;
@@ -42,6 +43,7 @@ class ActivityFeed {
         
         this.currentMode = mode;
         this.currentPage = 1;
+        this.nextCursor = null;
         this.hasMore = true;
         
         // Update UI buttons
@@ -72,7 +74,11 @@ class ActivityFeed {
         if (this.loadMoreBtn) this.loadMoreBtn.classList.add('hidden');
         
         const endpoint = this.currentMode === 'following' ? '/api/social/feed' : '/api/social/global-feed';
-        const url = `${endpoint}?page=${this.currentPage}&per_page=9`;
+        // Continue from the last review we rendered (keyset) once we have a cursor
+        let url = `${endpoint}?page=${this.currentPage}&per_page=9`;
+        if (append && this.nextCursor) {
+            url += `&after=${encodeURIComponent(this.nextCursor.after)}&after_id=${this.nextCursor.after_id}`;
+        }
         
         try {
             const response = await fetch(url);
@@ -81,6 +87,7 @@ class ActivityFeed {
             if (response.ok) {
                 this.renderFeed(data.reviews, append);
                 this.hasMore = data.has_next;
+                this.nextCursor = data.next_cursor || null;
                 if (this.hasMore && this.loadMoreBtn) {
                     this.loadMoreBtn.classList.remove('hidden');
                 }
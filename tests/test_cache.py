@@ -0,0 +1,69 @@
+"""
+Tests for the in-process fallback of the shared cache (api/cache.py)
+"""
+import threading
+
+import pytest
+
+from api import cache
+
+
+@pytest.fixture
+def local_cache(monkeypatch):
+    """Force the in-process cache with small, empty dicts"""
+    monkeypatch.setattr(cache, '_redis_client', None)
+    monkeypatch.setattr(cache, '_local_cache', {})
+    monkeypatch.setattr(cache, '_local_versions', {})
+    monkeypatch.setattr(cache, 'LOCAL_CACHE_MAX_ENTRIES', 50)
+    return cache
+
+
+def run_threads(target, count=8):
+    """Run target(n) on count threads and re-raise the first error"""
+    errors = []
+
+    def wrapper(n):
+        try:
+            target(n)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=wrapper, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def test_concurrent_sets_stay_bounded(local_cache):
+    """Eviction under concurrent writers never raises and keeps the size cap"""
+    def writer(n):
+        for i in range(2000):
+            local_cache.cache_set(f'key:{n}:{i}', i, ttl=60)
+            local_cache.cache_get(f'key:{n}:{i // 2}')
+
+    run_threads(writer)
+    assert len(local_cache._local_cache) <= local_cache.LOCAL_CACHE_MAX_ENTRIES
+
+
+def test_concurrent_bumps_are_not_lost(local_cache):
+    """Every bump_version from every thread is counted"""
+    def bumper(n):
+        for _ in range(500):
+            local_cache.bump_version('feed')
+
+    run_threads(bumper)
+    assert local_cache.get_version('feed') == 8 * 500
+
+
+def test_version_survives_eviction(local_cache):
+    """Filling the cache past its cap does not reset version counters"""
+    local_cache.bump_version('feed')
+    local_cache.bump_version('feed')
+
+    for i in range(local_cache.LOCAL_CACHE_MAX_ENTRIES * 3):
+        local_cache.cache_set(f'page:{i}', i, ttl=60)
+
+    assert local_cache.get_version('feed') == 2
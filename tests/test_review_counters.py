@@ -0,0 +1,224 @@
+"""
+Tests for review counter updates: the write-behind buffer's transaction
+handling and optimistic locking on Review.
+
+The HTTP tests need a disposable PostgreSQL database (the handlers use
+ON CONFLICT and RETURNING); point TEST_DATABASE_URL at one to run them.
+Its tables are created and dropped by the tests.
+"""
+import os
+
+import pytest
+from sqlalchemy import create_engine, event, text, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from api.counter_buffer import CounterBuffer
+
+
+class Counted:
+    """Stand-in model key for buffer-only tests"""
+
+
+# ============================================================================
+# BUFFER TRANSACTION HANDLING
+# ============================================================================
+
+@pytest.fixture
+def buffered_session():
+    """A session whose commits feed a fresh CounterBuffer"""
+    # Own Session subclass so the listeners don't reach other sessions
+    class BufferedSession(Session):
+        pass
+
+    factory = sessionmaker(create_engine('sqlite://'), class_=BufferedSession)
+    buffer = CounterBuffer()
+    buffer.attach(factory)
+    session = factory()
+    session.execute(text('SELECT 1'))  # Begin a transaction
+    yield buffer, session
+    session.close()
+
+
+def test_commit_hands_deltas_to_buffer(buffered_session):
+    """Deltas recorded in a transaction reach the buffer when it commits"""
+    buffer, session = buffered_session
+    buffer.incr_on_commit(session, Counted, 1, 'likes_count', 1)
+    assert buffer.pending(Counted, 1, 'likes_count') == 0
+
+    session.commit()
+    assert buffer.pending(Counted, 1, 'likes_count') == 1
+
+
+def test_rollback_discards_deltas(buffered_session):
+    """A rolled back transaction never moves a counter"""
+    buffer, session = buffered_session
+    buffer.incr_on_commit(session, Counted, 1, 'likes_count', 1)
+    session.rollback()
+
+    # A later commit on the same session must not pick the delta up
+    session.execute(text('SELECT 1'))
+    session.commit()
+    assert buffer.pending(Counted, 1, 'likes_count') == 0
+
+
+# ============================================================================
+# HTTP HANDLERS (PostgreSQL)
+# ============================================================================
+
+requires_postgres = pytest.mark.skipif(
+    not os.getenv('TEST_DATABASE_URL'),
+    reason="Requires TEST_DATABASE_URL pointing at a disposable PostgreSQL database"
+)
+
+
+@pytest.fixture(scope='module')
+def app():
+    """Minimal app with the review blueprints on the test database"""
+    from flask import Flask
+    from flask_login import LoginManager
+    from models import db, User
+    from routes.reviews import reviews
+    from routes.reviews_enhanced import reviews_enhanced_bp
+
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SECRET_KEY='test',
+        SQLALCHEMY_DATABASE_URI=os.environ['TEST_DATABASE_URL'],
+    )
+    db.init_app(app)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+    login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+
+    app.register_blueprint(reviews)
+    app.register_blueprint(reviews_enhanced_bp)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture(scope='module')
+def module_buffer(app):
+    """One started buffer for the module; its session listeners are global"""
+    from models import db
+
+    buffer = CounterBuffer(flush_interval=3600)
+    buffer.start(app, db)
+    yield buffer
+    buffer.stop()
+
+
+@pytest.fixture
+def write_behind(module_buffer, monkeypatch):
+    """Route Review.update_counters through the write-behind buffer"""
+    import models
+    monkeypatch.setattr(models, 'counter_buffer', module_buffer)
+    return module_buffer
+
+
+@pytest.fixture
+def review(app):
+    """A fresh review plus a client logged in as a different user"""
+    from models import db, User, MediaItem, Review
+
+    n = db.session.query(User).count()
+    author = User(username=f'author{n}', email=f'author{n}@example.com', password_hash='x')
+    reader = User(username=f'reader{n}', email=f'reader{n}@example.com', password_hash='x')
+    media = MediaItem(tmdb_id=1000 + n, media_type='movie', title='Test Movie')
+    db.session.add_all([author, reader, media])
+    db.session.flush()
+
+    review = Review(user_id=author.id, media_id=media.id, media_type='movie', rating=4.0)
+    db.session.add(review)
+    db.session.commit()
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(reader.id)
+        sess['_fresh'] = True
+
+    return client, review.id, author.id
+
+
+def stored_counts(review_id):
+    """(likes_count, comments_count) as stored in the database"""
+    from models import db, Review
+    db.session.expire_all()
+    row = db.session.get(Review, review_id)
+    return row.likes_count, row.comments_count
+
+
+@requires_postgres
+def test_duplicate_like_is_counted_once(write_behind, review):
+    """Liking twice with the buffer on adds exactly one like"""
+    client, review_id, _ = review
+
+    assert client.post(f'/api/reviews/{review_id}/like').status_code == 201
+    assert client.post(f'/api/reviews/{review_id}/like').status_code == 400
+
+    write_behind.flush()
+    assert stored_counts(review_id) == (1, 0)
+
+
+@requires_postgres
+def test_failed_reply_is_not_counted(write_behind, review):
+    """A reply rejected after its insert leaves comments_count alone"""
+    from models import db, Review
+    client, review_id, _ = review
+
+    db.session.execute(update(Review).where(Review.id == review_id).values(is_deleted=True))
+    db.session.commit()
+
+    response = client.post(f'/api/reviews/{review_id}/replies', json={'content': 'Nice'})
+    assert response.status_code == 404
+
+    write_behind.flush()
+    assert stored_counts(review_id) == (0, 0)
+
+
+@requires_postgres
+def test_comment_after_like(write_behind, review):
+    """Commenting on a review that was just liked neither fails nor loses counts"""
+    client, review_id, _ = review
+
+    assert client.post(f'/api/reviews/{review_id}/like').status_code == 201
+    response = client.post(f'/api/reviews/{review_id}/comments', json={'content': 'Agreed'})
+    assert response.status_code == 201
+
+    write_behind.flush()
+    assert stored_counts(review_id) == (1, 1)
+
+
+@requires_postgres
+def test_stale_review_update_returns_409(app, review):
+    """An edit racing a counter UPDATE fails its version check with 409"""
+    from models import db, Review
+    client, review_id, author_id = review
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(author_id)
+
+    # Another request bumps the row version between the handler's load and flush
+    raced = []
+
+    def concurrent_like(session, flush_context, instances):
+        if raced:
+            return
+        raced.append(True)
+        with db.engine.begin() as conn:
+            conn.execute(update(Review).where(Review.id == review_id).values(
+                likes_count=Review.likes_count + 1,
+                version=Review.version + 1
+            ))
+
+    event.listen(db.session, 'before_flush', concurrent_like)
+    try:
+        response = client.put(f'/api/reviews/{review_id}', json={'rating': 3.0})
+    finally:
+        event.remove(db.session, 'before_flush', concurrent_like)
+
+    assert response.status_code == 409